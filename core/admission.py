@@ -0,0 +1,89 @@
+import time, threading, psutil
+from dataclasses import dataclass
+
+# =====================================================================
+# 准入控制：已经有任务在跑时，先看一眼系统负载再决定要不要开下一个
+# 槽位数只管“最多几个”，这里管“现在能不能”：CPU 吃满、内存见底、慢盘写满时把排队的任务压住，
+# 负载回落再放行。只做判断（不依赖 Qt），定时重试和界面展示由调用方负责
+# =====================================================================
+
+MB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SystemLoad:
+    """一次系统负载采样"""
+    cpu_percent: float = 0.0       # 全机 CPU 占用
+    mem_available_mb: float = 0.0  # 可用内存
+    disk_write_mbps: float = 0.0   # 全部磁盘合计的写入速率 (MB/s)，首次采样为 0
+
+    def __str__(self):
+        return f"CPU {self.cpu_percent:.0f}% | 可用内存 {self.mem_available_mb:.0f} MB | 磁盘写入 {self.disk_write_mbps:.1f} MB/s"
+
+
+class LoadSampler:
+    """取样系统负载；CPU 占用和磁盘写入速率都是相邻两次采样之间的平均值"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_written = None
+        self._last_time = 0.0
+        psutil.cpu_percent(None)  # 第一次调用只建立基准，返回值无意义
+
+    def sample(self):
+        with self._lock:
+            now = time.monotonic()
+            io = psutil.disk_io_counters()
+            write_mbps = 0.0
+            if io is not None and self._last_written is not None and now > self._last_time:
+                write_mbps = max(0.0, (io.write_bytes - self._last_written) / (now - self._last_time) / MB)
+            if io is not None:
+                self._last_written, self._last_time = io.write_bytes, now
+            return SystemLoad(
+                cpu_percent=psutil.cpu_percent(None),
+                mem_available_mb=psutil.virtual_memory().available / MB,
+                disk_write_mbps=write_mbps,
+            )
+
+
+class AdmissionController:
+    """
+    按阈值放行或压住排队的任务
+    - 一个任务都没在跑时总是放行，不然队列会永远卡住
+    - 刚放行一个任务后先等 settle_seconds，让它的负载体现出来再做下一次判断，避免一口气全放进去
+    - 阈值为 0 表示不检查这一项
+    """
+    def __init__(self, max_cpu_percent=85, min_free_memory_mb=2048, max_disk_write_mbps=0, settle_seconds=5, sampler=None):
+        self.max_cpu_percent = max_cpu_percent
+        self.min_free_memory_mb = min_free_memory_mb
+        self.max_disk_write_mbps = max_disk_write_mbps
+        self.settle_seconds = settle_seconds
+        self.sampler = sampler or LoadSampler()
+        self.last_load = None
+        self._last_admit = 0.0
+
+    def check(self, vendor, running):
+        """
+        :param vendor: 待开压任务的编码器类别（encode_config.encoder_vendor）
+        :param running: 当前正在跑的任务数
+        :return: (是否放行, 原因)；放行时原因为空串
+        """
+        if running <= 0:
+            return True, ""
+        wait = self.settle_seconds - (time.monotonic() - self._last_admit)
+        if wait > 0:
+            return False, f"上一个任务刚开压，等负载稳定 ({wait:.0f}s)"
+
+        load = self.last_load = self.sampler.sample()
+        # CPU 阈值只管软压任务：硬件编码的重活在显卡上，直通只搬运数据，它们只看内存和磁盘；
+        # 否则一路 libx264 把 CPU 吃满后，排队的 NVENC/AMF/QSV 任务会被一直压到它结束
+        if self.max_cpu_percent and vendor == "cpu" and load.cpu_percent > self.max_cpu_percent:
+            return False, f"CPU 占用 {load.cpu_percent:.0f}% 超过 {self.max_cpu_percent}%"
+        if self.min_free_memory_mb and load.mem_available_mb < self.min_free_memory_mb:
+            return False, f"可用内存 {load.mem_available_mb:.0f} MB 低于 {self.min_free_memory_mb} MB"
+        if self.max_disk_write_mbps and load.disk_write_mbps > self.max_disk_write_mbps:
+            return False, f"磁盘写入 {load.disk_write_mbps:.1f} MB/s 超过 {self.max_disk_write_mbps} MB/s"
+        return True, ""
+
+    def admitted(self):
+        """调用方真正开压了一个任务后调用，开始计 settle 等待"""
+        self._last_admit = time.monotonic()
@@ -0,0 +1,161 @@
+import os, json, sqlite3, threading, time
+from collections import OrderedDict
+from core.utils import get_app_dir
+
+class ProbeCache:
+    """
+    持久化探针缓存：把 ffprobe 的 JSON 结果落盘到 config/probe_cache.db
+    键为 (绝对路径, 文件大小, mtime_ns)，文件被替换/修改后自动失效；超过容量按 LRU 淘汰
+    """
+    # 内存层命中时，距上次写回超过这么多秒才把 last_access 刷回数据库，热点文件不会每次都敲一遍磁盘
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, db_path=None, max_entries=5000, max_memory=256):
+        if db_path is None:
+            db_path = os.path.join(get_app_dir(), "config", "probe_cache.db")
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_memory = max_memory
+        self._lock = threading.Lock()
+        # 本次会话的热点内存层：命中后不再反复敲数据库；同样按 LRU 限量，键 -> (情报, 上次写回 last_access 的时间)
+        self._memory = OrderedDict()
+
+        try:
+            if db_path != ":memory:":
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        except Exception as e:
+            print(f"⚠️ 无法打开探针缓存 {db_path}，本次仅使用内存缓存: {e}")
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " payload TEXT, last_access REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+            # 附属表：镜头切换时间点，同样按 (路径, 大小, mtime_ns) 校验，阈值不同视为没算过
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenes ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " threshold REAL, times TEXT)"
+            )
+
+    @staticmethod
+    def make_key(file_path):
+        """生成缓存键，文件不存在时返回 None"""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        path = os.path.normcase(os.path.abspath(file_path))
+        return (path, st.st_size, st.st_mtime_ns)
+
+    def get(self, file_path):
+        key = self.make_key(file_path)
+        if key is None:
+            return None
+
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                data, touched = hit
+                self._memory.move_to_end(key)
+                now = time.time()
+                if now - touched > self.TOUCH_INTERVAL:
+                    # 热点条目也要刷新数据库里的访问时间，否则落盘的 LRU 会先把最常用的淘汰掉
+                    self._conn.execute("UPDATE entries SET last_access = ? WHERE path = ?", (now, key[0]))
+                    self._memory[key] = (data, now)
+                return data
+
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, payload FROM entries WHERE path = ?", (key[0],)
+            ).fetchone()
+            if row is None:
+                return None
+            if (row[0], row[1]) != key[1:]:
+                # 文件已被替换，旧情报作废
+                self._conn.execute("DELETE FROM entries WHERE path = ?", (key[0],))
+                return None
+            now = time.time()
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE path = ?", (now, key[0]))
+            data = json.loads(row[2])
+            self._remember(key, data, now)
+        return data
+
+    def _remember(self, key, data, touched):
+        """写入内存层（调用方持有锁），超量时丢掉最久没用的"""
+        self._memory[key] = (data, touched)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def put(self, file_path, data):
+        key = self.make_key(file_path)
+        if key is None:
+            return
+
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            now = time.time()
+            self._remember(key, data, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (path, size, mtime_ns, payload, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key[0], key[1], key[2], payload, now)
+            )
+            self._evict()
+
+    def get_scenes(self, file_path, threshold):
+        """读取缓存的镜头切换时间点列表；没算过、文件已变或阈值不同时返回 None"""
+        key = self.make_key(file_path)
+        if key is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, threshold, times FROM scenes WHERE path = ?", (key[0],)
+            ).fetchone()
+        if row is None or (row[0], row[1]) != key[1:] or abs(row[2] - threshold) > 1e-6:
+            return None
+        return json.loads(row[3])
+
+    def put_scenes(self, file_path, threshold, times):
+        key = self.make_key(file_path)
+        if key is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scenes (path, size, mtime_ns, threshold, times) VALUES (?, ?, ?, ?, ?)",
+                (key[0], key[1], key[2], threshold, json.dumps(times, separators=(",", ":")))
+            )
+
+    def _evict(self):
+        """超过容量时，按最近访问时间淘汰最冷的条目"""
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE path IN (SELECT path FROM entries ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._conn.execute("DELETE FROM scenes WHERE path NOT IN (SELECT path FROM entries)")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM scenes")
+
+
+_probe_cache = None
+_probe_cache_lock = threading.Lock()
+
+def get_probe_cache():
+    """全局唯一的探针缓存实例（懒加载）"""
+    global _probe_cache
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            _probe_cache = ProbeCache()
+        return _probe_cache
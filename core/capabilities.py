@@ -0,0 +1,125 @@
+import os, json, time, tempfile, subprocess, threading
+from core.utils import get_ext_path, get_app_dir
+
+# 能力库结构版本：字段含义变化时递增，旧版本文件会被整体作废
+CAPABILITY_SCHEMA_VERSION = 2
+
+
+def read_ffmpeg_version(ffmpeg_path):
+    """读取 ffmpeg -version 的首行，例如 'ffmpeg version 7.1-full_build-www.gyan.dev ...'"""
+    CREATE_NO_WINDOW = 0x08000000
+    try:
+        result = subprocess.run(
+            [ffmpeg_path, "-hide_banner", "-version"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='ignore', creationflags=CREATE_NO_WINDOW, timeout=10
+        )
+        lines = result.stdout.strip().splitlines()
+        return lines[0] if lines else ""
+    except Exception as e:
+        print(f"⚠️ 读取 ffmpeg 版本失败: {e}")
+        return ""
+
+def resolve_identity_version(identity):
+    """补上身份指纹里留空的版本串；会启动一次 ffmpeg -version，只在后台线程里调用"""
+    if identity.get("version"):
+        return identity
+    return dict(identity, version=read_ffmpeg_version(identity["path"]))
+
+
+class CapabilityStore:
+    """
+    硬件能力库：config/capabilities.json，按 ffmpeg 的 (实际路径, 大小, mtime, -version) 身份存放自检结果
+    换了 ffmpeg 之后旧条目自动变成“过期”，调用方可以先用旧结果开窗，再在后台重新自检
+    """
+    def __init__(self, store_path=None):
+        if store_path is None:
+            store_path = os.path.join(get_app_dir(), "config", "capabilities.json")
+        self.store_path = store_path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("schema") == CAPABILITY_SCHEMA_VERSION and isinstance(data.get("entries"), dict):
+                return data
+            print("⚠️ 能力库版本不匹配，已作废旧数据")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ 能力库读取失败，将重新自检: {e}")
+        return {"schema": CAPABILITY_SCHEMA_VERSION, "entries": {}}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+        # 临时文件名每次唯一：两个实例同时保存时各写各的，替换上去的总是一份完整的文件
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.store_path) + ".", suffix=".tmp",
+                                        dir=os.path.dirname(self.store_path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.store_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def get_identity(self, ffmpeg_path=None, read_version=True):
+        """
+        计算当前 ffmpeg 的身份指纹；路径/大小/mtime 与库中记录一致时直接复用记录的版本串，
+        只有二进制真的变了才会多启动一次 ffmpeg -version
+        :param read_version: False 时二进制变了也不启动进程，版本串留空（界面线程用，由后台自检 resolve_identity_version 补上）
+        """
+        path = os.path.realpath(ffmpeg_path or get_ext_path("ffmpeg.exe"))
+        try:
+            st = os.stat(path)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        except OSError:
+            size, mtime_ns = 0, 0
+
+        known = self._data["entries"].get(path, {}).get("identity", {})
+        if known.get("size") == size and known.get("mtime_ns") == mtime_ns and known.get("version"):
+            version = known["version"]
+        elif read_version:
+            version = read_ffmpeg_version(path)
+        else:
+            version = ""
+        return {"path": path, "size": size, "mtime_ns": mtime_ns, "version": version}
+
+    def lookup(self, identity):
+        """
+        :return: (条目, 是否新鲜)。条目不存在时返回 (None, False)；
+                 条目存在但 ffmpeg 身份已变时返回 (旧条目, False)，可作为“上次已知”的结果先用着
+        """
+        with self._lock:
+            entry = self._data["entries"].get(identity["path"])
+        if entry is None:
+            return None, False
+        return entry, entry.get("identity") == identity
+
+    def update(self, identity, **fields):
+        """写入/合并某个 ffmpeg 的能力字段（例如 encoders=[...]），并立即落盘"""
+        with self._lock:
+            entry = self._data["entries"].get(identity["path"])
+            if entry is None or entry.get("identity") != identity:
+                entry = {"identity": identity}
+            entry.update(fields)
+            entry["probed_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._data["entries"][identity["path"]] = entry
+            try:
+                self._save()
+            except Exception as e:
+                print(f"⚠️ 能力库写入失败: {e}")
+        return entry
+
+    def invalidate(self, identity):
+        with self._lock:
+            self._data["entries"].pop(identity["path"], None)
+            try:
+                self._save()
+            except Exception as e:
+                print(f"⚠️ 能力库写入失败: {e}")
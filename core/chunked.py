@@ -0,0 +1,243 @@
+import os, time, bisect, shutil, tempfile, threading, subprocess, psutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from core.utils import get_ext_path
+from core.progress import Progress, ProgressParser, iter_progress_lines, start_log_reader
+
+# =====================================================================
+# 分段并行压制：在关键帧处把片源切成 N 段，各段由独立的 ffmpeg 同时压制，
+# 最后用 concat 分离器无损拼接视频，并从原片一次性混入其余各路流（音轨/字幕/附件）
+# =====================================================================
+
+# 切点落在关键帧之前这么一点点：宁可多解一个 GOP，也不让浮点误差吞掉切点上的那一帧
+SPLIT_EPSILON = 0.0005
+# 每段至少这么长（秒），太碎的话每段开头的码控/前瞻预热开销会吃掉并行收益
+MIN_CHUNK_SECONDS = 20
+
+
+def make_boundary_snapper(scene_times=None, nearest_keyframe=None, max_shift=0.0):
+    """
+    切点吸附规则：优先挪到 max_shift 范围内最近的切镜点（镜头边界上切段，不会在镜头中间出现画质跳变），
+    附近没有切镜点时退回最近的关键帧，两者都没有就原样返回
+    :param scene_times: 升序的切镜时间列表（detect_scenes 的结果）
+    :param nearest_keyframe: t -> 最近关键帧时间，通常是 PacketIndex.nearest_keyframe
+    """
+    def snap(t):
+        if scene_times:
+            i = bisect.bisect_left(scene_times, t)
+            candidates = scene_times[max(i - 1, 0):i + 1]
+            best = min(candidates, key=lambda c: abs(c - t))
+            if abs(best - t) <= max_shift:
+                return best
+        if nearest_keyframe is not None:
+            return nearest_keyframe(t)
+        return t
+    return snap
+
+def plan_chunks(duration, n_chunks, snap=None, min_chunk_seconds=MIN_CHUNK_SECONDS):
+    """
+    把 [0, duration) 均分成 n 段，再把每个切点吸附到镜头边界/关键帧
+    :param snap: (可选) t -> 吸附后的切点，见 make_boundary_snapper；也可以直接传 PacketIndex.nearest_keyframe
+    :return: [(起点, 时长或 None)]，最后一段时长为 None 表示一直压到片尾
+    """
+    n = max(1, min(int(n_chunks), int(duration // min_chunk_seconds)))
+    points = [0.0]
+    for i in range(1, n):
+        t = duration * i / n
+        if snap is not None:
+            t = max(snap(t) - SPLIT_EPSILON, 0.0)
+        # 吸附后可能撞到一起（GOP 比段还长），撞了就合并
+        if t - points[-1] >= min_chunk_seconds / 2 and duration - t >= min_chunk_seconds / 2:
+            points.append(t)
+    chunks = []
+    for i, start in enumerate(points):
+        length = points[i + 1] - start if i + 1 < len(points) else None
+        chunks.append((start, length))
+    return chunks
+
+def split_audio_args(encode_args):
+    """从完整参数里挑出音频相关的部分，留给最终混流那一步使用"""
+    audio = []
+    i = 0
+    while i < len(encode_args):
+        arg = encode_args[i]
+        if arg == "-an":
+            audio.append(arg)
+        elif arg.startswith(("-c:a", "-b:a", "-ar", "-ac", "-af", "-filter:a", "-q:a")) and i + 1 < len(encode_args):
+            audio.extend([arg, encode_args[i + 1]])
+            i += 1
+        i += 1
+    return audio
+
+
+class ChunkedEncoder:
+    """
+    分段并行压制的执行体（不依赖 Qt，benchmark 可以直接用）
+    各段的 -progress 块汇总成一条整体的 Progress 回调，UI 侧无需区分单进程还是分段
+    """
+
+    def __init__(self, input_file, output_file, encode_args, chunks, max_parallel=2, on_log=None, on_progress=None, log_level="warning"):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.encode_args = list(encode_args)
+        self.chunks = chunks
+        self.max_parallel = max(1, int(max_parallel))
+        self.on_log = on_log or print
+        self.on_progress = on_progress
+        self.log_level = log_level
+        self.is_cancelled = False
+        self.error = None
+        self._lock = threading.Lock()
+        self._procs = {}
+        self._chunk_progress = [Progress()] * len(chunks)
+        self._last_lines = []
+        self._started_at = 0.0
+        self._paused = False
+
+    # ---------------- 进度聚合 ----------------
+    def _report(self, chunk_idx=None, record=None, done=False):
+        """记下某一段的最新进度，并回调一条全片汇总：时间/帧/体积相加，倍速按墙钟时间重算"""
+        with self._lock:
+            if record is not None:
+                self._chunk_progress[chunk_idx] = record
+            parts = self._chunk_progress
+            out_time_us = sum(p.out_time_us for p in parts)
+            size = sum(p.size for p in parts)
+            elapsed = max(time.perf_counter() - self._started_at, 1e-6)
+            total = Progress(
+                frame=sum(p.frame for p in parts),
+                fps=sum(p.fps for p in parts),
+                out_time_us=out_time_us,
+                size=size,
+                speed=out_time_us / 1000000 / elapsed,
+                bitrate=size * 8 / 1000 / (out_time_us / 1000000) if out_time_us else 0.0,
+                done=done,
+            )
+        if self.on_progress is not None:
+            self.on_progress(total)
+
+    # ---------------- 单段执行 ----------------
+    def _chunk_path(self, work_dir, idx):
+        return os.path.join(work_dir, f"chunk_{idx:04d}.mkv")
+
+    def _run_chunk(self, work_dir, idx):
+        if self.is_cancelled:
+            return False
+        start, length = self.chunks[idx]
+        cmd = [get_ext_path("ffmpeg.exe"), "-hide_banner", "-loglevel", self.log_level,
+               "-y", "-ss", f"{start:.6f}", "-i", self.input_file]
+        if length is not None:
+            cmd.extend(["-t", f"{length:.6f}"])
+        # 各段只出视频，音轨/字幕在最后混流时从原片整条拿，避免拼接处的音频断层
+        cmd.extend(self.encode_args)
+        cmd.extend(["-an", "-sn", "-dn", self._chunk_path(work_dir, idx), "-progress", "pipe:1", "-nostats"])
+
+        CREATE_NO_WINDOW = 0x08000000
+        # 进度独占 stdout，日志走 stderr 由单独的线程收尾部几行（报错时用）
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                                creationflags=CREATE_NO_WINDOW)
+        with self._lock:
+            self._procs[idx] = proc
+            if self.is_cancelled:
+                proc.kill()
+            elif self._paused:
+                psutil.Process(proc.pid).suspend()
+        log_thread, tail = start_log_reader(proc.stderr)
+        parser = ProgressParser()
+        for line in iter_progress_lines(proc.stdout):
+            _, record = parser.feed(line)
+            if record is not None:
+                # 单段跑完不算全片结束，done 只在最后混流完成时置位
+                self._report(idx, replace(record, done=False))
+        proc.stdout.close()
+        log_thread.join()
+        proc.wait()
+        with self._lock:
+            self._procs.pop(idx, None)
+
+        if proc.returncode != 0 and not self.is_cancelled:
+            with self._lock:
+                self._last_lines = [f"[第 {idx + 1} 段]"] + tail
+            self.stop() # 一段失败，整个任务就没有意义了
+            return False
+        return True
+
+    # ---------------- 总流程 ----------------
+    def run(self):
+        """
+        执行分段压制 -> 拼接 -> 混流
+        :return: 成功返回 True；失败时 self.error 为错误摘要，被取消时 self.is_cancelled 为 True
+        """
+        self._started_at = time.perf_counter()
+        out_dir = os.path.dirname(os.path.abspath(self.output_file))
+        # 分段文件放在输出目录旁边：和成片同一块盘，拼接时不跨盘搬运
+        work_dir = tempfile.mkdtemp(prefix=".ffui_chunks_", dir=out_dir)
+        try:
+            self.on_log(f"🧩 分段并行压制: {len(self.chunks)} 段, 同时 {self.max_parallel} 路")
+            with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="chunk") as executor:
+                results = list(executor.map(lambda i: self._run_chunk(work_dir, i), range(len(self.chunks))))
+            if self.is_cancelled or not all(results):
+                if not self.is_cancelled or self._last_lines:
+                    self.error = "\n".join(self._last_lines) or "分段压制失败"
+                return False
+
+            list_path = os.path.join(work_dir, "concat.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for i in range(len(self.chunks)):
+                    path = self._chunk_path(work_dir, i).replace("\\", "/").replace("'", "'\\''")
+                    f.write(f"file '{path}'\n")
+
+            self.on_log("🔗 正在无损拼接分段并混入音轨...")
+            cmd = [
+                get_ext_path("ffmpeg.exe"), "-y",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-i", self.input_file,
+                # 视频取拼好的分段，其余流（音轨/字幕/附件字体/数据流）原样从原片带过来，和单进程压制的输出一致
+                "-map", "0:v", "-map", "1", "-map", "-1:v",
+                "-c:v", "copy"
+            ] + split_audio_args(self.encode_args) + ["-c:s", "copy", "-c:t", "copy", self.output_file]
+            CREATE_NO_WINDOW = 0x08000000
+            with self._lock:
+                if self.is_cancelled:
+                    return False
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                        text=True, encoding='utf-8', errors='ignore', creationflags=CREATE_NO_WINDOW)
+                self._procs[-1] = proc
+            out, _ = proc.communicate()
+            if proc.returncode != 0:
+                if not self.is_cancelled:
+                    self.error = "拼接失败:\n" + "\n".join(out.strip().splitlines()[-10:])
+                return False
+
+            self._report(done=True)
+            return True
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def stop(self):
+        self.is_cancelled = True
+        with self._lock:
+            procs = list(self._procs.values())
+        for proc in procs:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+
+    def pause(self):
+        with self._lock:
+            self._paused = True
+            for proc in self._procs.values():
+                try:
+                    psutil.Process(proc.pid).suspend()
+                except Exception:
+                    pass
+
+    def resume(self):
+        with self._lock:
+            self._paused = False
+            for proc in self._procs.values():
+                try:
+                    psutil.Process(proc.pid).resume()
+                except Exception:
+                    pass
@@ -0,0 +1,205 @@
+import os, json, time, socket, tempfile, threading
+from core.utils import get_app_dir
+
+# =====================================================================
+# 自适应并发：边压边测“所有任务合计每秒编码多少帧”，按 AIMD 的思路调同时压制的任务数
+# - 加性增：这一档跑满一个测量窗口后，吞吐比上一档涨了，就再多开一路
+# - 乘性减：吞吐不涨反跌，回退到实测最优的那一档并定下来
+# 最优值按 (编码器@分辨率档, 本机) 记进 config/concurrency.json，同类批次下次直接从它开始
+# 只做记账和判断（不依赖 Qt），帧数由界面从 Progress 里累加后喂进来
+# =====================================================================
+
+# 并发记录的结构版本：字段含义变化时递增，旧版本文件会被整体作废
+CONCURRENCY_SCHEMA_VERSION = 1
+
+# 分辨率档：按输出高度归档，相近的分辨率共用一条最优并发记录
+RESOLUTION_BUCKETS = (480, 720, 1080, 1440, 2160)
+
+
+def resolution_bucket(height):
+    """输出高度 -> 分辨率档，例如 1000 -> '1080p'；未知高度归为 'src'"""
+    if not height:
+        return "src"
+    for bucket in RESOLUTION_BUCKETS:
+        if height <= bucket:
+            return f"{bucket}p"
+    return "4320p"
+
+
+def workload_key(config, media=None):
+    """
+    一个任务的负载类别：'编码器@分辨率档'
+    原画输出按片源高度归档，码率阶梯按最高一级算
+    """
+    if config.ladder:
+        height = max(int(res[:-1]) for res, _, _ in config.ladder)
+    else:
+        height = config.target_height or (media.video.height if media is not None and media.video is not None else 0)
+    return f"{config.v_enc}@{resolution_bucket(height)}"
+
+
+def host_key():
+    """本机标识：主机名 + 逻辑核心数，换了机器或核心数变了都不沿用旧记录"""
+    return f"{socket.gethostname()}/{os.cpu_count() or 1}c"
+
+
+class ConcurrencyStore:
+    """最优并发记录：config/concurrency.json，按本机标识再按负载类别存放"""
+    def __init__(self, store_path=None):
+        if store_path is None:
+            store_path = os.path.join(get_app_dir(), "config", "concurrency.json")
+        self.store_path = store_path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("schema") == CONCURRENCY_SCHEMA_VERSION and isinstance(data.get("hosts"), dict):
+                return data
+            print("⚠️ 并发记录版本不匹配，已作废旧数据")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ 并发记录读取失败，将重新测量: {e}")
+        return {"schema": CONCURRENCY_SCHEMA_VERSION, "hosts": {}}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+        # 临时文件名每次唯一：两个实例同时保存时各写各的，替换上去的总是一份完整的文件
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.store_path) + ".", suffix=".tmp",
+                                        dir=os.path.dirname(self.store_path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.store_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def best(self, key, host=None):
+        """:return: 记下的最优并发数，没有记录返回 0"""
+        with self._lock:
+            entry = self._data["hosts"].get(host or host_key(), {}).get(key)
+            return int(entry["best"]) if entry else 0
+
+    def remember(self, key, best, fps, host=None):
+        with self._lock:
+            self._data["hosts"].setdefault(host or host_key(), {})[key] = {
+                "best": int(best), "fps": round(fps, 1), "updated": int(time.time())
+            }
+            try:
+                self._save()
+            except Exception as e:
+                print(f"⚠️ 并发记录保存失败: {e}")
+
+
+class AdaptiveConcurrency:
+    """
+    并发上限控制器：调用方每秒调一次 observe()，按返回的 limit 决定还能不能再开任务
+    只有正在跑的任务数正好等于当前上限时才计入测量（队列不够满时测不出这一档的真实吞吐）；
+    上限刚变、或任务刚开压时先跳过 warmup 秒的预热（ffmpeg 启动、编码器 lookahead 填充）
+    """
+    def __init__(self, max_limit, window_seconds=20, warmup_seconds=5, min_gain=0.05, reprobe_seconds=600, store=None):
+        self.max_limit = max(1, int(max_limit))
+        self.window_seconds = window_seconds
+        self.warmup_seconds = warmup_seconds
+        self.min_gain = min_gain
+        self.reprobe_seconds = reprobe_seconds
+        self.store = store or ConcurrencyStore()
+        self.key = None
+        self.limit = 1
+        self.settled = False
+        self.levels = {}  # 并发数 -> 实测合计 fps
+        self._settled_at = 0.0
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_start = None  # (时间, 累计帧数)
+        self._warm_until = time.monotonic() + self.warmup_seconds
+
+    def _set_limit(self, limit):
+        self.limit = max(1, min(self.max_limit, limit))
+        self._reset_window()
+
+    def set_workload(self, key, max_limit=None):
+        """
+        切换负载类别：有记录就直接从记下的最优值开始并视为已定，没有就从 1 路开始往上试
+        :param max_limit: 这类负载实际能开到的路数（总槽位和各编码器类别的槽位取小），不传则沿用原上限
+        :return: 类别确实变了返回 True
+        """
+        if key == self.key:
+            return False
+        self.key = key
+        if max_limit is not None:
+            self.max_limit = max(1, int(max_limit))
+        self.levels = {}
+        best = self.store.best(key)
+        self.settled = best > 0
+        self._settled_at = time.monotonic()
+        self._set_limit(best or 1)
+        return True
+
+    def job_started(self):
+        """新任务开压：它的预热期不计入测量"""
+        self._reset_window()
+
+    def observe(self, frames_done, running, can_fill=True):
+        """
+        :param frames_done: 到目前为止所有任务合计编出的帧数（只增不减）
+        :param running: 当前正在跑的任务数
+        :param can_fill: 排队里还有能开压的任务；为 False 且没跑满时这一档永远测不到
+        :return: 上限有变化或刚定下来时返回 (新上限, 说明)，否则返回 None
+        """
+        now = time.monotonic()
+        if not self.settled and running < self.limit and not can_fill and self.levels:
+            # 剩下的任务不够开到这一档：按已测的几档定下来，但不记进文件，下一批同类任务再接着测
+            return self._settle(f"排队任务不够开到 {self.limit} 路", remember=False)
+        if running != self.limit or now < self._warm_until:
+            self._window_start = None
+            return None
+        if self._window_start is None:
+            self._window_start = (now, frames_done)
+            return None
+        t0, f0 = self._window_start
+        if now - t0 < self.window_seconds:
+            return None
+
+        fps = (frames_done - f0) / (now - t0)
+        prev = self.levels.get(self.limit)
+        self.levels[self.limit] = fps if prev is None else (prev + fps) / 2
+        self._window_start = (now, frames_done)
+
+        if self.settled:
+            # 定下来之后隔一段时间再试探一次更高的一档，片源或机器负载变了也能跟上
+            if self.reprobe_seconds and now - self._settled_at >= self.reprobe_seconds and self.limit < self.max_limit:
+                self.settled = False
+                self._set_limit(self.limit + 1)
+                return self.limit, f"试探 {self.limit} 路 (当前 {fps:.1f} fps)"
+            return None
+
+        lower = self.levels.get(self.limit - 1)
+        if lower is not None and fps < lower * (1 + self.min_gain):
+            # 多开的这一路没带来足够的吞吐：回退到实测最优的一档
+            return self._settle(f"{self.limit} 路 {fps:.1f} fps 不比 {self.limit - 1} 路 {lower:.1f} fps 快")
+        if self.limit >= self.max_limit:
+            return self._settle(f"已到槽位上限 {self.max_limit} 路")
+        self._set_limit(self.limit + 1)
+        return self.limit, f"{self.limit - 1} 路合计 {fps:.1f} fps，加到 {self.limit} 路"
+
+    def _settle(self, why, remember=True):
+        # 实测最优：从少到多，只有吞吐比当前选中的一档高出 min_gain 才换成更多的路数，收益微薄时宁可少开
+        best = min(self.levels)
+        for n in sorted(self.levels):
+            if self.levels[n] >= self.levels[best] * (1 + self.min_gain):
+                best = n
+        self.settled = True
+        self._settled_at = time.monotonic()
+        self._set_limit(best)
+        if remember:
+            self.store.remember(self.key, best, self.levels[best])
+        return self.limit, f"{why}，定为 {best} 路 ({self.levels[best]:.1f} fps)"
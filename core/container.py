@@ -0,0 +1,354 @@
+import os, mmap, struct
+from collections import Counter
+
+# =====================================================================
+# 纯 Python 容器头解析器：只读文件头部的元数据（MP4 moov / Matroska Info+Tracks / FLV onMetaData），
+# 不启动 ffprobe 子进程。输出与 ffprobe -show_format -show_streams 同构的字典，
+# 解析不了的一律返回 None，由调用方回退到 ffprobe。
+# =====================================================================
+
+MP4_CODECS = {
+    b"avc1": "h264", b"avc3": "h264", b"hvc1": "hevc", b"hev1": "hevc", b"av01": "av1",
+    b"vp09": "vp9", b"vp08": "vp8", b"mp4v": "mpeg4", b"mp4a": "aac", b"Opus": "opus",
+    b"ac-3": "ac3", b"ec-3": "eac3", b"fLaC": "flac", b".mp3": "mp3", b"alac": "alac",
+}
+
+MKV_CODECS = {
+    "V_MPEG4/ISO/AVC": "h264", "V_MPEGH/ISO/HEVC": "hevc", "V_AV1": "av1", "V_VP9": "vp9",
+    "V_VP8": "vp8", "V_MPEG4/ISO/ASP": "mpeg4", "V_MPEG2": "mpeg2video",
+    "A_AAC": "aac", "A_OPUS": "opus", "A_AC3": "ac3", "A_EAC3": "eac3", "A_FLAC": "flac",
+    "A_MPEG/L3": "mp3", "A_VORBIS": "vorbis", "A_DTS": "dts", "A_TRUEHD": "truehd",
+    "S_TEXT/UTF8": "subrip", "S_TEXT/ASS": "ass", "S_HDMV/PGS": "hdmv_pgs_subtitle",
+}
+
+FLV_VIDEO_CODECS = {2: "flv1", 4: "vp6f", 5: "vp6a", 7: "h264", 12: "hevc", 13: "av1"}
+FLV_AUDIO_CODECS = {2: "mp3", 10: "aac", 11: "speex", 13: "opus", 14: "mp3"}
+
+MP4_TOP_LEVEL = (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip", b"pnot")
+
+
+def _fraction(num, den):
+    if not num or not den:
+        return "0/0"
+    return f"{int(num)}/{int(den)}"
+
+def _finish(format_name, file_size, duration, streams):
+    """补齐 format 段并返回 ffprobe 同构字典"""
+    if duration <= 0 or not streams:
+        return None
+    for i, s in enumerate(streams):
+        s["index"] = i
+    return {
+        "format": {
+            "format_name": format_name,
+            "duration": f"{duration:.6f}",
+            "size": str(file_size),
+            "bit_rate": str(int(file_size * 8 / duration)),
+        },
+        "streams": streams,
+    }
+
+
+# ------------------------------ MP4 / MOV ------------------------------
+
+def _iter_boxes(buf, start, end):
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", buf, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", buf, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+def _find_box(buf, start, end, box_type):
+    return next(((s, e) for t, s, e in _iter_boxes(buf, start, end) if t == box_type), None)
+
+def _parse_mp4_trak(buf, start, end):
+    stream = {}
+    tkhd = _find_box(buf, start, end, b"tkhd")
+    if tkhd:
+        p = tkhd[0]
+        off = p + 88 if buf[p] == 1 else p + 76
+        width, height = struct.unpack_from(">II", buf, off)
+        stream["width"], stream["height"] = width >> 16, height >> 16
+
+    mdia = _find_box(buf, start, end, b"mdia")
+    if not mdia:
+        return None
+    mdhd = _find_box(buf, mdia[0], mdia[1], b"mdhd")
+    hdlr = _find_box(buf, mdia[0], mdia[1], b"hdlr")
+    if not mdhd or not hdlr:
+        return None
+
+    p = mdhd[0]
+    if buf[p] == 1:
+        timescale, duration = struct.unpack_from(">IQ", buf, p + 20)
+    else:
+        timescale, duration = struct.unpack_from(">II", buf, p + 12)
+
+    handler = bytes(buf[hdlr[0] + 8:hdlr[0] + 12])
+    stream["codec_type"] = {b"vide": "video", b"soun": "audio", b"sbtl": "subtitle", b"text": "subtitle"}.get(handler, "data")
+    if timescale:
+        stream["duration"] = f"{duration / timescale:.6f}"
+
+    if stream["codec_type"] != "video":
+        stream.pop("width", None)
+        stream.pop("height", None)
+
+    minf = _find_box(buf, mdia[0], mdia[1], b"minf")
+    stbl = _find_box(buf, minf[0], minf[1], b"stbl") if minf else None
+    if not stbl:
+        return stream
+
+    stsd = _find_box(buf, stbl[0], stbl[1], b"stsd")
+    if stsd and struct.unpack_from(">I", buf, stsd[0] + 4)[0] > 0:
+        e = stsd[0] + 8
+        fourcc = bytes(buf[e + 4:e + 8])
+        stream["codec_name"] = MP4_CODECS.get(fourcc, fourcc.decode("latin-1").strip())
+        if stream["codec_type"] == "audio":
+            stream["channels"] = struct.unpack_from(">H", buf, e + 24)[0]
+            stream["sample_rate"] = str(struct.unpack_from(">I", buf, e + 32)[0] >> 16)
+        elif stream["codec_type"] == "video" and not stream.get("width"):
+            stream["width"], stream["height"] = struct.unpack_from(">HH", buf, e + 32)
+
+    stts = _find_box(buf, stbl[0], stbl[1], b"stts")
+    if stts and stream["codec_type"] == "video":
+        count = struct.unpack_from(">I", buf, stts[0] + 4)[0]
+        deltas = Counter()
+        frames = 0
+        for i in range(count):
+            n, delta = struct.unpack_from(">II", buf, stts[0] + 8 + i * 8)
+            deltas[delta] += n
+            frames += n
+        if deltas:
+            # 取出现次数最多的帧间隔作为基准帧率，与 ffprobe 的 r_frame_rate 语义一致
+            stream["r_frame_rate"] = _fraction(timescale, deltas.most_common(1)[0][0])
+            stream["nb_frames"] = str(frames)
+    return stream
+
+def parse_mp4(buf, file_size):
+    moov = _find_box(buf, 0, len(buf), b"moov")
+    if not moov:
+        return None
+
+    duration = 0.0
+    mvhd = _find_box(buf, moov[0], moov[1], b"mvhd")
+    if mvhd:
+        p = mvhd[0]
+        if buf[p] == 1:
+            timescale, dur = struct.unpack_from(">IQ", buf, p + 20)
+        else:
+            timescale, dur = struct.unpack_from(">II", buf, p + 12)
+        duration = dur / timescale if timescale else 0.0
+
+    streams = []
+    for box_type, s, e in _iter_boxes(buf, moov[0], moov[1]):
+        if box_type == b"trak":
+            stream = _parse_mp4_trak(buf, s, e)
+            if stream:
+                streams.append(stream)
+    return _finish("mov,mp4,m4a,3gp,3g2,mj2", file_size, duration, streams)
+
+
+# ------------------------------ Matroska / WebM ------------------------------
+
+EBML_HEADER = 0x1A45DFA3
+MKV_SEGMENT, MKV_INFO, MKV_TRACKS, MKV_CLUSTER = 0x18538067, 0x1549A966, 0x1654AE6B, 0x1F43B675
+
+def _read_vint(buf, pos, keep_marker):
+    first = buf[pos]
+    length, mask = 1, 0x80
+    while length <= 8 and not first & mask:
+        length += 1
+        mask >>= 1
+    if length > 8:
+        raise ValueError("非法的 EBML 变长整数")
+    value = first if keep_marker else first & (mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | buf[pos + i]
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = None  # 未知长度
+    return value, pos + length
+
+def _iter_elements(buf, start, end):
+    pos = start
+    while pos < end:
+        elem_id, pos = _read_vint(buf, pos, True)
+        size, pos = _read_vint(buf, pos, False)
+        elem_end = end if size is None else min(pos + size, end)
+        yield elem_id, pos, elem_end, size is None
+        pos = elem_end
+
+def _ebml_uint(buf, s, e):
+    return int.from_bytes(buf[s:e], "big")
+
+def _ebml_float(buf, s, e):
+    return struct.unpack(">f" if e - s == 4 else ">d", buf[s:e])[0]
+
+def _parse_mkv_track(buf, start, end):
+    stream = {}
+    for elem_id, s, e, _ in _iter_elements(buf, start, end):
+        if elem_id == 0x83:
+            stream["codec_type"] = {1: "video", 2: "audio", 17: "subtitle"}.get(_ebml_uint(buf, s, e), "data")
+        elif elem_id == 0x86:
+            codec_id = bytes(buf[s:e]).decode("ascii", "replace").rstrip("\x00")
+            stream["codec_name"] = MKV_CODECS.get(codec_id, codec_id.split("/")[0][2:].lower())
+        elif elem_id == 0x23E383:
+            stream["r_frame_rate"] = _fraction(1000000000, _ebml_uint(buf, s, e))
+        elif elem_id == 0xE0:
+            for sub_id, ss, se, _ in _iter_elements(buf, s, e):
+                if sub_id == 0xB0:
+                    stream["width"] = _ebml_uint(buf, ss, se)
+                elif sub_id == 0xBA:
+                    stream["height"] = _ebml_uint(buf, ss, se)
+        elif elem_id == 0xE1:
+            for sub_id, ss, se, _ in _iter_elements(buf, s, e):
+                if sub_id == 0xB5:
+                    stream["sample_rate"] = str(int(_ebml_float(buf, ss, se)))
+                elif sub_id == 0x9F:
+                    stream["channels"] = _ebml_uint(buf, ss, se)
+    return stream if "codec_type" in stream else None
+
+def parse_matroska(buf, file_size):
+    header_id, pos = _read_vint(buf, 0, True)
+    if header_id != EBML_HEADER:
+        return None
+    size, pos = _read_vint(buf, pos, False)
+    pos += size
+
+    segment_id, pos = _read_vint(buf, pos, True)
+    if segment_id != MKV_SEGMENT:
+        return None
+    size, pos = _read_vint(buf, pos, False)
+    seg_end = len(buf) if size is None else min(pos + size, len(buf))
+
+    scale, duration, streams = 1000000, 0.0, None
+    for elem_id, s, e, unknown in _iter_elements(buf, pos, seg_end):
+        if elem_id == MKV_INFO:
+            for sub_id, ss, se, _ in _iter_elements(buf, s, e):
+                if sub_id == 0x2AD7B1:
+                    scale = _ebml_uint(buf, ss, se)
+                elif sub_id == 0x4489:
+                    duration = _ebml_float(buf, ss, se)
+        elif elem_id == MKV_TRACKS:
+            streams = [t for t in (_parse_mkv_track(buf, ts, te)
+                                   for tid, ts, te, _ in _iter_elements(buf, s, e) if tid == 0xAE) if t]
+        # 一旦进入数据簇（或遇到未知长度的元素）就停止，只读文件头
+        if elem_id == MKV_CLUSTER or unknown or (streams is not None and duration):
+            break
+
+    if not streams:
+        return None
+    return _finish("matroska,webm", file_size, duration * scale / 1e9, streams)
+
+
+# ------------------------------ FLV ------------------------------
+
+def _amf_value(buf, pos):
+    t = buf[pos]
+    pos += 1
+    if t == 0:
+        return struct.unpack_from(">d", buf, pos)[0], pos + 8
+    if t == 1:
+        return buf[pos] != 0, pos + 1
+    if t == 2:
+        n = struct.unpack_from(">H", buf, pos)[0]
+        return bytes(buf[pos + 2:pos + 2 + n]).decode("utf-8", "replace"), pos + 2 + n
+    if t == 12:
+        n = struct.unpack_from(">I", buf, pos)[0]
+        return bytes(buf[pos + 4:pos + 4 + n]).decode("utf-8", "replace"), pos + 4 + n
+    if t in (3, 8):
+        if t == 8:
+            pos += 4  # ECMA 数组的元素个数并不可靠，以结束标记为准
+        obj = {}
+        while True:
+            n = struct.unpack_from(">H", buf, pos)[0]
+            if n == 0 and buf[pos + 2] == 9:
+                return obj, pos + 3
+            key = bytes(buf[pos + 2:pos + 2 + n]).decode("utf-8", "replace")
+            obj[key], pos = _amf_value(buf, pos + 2 + n)
+    if t == 10:
+        n = struct.unpack_from(">I", buf, pos)[0]
+        pos += 4
+        items = []
+        for _ in range(n):
+            item, pos = _amf_value(buf, pos)
+            items.append(item)
+        return items, pos
+    if t == 11:
+        return struct.unpack_from(">d", buf, pos)[0], pos + 10
+    if t in (5, 6):
+        return None, pos
+    raise ValueError(f"不支持的 AMF0 类型: {t}")
+
+def _flv_codec(value, table):
+    if isinstance(value, str):
+        return MP4_CODECS.get(value.encode("latin-1"), value)
+    return table.get(int(value or 0), "")
+
+def parse_flv(buf, file_size):
+    if bytes(buf[:3]) != b"FLV":
+        return None
+    pos = struct.unpack_from(">I", buf, 5)[0] + 4  # 跳过 FLV 头与 PreviousTagSize0
+    if pos + 11 > len(buf) or buf[pos] != 18:
+        return None
+    data_size = int.from_bytes(buf[pos + 1:pos + 4], "big")
+    body = pos + 11
+
+    name, p = _amf_value(buf, body)
+    if name != "onMetaData" or p >= body + data_size:
+        return None
+    meta, _ = _amf_value(buf, p)
+    if not isinstance(meta, dict):
+        return None
+
+    streams = []
+    if meta.get("width") or meta.get("videocodecid") is not None:
+        fps = meta.get("framerate") or 0
+        streams.append({
+            "codec_type": "video",
+            "codec_name": _flv_codec(meta.get("videocodecid"), FLV_VIDEO_CODECS),
+            "width": int(meta.get("width") or 0),
+            "height": int(meta.get("height") or 0),
+            "r_frame_rate": _fraction(round(fps * 1000), 1000) if fps else "0/0",
+            "bit_rate": str(int((meta.get("videodatarate") or 0) * 1000)),
+        })
+    if meta.get("audiocodecid") is not None or meta.get("audiosamplerate"):
+        streams.append({
+            "codec_type": "audio",
+            "codec_name": _flv_codec(meta.get("audiocodecid"), FLV_AUDIO_CODECS),
+            "sample_rate": str(int(meta.get("audiosamplerate") or 0)),
+            "channels": 2 if meta.get("stereo") else 1,
+            "bit_rate": str(int((meta.get("audiodatarate") or 0) * 1000)),
+        })
+    return _finish("flv", file_size, float(meta.get("duration") or 0), streams)
+
+
+# ------------------------------ 入口 ------------------------------
+
+def parse_container_header(file_path):
+    """
+    内存映射方式读取容器头，返回 ffprobe 同构字典；无法识别或解析失败时返回 None
+    """
+    try:
+        with open(file_path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            if file_size < 16:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                magic = bytes(buf[:12])
+                if magic[:4] == b"\x1a\x45\xdf\xa3":
+                    return parse_matroska(buf, file_size)
+                if magic[:3] == b"FLV":
+                    return parse_flv(buf, file_size)
+                if magic[4:8] in MP4_TOP_LEVEL:
+                    return parse_mp4(buf, file_size)
+    except Exception as e:
+        print(f"⚠️ 容器头解析失败，回退到 ffprobe: {file_path} ({e})")
+    return None
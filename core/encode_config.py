@@ -0,0 +1,152 @@
+import re
+import shlex
+from dataclasses import dataclass, replace, asdict
+
+# 编码器 -> 参数方言。码控参数按厂商翻译，不再靠 "nvenc" in v_enc 这种子串猜测
+ENCODER_VENDORS = {
+    "av1_nvenc": "nvenc", "hevc_nvenc": "nvenc", "h264_nvenc": "nvenc",
+    "av1_amf": "amf", "hevc_amf": "amf", "h264_amf": "amf",
+    "av1_qsv": "qsv", "hevc_qsv": "qsv", "h264_qsv": "qsv",
+    "libsvtav1": "cpu", "libaom-av1": "cpu", "librav1e": "cpu",
+    "libx265": "cpu", "libvpx-vp9": "cpu", "libx264": "cpu",
+    "copy": "copy",
+}
+
+RC_MODES = ("cqp", "vbr", "cbr", "2pass")
+KEEP_SOURCE = "保持源"
+RES_PATTERN = re.compile(r"^\d+p$")
+
+
+class EncodeConfigError(ValueError):
+    """UI 状态无法组成合法的压制配置（入队时就拦下，不等到 ffmpeg 启动）"""
+
+
+def encoder_vendor(v_enc):
+    """查表得到编码器的参数方言；表外的编码器按 ffmpeg 的命名后缀推断，其余一律按软压处理"""
+    if v_enc in ENCODER_VENDORS:
+        return ENCODER_VENDORS[v_enc]
+    suffix = v_enc.rsplit("_", 1)[-1]
+    return suffix if suffix in ("nvenc", "amf", "qsv") else "cpu"
+
+
+@dataclass(frozen=True)
+class EncodeConfig:
+    """
+    一次压制的完整参数：不可变、可哈希，构造时校验一次
+    相同的配置在整个进程里只翻译一次命令行（见 engine.compile_encode_args）
+    """
+    v_enc: str
+    fps: str = KEEP_SOURCE
+    res: str = KEEP_SOURCE
+    rc: str = "cqp"
+    cqp_val: int = 28
+    vbr_cbr_val: int = 2000
+    a_enc: str = "aac"
+    a_bit: str = "128k"
+    a_sample: str = KEEP_SOURCE
+    extra_args: tuple = ()
+    pix_fmt: str = ""  # 由能力矩阵按片源补上的像素格式转换，UI 上不可见
+    fps_up: bool = False  # 目标帧率高于片源（补帧），由 adapt_config_to_media 按片源标记
+    threads: int = 0  # 线程预算分给本任务的核心数，0 表示不限制（交给编码器自己决定）
+    auto_copy: bool = True  # 片源已满足目标时自动降级为直通 (-c copy)，预设可用 auto_copy: false 关闭
+    ladder: tuple = ()  # 码率阶梯：((分辨率, 数值, 文件名后缀), ...)，非空时一次解码输出多路
+
+    def __post_init__(self):
+        if not self.v_enc:
+            raise EncodeConfigError("未选择视频编码器")
+        if self.rc not in RC_MODES:
+            raise EncodeConfigError(f"未知的码控模式: {self.rc}")
+        if self.fps != KEEP_SOURCE:
+            try:
+                if float(self.fps) <= 0:
+                    raise ValueError
+            except ValueError:
+                raise EncodeConfigError(f"非法的帧率: {self.fps}")
+        if self.res != KEEP_SOURCE and not RES_PATTERN.match(self.res):
+            raise EncodeConfigError(f"非法的分辨率: {self.res}")
+        if self.rc == "cqp" and not 0 <= self.cqp_val <= 63:
+            raise EncodeConfigError(f"CQP 数值超出范围 (0-63): {self.cqp_val}")
+        if self.rc != "cqp" and self.vbr_cbr_val <= 0:
+            raise EncodeConfigError(f"非法的目标码率: {self.vbr_cbr_val}")
+        if self.threads < 0:
+            raise EncodeConfigError(f"非法的线程数: {self.threads}")
+        if not isinstance(self.extra_args, tuple):
+            raise EncodeConfigError("extra_args 必须是已拆分好的参数元组")
+        if "-filter_complex" in self.extra_args or "-lavfi" in self.extra_args:
+            raise EncodeConfigError("附加参数不支持 -filter_complex，请改用 -vf（会并入内置的滤镜链）")
+        if self.ladder and self.v_enc == "copy":
+            raise EncodeConfigError("码率阶梯要按各级分辨率重新压制，不能和 copy 直通一起用")
+        suffixes = set()
+        for res, val, suffix in self.ladder:
+            if not RES_PATTERN.match(res):
+                raise EncodeConfigError(f"码率阶梯里有非法的分辨率: {res}")
+            if (self.rc == "cqp" and not 0 <= val <= 63) or (self.rc != "cqp" and val <= 0):
+                raise EncodeConfigError(f"码率阶梯 {res} 的数值非法: {val}")
+            if suffix in suffixes:
+                raise EncodeConfigError(f"码率阶梯的文件名后缀重复: {suffix}")
+            suffixes.add(suffix)
+
+    @property
+    def vendor(self):
+        return encoder_vendor(self.v_enc)
+
+    @property
+    def target_height(self):
+        """目标高度；保持源时返回 0"""
+        return int(self.res[:-1]) if self.res != KEEP_SOURCE else 0
+
+    @classmethod
+    def from_ui_state(cls, state):
+        """
+        从 UI 状态字典构造配置：类型归一化 + 附加参数只拆分一次
+        :raises EncodeConfigError: 状态字典里有非法组合
+        """
+        extra = state.get("extra_args", "")
+        if isinstance(extra, str):
+            try:
+                extra = shlex.split(extra.strip())
+            except ValueError as e:
+                raise EncodeConfigError(f"附加参数解析失败: {e}")
+        try:
+            ladder = tuple(cls._parse_rung(r, state) for r in state.get("ladder") or ())
+            return cls(
+                v_enc=state["v_enc"],
+                fps=str(state.get("fps", KEEP_SOURCE)),
+                res=str(state.get("res", KEEP_SOURCE)),
+                rc=state.get("rc", "cqp"),
+                cqp_val=int(state.get("cqp_val", 28)),
+                vbr_cbr_val=int(state.get("vbr_cbr_val", 2000)),
+                a_enc=state.get("a_enc", "aac"),
+                a_bit=state.get("a_bit", "128k"),
+                a_sample=str(state.get("a_sample", KEEP_SOURCE)),
+                extra_args=tuple(extra),
+                auto_copy=bool(state.get("auto_copy", True)),
+                ladder=ladder,
+            )
+        except EncodeConfigError:
+            raise
+        except (KeyError, TypeError, ValueError) as e:
+            raise EncodeConfigError(f"压制配置不完整: {e}")
+
+    @staticmethod
+    def _parse_rung(rung, state):
+        """presets.yaml 里的一级阶梯 {res, val, suffix} -> (分辨率, 数值, 后缀)；val 缺省沿用主配置的数值"""
+        if not isinstance(rung, dict):
+            res, val, suffix = rung
+            return str(res), int(val), str(suffix)
+        res = str(rung["res"])
+        default_val = state.get("cqp_val", 28) if state.get("rc", "cqp") == "cqp" else state.get("vbr_cbr_val", 2000)
+        return res, int(rung.get("val", default_val)), str(rung.get("suffix", f"_{res}"))
+
+    def to_ui_state(self):
+        """还原成 UI 状态字典（附加参数重新拼回字符串）"""
+        state = asdict(self)
+        state["extra_args"] = shlex.join(self.extra_args)
+        state["ladder"] = [{"res": res, "val": val, "suffix": suffix} for res, val, suffix in self.ladder]
+        state.pop("pix_fmt")
+        state.pop("fps_up")
+        state.pop("threads")
+        return state
+
+    def replace(self, **changes):
+        return replace(self, **changes)
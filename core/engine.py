@@ -1,22 +1,145 @@
+import os
+import re
 import json
+import time
+import tempfile
 import subprocess
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from core.utils import get_ext_path
+from core.cache import get_probe_cache
+from core.media import MediaInfo, format_media_info
+from core.container import parse_container_header
+from core.registry import get_tool_registry
+from core.encode_config import EncodeConfig, EncodeConfigError, KEEP_SOURCE
+from core.thread_budget import split_threads
 
-def build_ffmpeg_args(config):
+# 推算关键帧间隔时，从片头采样的时长（秒）
+KEYFRAME_SAMPLE_SECONDS = 20
+
+# 探测深度排位：数值越大情报越完整，缓存里更深的结果可以直接满足更浅的请求
+#   header: 纯 Python 读容器头      fast: 限制读取量的 ffprobe（超长 TS / 网络盘）
+#   full:   默认 ffprobe            deep: 逐帧解码计数，拿到精确帧数
+PROBE_MODE_RANK = {"header": 0, "fast": 1, "full": 2, "deep": 3}
+
+# 点火自检的候选编码器（顺序即 UI 下拉菜单里的推荐顺序）
+CANDIDATE_ENCODERS = [
+    "av1_nvenc", "hevc_nvenc", "h264_nvenc", # NVIDIA
+    "av1_amf", "hevc_amf", "h264_amf",       # AMD
+    "av1_qsv", "hevc_qsv", "h264_qsv",       # Intel
+    "libsvtav1", "libaom-av1", "librav1e",   # AV1 CPU 编队
+    "libx265", "libvpx-vp9", "libx264"       # 主流软压
+]
+
+# 并行点火自检的全局时限（秒）：单个编码器自带 5 秒超时，整体不会超过这个值
+ENCODER_PROBE_DEADLINE = 15
+
+# 能力矩阵：每个可用编码器逐项点火的码控模式、像素格式、Profile 与分辨率档位
+MATRIX_RC_MODES = ["cqp", "vbr", "cbr", "2pass"]
+MATRIX_PIX_FMTS = ["yuv420p", "nv12", "yuv420p10le", "p010le", "yuv444p"]
+MATRIX_PROFILES = {
+    "h264": ["baseline", "main", "high"],
+    "hevc": ["main", "main10"],
+    "av1": ["main"],
+}
+MATRIX_HEIGHTS = [1080, 2160, 4320]
+
+# 两遍编码：支持外部统计文件 (-pass 1/2) 的软压编码器，以及第一遍额外追加的提速参数
+# 第一遍只用来收集码率分布，画质无所谓，能多快就多快（x264 默认就会自动降档，x265 单独关掉 slow-firstpass）
+TWO_PASS_FIRST_PASS_ARGS = {
+    "libx264": [],
+    "libx265": [],
+    "libvpx-vp9": ["-speed", "4"],
+    "libaom-av1": ["-cpu-used", "6"],
+    "librav1e": ["-speed", "10"],
+}
+# 统计文件名（相对路径）：每个任务的子进程都在自己独立的临时目录里运行，同名也不会互相覆盖
+TWO_PASS_LOG_NAME = "ffui2pass"
+
+# 镜头切换分析：只解关键帧、缩到这么高再算 scene 分数，超过阈值即视为切镜
+SCENE_THRESHOLD = 0.35
+SCENE_ANALYSIS_HEIGHT = 180
+SCENE_TIME_PATTERN = re.compile(r"pts_time:(-?\d+(?:\.\d+)?)")
+
+# 滤镜链：按类别决定能否提前。去隔行/裁剪/丢帧放在缩放之前，少处理像素和帧数
+DEINTERLACE_FILTERS = {"yadif", "bwdif", "w3fdif", "estdif", "kerndeint", "nnedi", "yadif_cuda", "bwdif_cuda"}
+CROP_FILTERS = {"crop"}
+FRAME_DROP_FILTERS = {"fps", "framestep", "select", "decimate", "mpdecimate"}
+# 会改写时间轴或依赖相邻帧的滤镜：链里有它们时，内置的帧率转换只能放在最后（与旧的 -r 语义一致）
+TIMING_FILTERS = {"setpts", "framerate", "minterpolate", "tmix", "tblend", "select", "fps", "framestep",
+                  "decimate", "mpdecimate", "loop", "reverse", "trim", "tpad", "telecine", "fieldmatch"}
+# 滤镜图线程数：swscale 等按切片并行，占一半核心，剩下的留给编码器（有线程预算时按份额再减半）
+FILTER_THREADS = max(1, min(16, (os.cpu_count() or 1) // 2))
+# 主视频走滤镜出口时，其余的流照旧全部带上：先映射整个输入，再去掉已经由滤镜接管的第一路视频
+FILTERED_REST_MAPS = ["-map", "0", "-map", "-0:v:0"]
+
+# 线程份额 -> 编码器参数的翻译方式：
+#   threads: 通用的 -threads N（vp9/aom 再开行级多线程，否则多出来的线程用不上）
+#   x265:    -x265-params pools=N:frame-threads=F     svtav1: -svtav1-params lp=N
+ENCODER_THREAD_STYLE = {
+    "libx264": "threads", "librav1e": "threads",
+    "libvpx-vp9": "threads+row-mt", "libaom-av1": "threads+row-mt",
+    "libx265": "x265", "libsvtav1": "svtav1",
+}
+
+# fast 模式的读取上限：探测缓冲、分析时长（微秒）与关键帧采样时长（秒）
+FAST_PROBE_SIZE = "5M"
+FAST_ANALYZE_DURATION = 2000000
+FAST_SAMPLE_SECONDS = 5
+
+def as_encode_config(config):
+    """兼容入口：旧代码传 UI 状态字典，新代码直接传 EncodeConfig"""
+    if isinstance(config, EncodeConfig):
+        return config
+    return EncodeConfig.from_ui_state(config)
+
+def adapt_config_to_media(config, media=None, caps=None):
     """
-    纯净的参数翻译引擎：不再依赖任何 UI 控件，只负责把字典翻译成命令行
-    :param config: 包含所有 UI 状态的字典
+    按片源做的调整全部落在配置层：省掉与片源一致的帧率/缩放，补上能力矩阵要求的像素格式
+    结果仍是 EncodeConfig，同类片源会收敛到同一个配置，命中同一份编译缓存
+    """
+    src_video = media.video if media is not None else None
+    if src_video is None or config.v_enc == "copy":
+        return config
+
+    changes = {}
+    if config.fps != KEEP_SOURCE and abs(src_video.fps - float(config.fps)) < 0.01:
+        changes["fps"] = KEEP_SOURCE # 片源帧率本来就是目标值，不必再插一道帧率转换
+    if config.res != KEEP_SOURCE and src_video.height == config.target_height:
+        changes["res"] = KEEP_SOURCE # 片源高度已经达标，省掉一次空转的 scale
+    if changes.get("fps", config.fps) != KEEP_SOURCE and src_video.fps and float(config.fps) > src_video.fps:
+        changes["fps_up"] = True # 补帧：帧率转换挪到缩放之后，先缩小再复制帧
+
+    if caps and src_video.pix_fmt and config.v_enc not in ("h264_nvenc", "h264_amf") and "-pix_fmt" not in config.extra_args:
+        pix_fmt = pick_supported_pix_fmt(src_video.pix_fmt, caps.get("pix_fmts", []))
+        if pix_fmt and pix_fmt != src_video.pix_fmt:
+            changes["pix_fmt"] = pix_fmt
+    return config.replace(**changes) if changes else config
+
+@lru_cache(maxsize=256)
+def compile_encode_args(config):
+    """
+    纯净的参数翻译引擎：不再依赖任何 UI 控件，只负责把 EncodeConfig 翻译成命令行
+    配置不可变，同一份配置整个进程只翻译一次；返回元组，调用方不能改坏缓存
     """
     args = []
-    
-    # 强制映射所有流（视频、所有音轨、字幕）
-    args.extend(["-map", "0"])
+    extra_args, user_filters = split_user_filters(config.extra_args)
 
-    v_enc = config["v_enc"]
-    is_nvenc = "nvenc" in v_enc
-    is_amf = "amf" in v_enc
-    is_qsv = "qsv" in v_enc
-    is_cpu = "lib" in v_enc
+    v_enc = config.v_enc
+    pre, scale, post = plan_video_filters(config, user_filters) if v_enc != "copy" else ([], None, [])
+    chain = pre + ([scale] if scale else []) + post
+    if chain:
+        # 缩放/帧率/裁剪/用户滤镜合成一条链，主视频走滤镜出口；
+        # 其余的流（音轨、字幕、附件字体、数据流、其他视频流）与不走滤镜时的 -map 0 完全一致
+        filter_threads = min(FILTER_THREADS, max(1, config.threads // 2)) if config.threads else FILTER_THREADS
+        args.extend(["-filter_complex_threads", str(filter_threads),
+                     "-filter_complex", f"[0:v:0]{','.join(chain)}[vout]",
+                     "-map", "[vout]"] + FILTERED_REST_MAPS)
+    else:
+        # 不需要滤镜时强制映射所有流（视频、所有音轨、字幕）
+        args.extend(["-map", "0"])
+
+    vendor = config.vendor
 
     # --- 视频编码部分 ---
     if v_enc == "copy":
@@ -27,145 +150,627 @@ def build_ffmpeg_args(config):
         # NVIDIA / AMD 硬件 H264 的护城河
         if v_enc in ["h264_nvenc", "h264_amf"]:
             args.extend(["-pix_fmt", "yuv420p", "-profile:v", "high"])
+        elif config.pix_fmt:
+            args.extend(["-pix_fmt", config.pix_fmt])
         
-        # 帧率处理
-        fps = config["fps"]
-        if fps != "保持源": 
-            args.extend(["-r", fps])
-        
-        # 分辨率处理
-        res = config["res"]
-        if res == "1080p": args.extend(["-vf", "scale=-1:1080"])
-        elif res == "720p": args.extend(["-vf", "scale=-1:720"])
-        elif res == "2160p": args.extend(["-vf", "scale=-1:2160"])
-        elif res == "1440p": args.extend(["-vf", "scale=-1:1440"])
-            
         # --- 码率控制适配 ---
-        rc = config["rc"]
+        rc = config.rc
         
         if rc == "cqp":
-            val = str(config["cqp_val"]) 
-            if is_nvenc:
+            val = str(config.cqp_val) 
+            if vendor == "nvenc":
                 args.extend(["-rc", "vbr", "-cq", val, "-b:v", "0"])
-            elif is_amf:
+            elif vendor == "amf":
                 args.extend(["-rc", "cqp", "-qp_i", val, "-qp_p", val])
-            elif is_qsv:
+            elif vendor == "qsv":
                 args.extend(["-global_quality", val])
             else:
                 args.extend(["-crf", val])
                 
         elif rc == "vbr":
-            val = f"{config['vbr_cbr_val']}k"
-            if is_nvenc:
+            val = f"{config.vbr_cbr_val}k"
+            if vendor == "nvenc":
                 args.extend(["-rc", "vbr", "-b:v", val, "-maxrate:v", val, "-bufsize:v", val])
-            elif is_amf:
+            elif vendor == "amf":
                 args.extend(["-rc", "vbr_peak", "-b:v", val])
             else:
                 args.extend(["-b:v", val])
                 
         elif rc == "cbr":
-            val = f"{config['vbr_cbr_val']}k"
-            if is_nvenc:
+            val = f"{config.vbr_cbr_val}k"
+            if vendor == "nvenc":
                 args.extend(["-rc", "cbr", "-b:v", val, "-maxrate:v", val, "-bufsize:v", val])
-            elif is_amf:
+            elif vendor == "amf":
                 args.extend(["-rc", "cbr", "-b:v", val])
             else:
                 args.extend(["-b:v", val, "-maxrate:v", val, "-bufsize:v", val])
 
+        elif rc == "2pass":
+            # 硬件编码器没有外部两遍，换成各家的内置多遍/预分析；软压的 -pass 1/2 由 build_two_pass_args 拆分
+            val = f"{config.vbr_cbr_val}k"
+            if vendor == "nvenc":
+                args.extend(["-rc", "vbr", "-multipass", "qres", "-b:v", val, "-maxrate:v", val, "-bufsize:v", val])
+            elif vendor == "amf":
+                args.extend(["-rc", "vbr_peak", "-preanalysis", "true", "-b:v", val])
+            elif vendor == "qsv":
+                args.extend(["-b:v", val, "-extbrc", "1", "-look_ahead_depth", "40"])
+            else:
+                args.extend(["-b:v", val])
+
     # --- 音频部分 ---
-    a_enc = config["a_enc"]
+    a_enc = config.a_enc
     if "剥离静音" in a_enc: 
         args.extend(["-an"])
     elif a_enc == "copy": 
         args.extend(["-c:a", "copy"])
     else:
         args.extend(["-c:a", a_enc])
-        ab = config["a_bit"]
-        args.extend(["-b:a", ab])
-        ar = config["a_sample"]
-        if ar != "保持源": 
-            args.extend(["-ar", ar])
+        args.extend(["-b:a", config.a_bit])
+        if config.a_sample != KEEP_SOURCE: 
+            args.extend(["-ar", config.a_sample])
 
     # --- 字幕部分 ---
     # 默认直接 copy 字幕流，避免复杂内嵌
     args.extend(["-c:s", "copy"])
 
-    # --- 自定义动态配置项部分 ---
-    extra_args_str = config.get("extra_args", "").strip()
-    if extra_args_str:
-        import shlex
-        try:
-            extra = shlex.split(extra_args_str)
-            args.extend(extra)
-        except Exception as e:
-            print(f"解析附加参数失败: {e}")
+    # --- 线程份额：放在附加参数之前，用户手写的 -threads 照样以后者为准 ---
+    args.extend(encoder_thread_args(v_enc, config.threads, extra_args))
+
+    # --- 自定义动态配置项部分（构造 EncodeConfig 时已拆分好；-vf 已并入上面的滤镜链） ---
+    args.extend(extra_args)
+
+    # x265 / SVT-AV1 的线程数写在各自的私有参数里，只能合并进用户那一份
+    style = ENCODER_THREAD_STYLE.get(v_enc)
+    if config.threads and style == "x265":
+        args = _with_codec_params(args, "-x265-params", _x265_thread_params(config.threads), skip_keys=("pools", "frame-threads"))
+    elif config.threads and style == "svtav1":
+        args = _with_codec_params(args, "-svtav1-params", f"lp={config.threads}", skip_keys=("lp",))
+
+    return tuple(args)
+
+def _x265_thread_params(threads):
+    """x265 的线程池大小 = 份额；帧级并行数随份额递增（x265 自己也是按核数这么估的）"""
+    frame_threads = 1 if threads <= 2 else 2 if threads <= 6 else 3 if threads <= 12 else 4
+    return f"pools={threads}:frame-threads={frame_threads}"
 
+def encoder_thread_args(v_enc, threads, extra_args=()):
+    """
+    把线程份额翻译成通用 -threads 风格的参数；x265/SVT-AV1 的私有参数由 compile_encode_args 合并
+    :return: 参数列表；不限制线程、硬件编码器或用户已手写 -threads 时返回空列表
+    """
+    style = ENCODER_THREAD_STYLE.get(v_enc, "")
+    if not threads or not style.startswith("threads") or "-threads" in extra_args:
+        return []
+    args = ["-threads", str(threads)]
+    if style == "threads+row-mt" and "-row-mt" not in extra_args:
+        args.extend(["-row-mt", "1"])
     return args
 
-def get_video_duration(file_path):
-    cmd = [
-        get_ext_path("ffprobe.exe"), "-v", "error", 
-        "-show_entries", "format=duration", 
-        "-of", "default=noprint_wrappers=1:nokey=1", 
-        file_path
-    ]
+def _split_filter_chain(chain):
+    """按顶层逗号拆分滤镜链，引号和反斜杠转义里的逗号不算"""
+    filters, buf, quote, escaped = [], [], False, False
+    for ch in chain:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == "'":
+            quote = not quote
+        elif ch == "," and not quote:
+            filters.append("".join(buf).strip())
+            buf = []
+            continue
+        buf.append(ch)
+    filters.append("".join(buf).strip())
+    return [f for f in filters if f]
+
+def _filter_name(f):
+    return re.split(r"[=@]", f, maxsplit=1)[0].strip()
+
+def split_user_filters(extra_args):
+    """
+    从附加参数里摘出 -vf / -filter:v，交给滤镜链统一排布（以前它会整个顶掉内置的缩放）
+    :return: (剩余的附加参数元组, 用户滤镜列表)
+    """
+    rest, filters = [], []
+    i = 0
+    while i < len(extra_args):
+        arg = extra_args[i]
+        if arg in ("-vf", "-filter:v", "-filter:v:0") and i + 1 < len(extra_args):
+            chain = extra_args[i + 1]
+            # 带标签或分号的是完整滤镜图，拆不开，整体当成一个滤镜放在最后
+            filters.extend([chain] if ("[" in chain or ";" in chain) else _split_filter_chain(chain))
+            i += 2
+            continue
+        rest.append(arg)
+        i += 1
+    return tuple(rest), filters
+
+def plan_video_filters(config, user_filters=()):
+    """
+    排布视频滤镜链，让每一步处理的像素和帧都尽量少：
+      1. 用户链开头连续的去隔行/裁剪/丢帧滤镜提到最前（语义不变，只是不再被挪到缩放之后）
+      2. 内置帧率转换紧随其后：先丢帧再缩放；补帧、或者后面还有改时间轴的滤镜时放到最后
+      3. 内置缩放
+      4. 其余用户滤镜保持原顺序，在缩小后的画面上跑
+    :return: (缩放前的滤镜列表, 缩放滤镜或 None, 缩放后的滤镜列表)；码率阶梯在缩放处分叉
+    """
+    user_filters = list(user_filters)
+    hoistable = DEINTERLACE_FILTERS | CROP_FILTERS | FRAME_DROP_FILTERS
+    n_lead = 0
+    while n_lead < len(user_filters) and _filter_name(user_filters[n_lead]) in hoistable:
+        n_lead += 1
+    pre, post = user_filters[:n_lead], user_filters[n_lead:]
+
+    if config.fps != KEEP_SOURCE:
+        fps_filter = f"fps={config.fps}"
+        if config.fps_up or any(_filter_name(f) in TIMING_FILTERS for f in post):
+            post.append(fps_filter)
+        else:
+            pre.append(fps_filter)
+
+    scale = f"scale=-2:{config.target_height}" if config.res != KEEP_SOURCE else None
+    return pre, scale, post
+
+def required_filters(config):
+    """
+    编译出的滤镜图会用到的滤镜名（内置的缩放/帧率、码率阶梯的分叉，加上用户 -vf 里的），供开压前对照编译清单
+    带标签或分号的完整滤镜图拆不开，不参与检查
+    """
+    if config.v_enc == "copy":
+        return []
+    pre, scale, post = plan_video_filters(config, split_user_filters(config.extra_args)[1])
+    names = [_filter_name(f) for f in pre + ([scale] if scale else []) + post if "[" not in f and ";" not in f]
+    if config.ladder:
+        names += ["split", "scale", "null"]
+    return list(dict.fromkeys(names))
+
+def build_ffmpeg_args(config, media=None, caps=None, threads=0):
+    """
+    :param config: EncodeConfig，或旧式的 UI 状态字典
+    :param media: (可选) 片源的 MediaInfo，用于省掉与片源完全一致的缩放/帧率转换
+    :param caps: (可选) 该编码器的能力矩阵条目，片源像素格式不被支持时自动补一道 -pix_fmt 转换
+    :param threads: (可选) 线程预算分给本任务的核心数，翻译成编码器各自的线程参数；0 为不限制
+    :return: 可直接拼进命令行的新列表
+    """
+    config = adapt_config_to_media(as_encode_config(config), media, caps)
+    if threads:
+        config = config.replace(threads=threads)
+    return list(compile_encode_args(config))
+
+def _with_codec_params(args, option, params, skip_keys=()):
+    """
+    把 key=value:key=value 合并进已有的私有参数（用户附加参数里可能已经写了一份）
+    :param skip_keys: 用户已经写了这些键时，整段不再合并（以用户的为准）
+    """
+    args = list(args)
+    if option in args[:-1]:
+        i = args.index(option) + 1
+        existing = {kv.split("=", 1)[0] for kv in args[i].split(":")}
+        if existing & set(skip_keys):
+            return args
+        args[i] = f"{args[i]}:{params}"
+    else:
+        args.extend([option, params])
+    return args
+
+def _with_x265_params(args, params):
+    return _with_codec_params(args, "-x265-params", params)
+
+def build_two_pass_args(config, args):
+    """
+    把 2pass 模式的参数拆成两遍：第一遍只出统计文件（无音频、输出到 null，套用最快的设置），第二遍读统计文件正式压制
+    统计文件用相对路径 TWO_PASS_LOG_NAME，调用方必须让两遍都在同一个任务专属的临时目录里运行
+    :return: (第一遍参数, 第二遍参数)；非 2pass 或编码器不支持外部两遍时返回 None（按单遍参数直接压）
+    """
+    if config.rc != "2pass" or config.v_enc not in TWO_PASS_FIRST_PASS_ARGS:
+        return None
+    args = list(args)
+    if config.v_enc == "libx265":
+        # libx265 不认 -pass，两遍走 x265 自己的参数；相对路径也顺带避开了 Windows 盘符里的冒号
+        pass1 = _with_x265_params(args, f"pass=1:stats={TWO_PASS_LOG_NAME}.log:slow-firstpass=0")
+        pass2 = _with_x265_params(args, f"pass=2:stats={TWO_PASS_LOG_NAME}.log")
+    else:
+        pass1 = args + ["-pass", "1", "-passlogfile", TWO_PASS_LOG_NAME] + TWO_PASS_FIRST_PASS_ARGS[config.v_enc]
+        pass2 = args + ["-pass", "2", "-passlogfile", TWO_PASS_LOG_NAME]
+    pass1 += ["-an", "-sn", "-dn", "-f", "null", "-"]
+    return pass1, pass2
+
+def ladder_output_path(output_path, suffix):
+    """阶梯某一路的输出文件：在主输出文件名后面、扩展名前面插入后缀"""
+    base, ext = os.path.splitext(output_path)
+    return f"{base}{suffix}{ext}"
+
+def build_ladder_args(config, output_path, media=None, caps=None, threads=0):
+    """
+    码率阶梯：源只解码一次，split 成 N 路后各自缩放、各自编码，一个 ffmpeg 进程同时写出 N 个文件
+    缩放前的滤镜（去隔行/裁剪/丢帧）在分叉之前只跑一遍，缩放和其余滤镜每路各跑一遍
+    每一路都是主配置换上该级的分辨率/数值后编译出的编码参数，比片源还高的级别直接跳过（不做放大）；
+    2pass 在阶梯里按单遍平均码率压；线程份额在各路之间均分
+    :return: (参数列表, 最后一路的输出路径)；前 N-1 路的文件名已写在参数里，最后一路由 Worker 照常追加在末尾
+    :raises EncodeConfigError: 片源比阶梯的每一级都矮（调用方应先用 check_config_capabilities 挡掉）
+    """
+    src_height = media.video.height if media is not None and media.video is not None else 0
+    rungs = sorted(config.ladder, key=lambda r: int(r[0][:-1]), reverse=True)
+    kept = [r for r in rungs if not src_height or int(r[0][:-1]) <= src_height]
+    if not kept:
+        raise EncodeConfigError(_ladder_too_tall(config, src_height))
+    rung_threads = split_threads(len(kept), threads) if threads else [0] * len(kept)
+
+    base = adapt_config_to_media(config.replace(res=KEEP_SOURCE, ladder=()), media, caps)
+    extra_args, user_filters = split_user_filters(base.extra_args)
+    pre, _, post = plan_video_filters(base, user_filters)
+    # 各路的编码参数不再带滤镜：去掉帧率和用户滤镜后编译，开头的 -map 0 换成本路的滤镜出口
+    encode_base = base.replace(fps=KEEP_SOURCE, fps_up=False, extra_args=extra_args)
+
+    split_labels = "".join(f"[s{i}]" for i in range(len(kept)))
+    graph = ["[0:v:0]" + ",".join(pre + [f"split={len(kept)}"]) + split_labels]
+    outputs = []
+    for i, (res, val, suffix) in enumerate(kept):
+        height = int(res[:-1])
+        # 与片源同高的一路不空转 scale
+        branch = ([] if height == src_height else [f"scale=-2:{height}"]) + post
+        graph.append(f"[s{i}]{','.join(branch) or 'null'}[v{i}]")
+        rung = encode_base.replace(threads=rung_threads[i], **({"cqp_val": val} if base.rc == "cqp" else {"vbr_cbr_val": val}))
+        rung_args = list(compile_encode_args(rung))
+        outputs.append((["-map", f"[v{i}]"] + FILTERED_REST_MAPS + rung_args[2:],
+                        ladder_output_path(output_path, suffix)))
+
+    filter_threads = min(FILTER_THREADS, max(1, threads // 2)) if threads else FILTER_THREADS
+    args = ["-filter_complex_threads", str(filter_threads), "-filter_complex", ";".join(graph)]
+    for rung_args, path in outputs[:-1]:
+        args.extend(rung_args + [path])
+    args.extend(outputs[-1][0])
+    return args, outputs[-1][1]
+
+def _ladder_too_tall(config, src_height):
+    lowest = min(int(res[:-1]) for res, _, _ in config.ladder)
+    return f"片源 {src_height}p 低于码率阶梯的最低一级 {lowest}p，阶梯不做放大"
+
+def _codec_family(enc):
+    """编码器所属的码流格式：h264_nvenc / libx264 -> h264，hevc_qsv / libx265 -> hevc，各路 AV1 -> av1"""
+    if "264" in enc:
+        return "h264"
+    if "hevc" in enc or "265" in enc:
+        return "hevc"
+    if "av1" in enc:
+        return "av1"
+    if "vp9" in enc:
+        return "vp9"
+    return None
+
+def _parse_bitrate(text):
+    """'128k' / '2M' / '96000' -> bps，解析不了返回 0"""
+    m = re.match(r"^(\d+(?:\.\d+)?)([kKmM]?)$", str(text).strip())
+    if not m:
+        return 0
+    return int(float(m.group(1)) * {"": 1, "k": 1000, "m": 1000000}[m.group(2).lower()])
+
+def _extra_arg_value(extra_args, option):
+    """附加参数里某个选项的值，没写返回空字符串"""
+    if option in extra_args[:-1]:
+        return extra_args[extra_args.index(option) + 1]
+    return ""
+
+def _forced_pix_fmt_profile(config):
+    """重新压制时实际会下发的 (像素格式, Profile)：H.264 硬件护城河 > 附加参数 > 能力矩阵补的转换，没有强制时为空串"""
+    if config.v_enc in ("h264_nvenc", "h264_amf"):
+        return "yuv420p", "high"
+    return (_extra_arg_value(config.extra_args, "-pix_fmt") or config.pix_fmt,
+            _extra_arg_value(config.extra_args, "-profile:v"))
+
+def _video_copy_blocker(config, media, caps=None):
+    """视频能否直通：返回不能直通的原因，能直通返回空字符串"""
+    src = media.video
+    if src is None:
+        return "片源没有视频流"
+    if _codec_family(config.v_enc) != src.codec_name:
+        return f"编码格式不同 ({src.codec_name} -> {_codec_family(config.v_enc) or config.v_enc})"
+    # 目标编码器/Profile 吃不下片源的像素格式时（例如 10-bit 片源配 8-bit 的 H.264 硬件编码），
+    # 重新压制会改变位深，直通就不是“已满足目标”
+    pix_fmt, profile = _forced_pix_fmt_profile(adapt_config_to_media(config, media, caps))
+    if pix_fmt and src.pix_fmt and pix_fmt != src.pix_fmt:
+        return f"像素格式不同 ({src.pix_fmt} -> {pix_fmt})"
+    if profile and src.profile and profile.lower() != src.profile.lower().replace(" ", ""):
+        return f"Profile 不同 ({src.profile} -> {profile})"
+    if split_user_filters(config.extra_args)[1]:
+        return "附加参数里有视频滤镜"
+    if config.res != KEEP_SOURCE and src.height > config.target_height:
+        return f"分辨率高于目标 ({src.height}p > {config.res})"
+    if config.fps != KEEP_SOURCE and src.fps > float(config.fps) + 0.01:
+        return f"帧率高于目标 ({src.fps:.2f} > {config.fps})"
+    if config.rc == "cqp":
+        return "CQP 模式没有码率上限，无法判断片源是否达标"
+    src_kbps = media.video_bit_rate // 1000
+    if not src_kbps:
+        return "片源视频码率未知"
+    if src_kbps > config.vbr_cbr_val:
+        return f"码率高于目标 ({src_kbps}k > {config.vbr_cbr_val}k)"
+    return ""
+
+def _audio_copy_blocker(config, media):
+    """音频能否直通：所有音轨都得满足目标，返回不能直通的原因"""
+    tracks = [s for s in media.streams if s.codec_type == "audio"]
+    if not tracks:
+        return "片源没有音轨"
+    if any(arg in ("-af", "-filter:a") for arg in config.extra_args):
+        return "附加参数里有音频滤镜"
+    target_bps = _parse_bitrate(config.a_bit)
+    for s in tracks:
+        if s.codec_name != config.a_enc:
+            return f"编码格式不同 ({s.codec_name} -> {config.a_enc})"
+        if not s.bit_rate or not target_bps or s.bit_rate > target_bps:
+            return f"码率高于目标或未知 ({s.bit_rate // 1000}k > {config.a_bit})"
+        if config.a_sample != KEEP_SOURCE and str(s.sample_rate) != config.a_sample:
+            return f"采样率不同 ({s.sample_rate} -> {config.a_sample})"
+    return ""
+
+def plan_stream_copy(config, media, caps=None):
+    """
+    开压前的直通预检：片源的视频/音频已经满足目标（同编码、像素格式与 Profile 一致、分辨率帧率不超、码率不超上限）时，
+    直接降级成 -c copy，省掉一次有损的重新压制。预设里写 auto_copy: false 可以关掉
+    :param caps: (可选) 目标编码器的能力矩阵条目，用来判断重新压制时会不会换像素格式
+    :return: (调整后的 EncodeConfig, 决策说明列表)；每一路都附上直通或不直通的原因，调用方负责打日志
+    """
+    if not config.auto_copy or config.ladder or media is None:
+        return config, []
+    changes, notes = {}, []
+    if config.v_enc != "copy":
+        blocker = _video_copy_blocker(config, media, caps)
+        if blocker:
+            notes.append(f"视频重新压制: {blocker}")
+        else:
+            changes["v_enc"] = "copy"
+            notes.append(f"视频直通: 片源 {media.video.codec_name} {media.video.height}p {media.video.pix_fmt} "
+                         f"{media.video_bit_rate // 1000}k 已满足目标 {config.v_enc} {config.vbr_cbr_val}k")
+    if config.a_enc != "copy" and "剥离静音" not in config.a_enc:
+        blocker = _audio_copy_blocker(config, media)
+        if blocker:
+            notes.append(f"音频重新压制: {blocker}")
+        else:
+            changes["a_enc"] = "copy"
+            notes.append(f"音频直通: 片源 {media.audio.codec_name} 已满足目标 {config.a_enc} {config.a_bit}")
+    return (config.replace(**changes) if changes else config), notes
+
+def _is_10bit(pix_fmt):
+    return "10" in pix_fmt
+
+def pick_supported_pix_fmt(src_pix_fmt, supported):
+    """
+    片源像素格式被编码器直接支持时原样返回；否则优先挑同位深的格式，再退回 8-bit
+    :return: 目标像素格式；能力矩阵里没有任何记录时返回 None（不干预）
+    """
+    if not supported or src_pix_fmt in supported:
+        return src_pix_fmt if supported else None
+    same_depth = [f for f in supported if _is_10bit(f) == _is_10bit(src_pix_fmt)]
+    return (same_depth or supported)[0]
+
+def check_config_capabilities(config, caps, media=None):
+    """
+    入队/开压前的能力矩阵校验：把注定失败的组合挡在解码之前
+    :param config: EncodeConfig 或 UI 状态字典
+    :param caps: 该编码器的能力矩阵条目；为 None（还没测过）时一律放行
+    :return: 问题描述，没有问题时返回空字符串
+    :raises EncodeConfigError: 配置本身不合法
+    """
+    config = as_encode_config(config)
+    v_enc = config.v_enc
+
+    # 码率阶梯不做放大：片源比每一级都矮时这个任务没有可输出的一路，与编码器能力无关
+    if config.ladder and media is not None and media.video is not None and media.video.height:
+        if all(int(res[:-1]) > media.video.height for res, _, _ in config.ladder):
+            return _ladder_too_tall(config, media.video.height)
+
+    if not caps or v_enc == "copy":
+        return ""
+
+    # 滤镜链里用到、但当前 ffmpeg 没编译进去的滤镜；清单由后台读好，还没读完时不拦（界面线程上不起进程）
+    registry = get_tool_registry()
+    missing = [name for name in required_filters(config) if not registry.has_filter(name, wait=False)]
+    if missing:
+        return f"当前 ffmpeg 缺少滤镜: {', '.join(missing)}"
+
+    # 只拦截测过且失败的码控模式；旧版能力库里没测过的（比如 2pass）交给 ffmpeg 自己判断
+    rc = config.rc
+    if rc in caps.get("rc_tested", ["cqp", "vbr", "cbr"]) and rc not in caps.get("rc", MATRIX_RC_MODES):
+        return f"{v_enc} 不支持 {rc.upper()} 码控模式"
+
+    # 目标高度：指定了分辨率就按目标算，保持源则看片源
+    height = config.target_height
+    if config.ladder:
+        height = max(int(res[:-1]) for res, _, _ in config.ladder) # 阶梯按最高的一级算
+    if not height and media is not None and media.video is not None:
+        height = media.video.height
+    max_height = caps.get("max_height", MATRIX_HEIGHTS[-1])
+    if max_height < MATRIX_HEIGHTS[-1] and height > max_height:
+        return f"{v_enc} 最高只能点火到 {max_height}p，无法输出 {height}p"
+
+    # 附加参数里手写的 Profile：只拦截测过且失败的，没测过的交给 ffmpeg 自己判断
+    extra = list(config.extra_args)
+    if "-profile:v" in extra[:-1]:
+        profile = extra[extra.index("-profile:v") + 1]
+        tested = [p for profiles in MATRIX_PROFILES.values() for p in profiles]
+        if profile in tested and profile not in caps.get("profiles", tested):
+            return f"{v_enc} 不支持 Profile {profile}"
+    return ""
+
+class ProbeCancelled(Exception):
+    """探针被更新的请求顶替、子进程已被强制结束"""
+
+def _run_probe_process(cmd, cancel_event=None):
+    """
+    启动 ffprobe 并等待输出；期间每 0.2 秒检查一次取消信号，被取消时直接杀掉子进程
+    :return: (返回码, stdout 文本)
+    """
     CREATE_NO_WINDOW = 0x08000000
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                            text=True, encoding='utf-8', creationflags=CREATE_NO_WINDOW)
+    while True:
+        try:
+            out, _ = proc.communicate(timeout=0.2)
+            return proc.returncode, out
+        except subprocess.TimeoutExpired:
+            if cancel_event is not None and cancel_event.is_set():
+                proc.kill()
+                proc.communicate()
+                raise ProbeCancelled()
+
+def probe_json(file_path, mode="full", cancel_event=None):
+    """
+    统一的 ffprobe 情报入口：先查持久化缓存，未命中才真正启动 ffprobe 子进程
+    :param mode: 探测深度。"header" 优先走纯 Python 容器头解析（失败自动回退 ffprobe），"full" 为完整 ffprobe
+    :param cancel_event: (可选) threading.Event，置位后正在运行的 ffprobe 会被立即杀掉
+    :return: ffprobe 的 JSON 字典（含 format / streams），失败或被取消时返回 None
+    """
+    cache = get_probe_cache()
+    data = cache.get(file_path)
+    # 缓存里的结果只要不比要求的浅就直接用，浅的会被这次探测升级覆盖
+    if data is not None and PROBE_MODE_RANK.get(data.get("probe_mode", "full"), 0) >= PROBE_MODE_RANK[mode]:
+        return data
+
+    previous = data
+    if mode == "header":
+        data = parse_container_header(file_path)
+        if data is not None:
+            data["probe_mode"] = "header"
+            cache.put(file_path, data)
+            return data
+        mode = "fast" # 容器头解析不了，退回读取量最小的 ffprobe
+
+    cmd = _build_probe_cmd(file_path, mode)
     try:
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, creationflags=CREATE_NO_WINDOW)
-        return float(result.stdout.strip())
+        returncode, output = _run_probe_process(cmd, cancel_event)
+        data = json.loads(output)
+    except ProbeCancelled:
+        return None
     except Exception as e:
         print(f"探针读取失败: {e}")
-        return 1
+        return None
+
+    # 包列表只用于推算 GOP，算完即丢，不写进缓存
+    packets = data.pop("packets", [])
+    data["keyframe_interval"] = _estimate_keyframe_interval(data, packets)
+    if not data["keyframe_interval"] and previous:
+        # deep 模式不采样包头，沿用旧结果里已经算出的 GOP
+        data["keyframe_interval"] = previous.get("keyframe_interval", 0.0)
+    data["probe_mode"] = mode
+
+    # 只缓存真正读出了内容的结果，避免把一次失败永久记住
+    if returncode == 0 and data.get("format"):
+        cache.put(file_path, data)
+    return data
+
+def detect_scenes(file_path, threshold=SCENE_THRESHOLD, cancel_event=None):
+    """
+    镜头切换分析：-skip_frame nokey 只解关键帧，缩小后用 select='gt(scene,…)' 打分，每个片源只跑一次
+    结果是关键帧时间（天然可以作为无损切点），存进探针缓存的附属表
+    :return: 升序的切镜时间列表；失败或被取消时返回 None
+    """
+    cache = get_probe_cache()
+    times = cache.get_scenes(file_path, threshold)
+    if times is not None:
+        return times
 
-def probe_video_info(file_path):
     cmd = [
-        get_ext_path("ffprobe.exe"), "-v", "quiet", "-print_format", "json",
-        "-show_format", "-show_streams", file_path
+        get_ext_path("ffmpeg.exe"), "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-skip_frame", "nokey", "-i", file_path,
+        "-map", "0:v:0", "-an", "-sn", "-dn",
+        "-vf", f"scale=-2:{SCENE_ANALYSIS_HEIGHT},select='gt(scene,{threshold})',metadata=print:file=-",
+        "-f", "null", "-"
     ]
+    t0 = time.perf_counter()
     try:
-        CREATE_NO_WINDOW = 0x08000000
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', creationflags=CREATE_NO_WINDOW)
-        data = json.loads(result.stdout)
-        
-        video_stream = next((s for s in data.get('streams', []) if s.get('codec_type') == 'video'), None)
-        if not video_stream:
-            return "❌ 未能识别到有效的视频流"
+        returncode, output = _run_probe_process(cmd, cancel_event)
+    except ProbeCancelled:
+        return None
+    except Exception as e:
+        print(f"镜头分析失败: {e}")
+        return None
+    if returncode != 0:
+        print(f"镜头分析失败: {output.strip()[-200:]}")
+        return None
 
-        codec = video_stream.get('codec_name', 'UNKNOWN').upper()
-        width = video_stream.get('width', 0)
-        height = video_stream.get('height', 0)
-        
-        
-        fps_str = video_stream.get('r_frame_rate', '0/0')
-        if '/' in fps_str:
-            num, den = fps_str.split('/')
-            fps = round(int(num) / int(den), 2) if int(den) != 0 else 0
-        else:
-            fps = float(fps_str)
-            
-        bitrate_bps = data.get('format', {}).get('bit_rate') or video_stream.get('bit_rate')
-        if bitrate_bps:
-            bitrate_display = f"{round(int(bitrate_bps) / 1000000, 2)} Mbps"
-        else:
-            bitrate_display = "动态/未知"
-        
-        audio_stream = next((s for s in data.get('streams', []) if s.get('codec_type') == 'audio'), None)
-        if audio_stream:
-            audio_codec = audio_stream.get('codec_name', 'UNKNOWN').upper()
-            audio_codec_text = f"{audio_codec}"
-            audio_sample_rate = audio_stream.get('sample_rate', '未知')
-            audio_sample_text = f" {audio_sample_rate} Hz"
-            audio_bitrate_bps = audio_stream.get('bit_rate')
-            if audio_bitrate_bps:
-                audio_bitrate_text = f"{round(int(audio_bitrate_bps) / 1000, 2)} Kbps"
-
-        return (
-            f"视频|音频 信息\n\n"
-            f"[ 编码 ] {codec}|{audio_codec_text}\n"
-            f"[ 分辨率 ] {width} x {height}\n"
-            f"[ 帧率|采样率 ] {fps} FPS|{audio_sample_text}\n"
-            f"[ 码率 ] {bitrate_display}|{audio_bitrate_text}"
-        )
+    times = sorted({round(float(t), 6) for t in SCENE_TIME_PATTERN.findall(output)})
+    cache.put_scenes(file_path, threshold, times)
+    print(f"🎞️ 镜头分析完成: {len(times)} 个切镜点, 耗时 {time.perf_counter() - t0:.1f}s")
+    return times
+
+def _build_probe_cmd(file_path, mode):
+    """按探测深度拼装 ffprobe 命令"""
+    cmd = [get_ext_path("ffprobe.exe"), "-v", "quiet", "-print_format", "json"]
+
+    if mode == "fast":
+        # 限制探测缓冲与分析时长，并且只采样片头几秒的包，超长/远程片源也只读几 MB
+        cmd.extend(["-probesize", FAST_PROBE_SIZE, "-analyzeduration", str(FAST_ANALYZE_DURATION)])
+        sample_seconds = FAST_SAMPLE_SECONDS
+    else:
+        sample_seconds = KEYFRAME_SAMPLE_SECONDS
+
+    cmd.extend(["-show_format", "-show_streams"])
+
+    if mode == "deep":
+        # 逐帧解码计数（nb_read_frames）。-read_intervals 会截断计数，所以深度模式不做包采样
+        cmd.append("-count_frames")
+    else:
+        # 顺带只解复用开头一小段的包头（不解码），用来推算关键帧间隔，省掉第二次探测
+        cmd.extend([
+            "-show_entries", "packet=stream_index,pts_time,flags",
+            "-read_intervals", f"%+{sample_seconds}",
+        ])
+
+    cmd.append(file_path)
+    return cmd
+
+def _estimate_keyframe_interval(data, packets):
+    """根据采样到的视频包，计算相邻关键帧之间的平均间隔（秒），样本不足时返回 0"""
+    video_index = next((s.get("index") for s in data.get("streams", []) if s.get("codec_type") == "video"), None)
+    if video_index is None:
+        return 0.0
+
+    key_times = []
+    for pkt in packets:
+        if pkt.get("stream_index") != video_index or "K" not in pkt.get("flags", ""):
+            continue
+        try:
+            key_times.append(float(pkt["pts_time"]))
+        except (KeyError, ValueError):
+            continue
+
+    if len(key_times) < 2:
+        return 0.0
+    key_times.sort()
+    return round((key_times[-1] - key_times[0]) / (len(key_times) - 1), 3)
+
+def probe_media(file_path, mode="full", cancel_event=None):
+    """
+    把片源情报打包成 MediaInfo；底层走 probe_json 的持久化缓存，同一个文件整个会话只会真正探测一次
+    :return: MediaInfo，探测失败或被取消时返回 None
+    """
+    data = probe_json(file_path, mode, cancel_event)
+    if not data:
+        return None
+    return MediaInfo.from_ffprobe(file_path, data)
+
+def get_cached_media(file_path):
+    """只查缓存、绝不启动子进程的 MediaInfo 读取；缓存未命中时返回 None（供 UI 线程使用）"""
+    data = get_probe_cache().get(file_path)
+    if not data:
+        return None
+    return MediaInfo.from_ffprobe(file_path, data)
+
+def get_video_duration(file_path):
+    info = probe_media(file_path)
+    if info is None or info.duration <= 0:
+        print(f"探针读取失败: 无法获取 {file_path} 的时长")
+        return 1
+    return info.duration
+
+def probe_video_info(file_path):
+    try:
+        info = probe_media(file_path)
+        if info is None:
+            return "❌ 探针读取失败: ffprobe 无有效输出"
+        return format_media_info(info)
     except Exception as e:
         return f"❌ 探针读取失败: {e}"
 
@@ -176,6 +781,10 @@ def check_single_encoder(enc):
     """
     import subprocess
     from core.utils import get_ext_path
+
+    # 先查编译清单：当前 ffmpeg 里压根没有的编码器，不必真的去点火
+    if not get_tool_registry().has_encoder(enc):
+        return False, "当前 ffmpeg 未编译该编码器"
     
     cmd = [
         get_ext_path("ffmpeg.exe"), "-y", 
@@ -204,4 +813,167 @@ def check_single_encoder(enc):
         else:
             return False, result.stderr[-100:]
     except Exception as e:
-        return False, str(e)
\ No newline at end of file
+        return False, str(e)
+
+def probe_encoders(encoders, max_workers=8, deadline=ENCODER_PROBE_DEADLINE, on_result=None, cancel_event=None):
+    """
+    并行点火自检：所有编码器同时开测，总耗时约等于最慢的那一个，而不是全部相加
+    :param on_result: (可选) 每测完一个就回调 on_result(编码器, 是否成功, 错误摘要)
+    :param cancel_event: (可选) threading.Event，置位后立即放弃尚未出结果的编码器
+    :return: 可用编码器列表（保持传入时的顺序）
+    """
+    available = set()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(encoders))), thread_name_prefix="enc_probe")
+    futures = {executor.submit(check_single_encoder, enc): enc for enc in encoders}
+    pending = set(futures)
+    end_time = time.monotonic() + deadline
+    try:
+        while pending:
+            remaining = end_time - time.monotonic()
+            if remaining <= 0 or (cancel_event is not None and cancel_event.is_set()):
+                break
+            done, pending = wait(pending, timeout=min(remaining, 0.2), return_when=FIRST_COMPLETED)
+            for future in done:
+                enc = futures[future]
+                try:
+                    is_success, err_msg = future.result()
+                except Exception as e:
+                    is_success, err_msg = False, str(e)
+                if is_success:
+                    available.add(enc)
+                if on_result:
+                    on_result(enc, is_success, err_msg)
+
+        # 超过全局时限或被跳过的编码器一律按不可用处理
+        for future in pending:
+            if on_result:
+                on_result(futures[future], False, "超时或异常: 超过全局自检时限或被跳过")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [enc for enc in encoders if enc in available]
+
+def _try_encode(args, size="320x240", cwd=None):
+    """
+    用 1 帧纯色画面跑一次给定的编码参数，返回 (是否成功, 错误摘要)
+    :param cwd: (可选) 子进程的工作目录；参数自带输出（以 "-" 结尾）时不再追加 -f null
+    """
+    cmd = [
+        get_ext_path("ffmpeg.exe"), "-y", "-hide_banner",
+        "-f", "lavfi", "-i", f"color=c=black:s={size}",
+        "-frames:v", "1"
+    ] + args + ([] if args and args[-1] == "-" else ["-f", "null", "-"])
+    CREATE_NO_WINDOW = 0x08000000
+    try:
+        result = subprocess.run(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='ignore', creationflags=CREATE_NO_WINDOW, timeout=5, cwd=cwd
+        )
+        if result.returncode == 0:
+            return True, ""
+        return False, result.stderr.strip()[-100:]
+    except Exception as e:
+        return False, str(e)
+
+def _try_two_pass(config):
+    """
+    按 Worker 的方式真跑一次两遍：同一个临时目录里先跑第一遍出统计文件，再让第二遍读它
+    编码器没有外部两遍时（硬件的内置多遍），测的就是实际会下发的单遍参数
+    """
+    args = build_ffmpeg_args(config)
+    passes = build_two_pass_args(config, args)
+    if passes is None:
+        return _try_encode(args)
+    with tempfile.TemporaryDirectory(prefix="ffui_matrix_") as work_dir:
+        for n, pass_args in enumerate(passes, 1):
+            ok, err = _try_encode(pass_args, cwd=work_dir)
+            if not ok:
+                return False, f"第 {n} 遍: {err}"
+    return True, ""
+
+def probe_encoder_matrix(enc, cancel_event=None):
+    """
+    对单个编码器逐项点火：码控模式直接复用 build_ffmpeg_args 的真实翻译结果，保证测的就是实际会下发的参数
+    2pass 按 build_two_pass_args 拆成两遍、在同一个统计文件上真跑一次
+    :return: {"rc": [...], "pix_fmts": [...], "profiles": [...], "max_height": int, "errors": {项目: 错误摘要}}
+             被取消时返回 None
+    """
+    matrix = {"rc": [], "rc_tested": list(MATRIX_RC_MODES), "pix_fmts": [], "profiles": [], "max_height": 0, "errors": {}}
+
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    for rc in MATRIX_RC_MODES:
+        if cancelled():
+            return None
+        config = EncodeConfig(v_enc=enc, rc=rc, cqp_val=28, vbr_cbr_val=2000, a_enc="剥离静音")
+        ok, err = _try_two_pass(config) if rc == "2pass" else _try_encode(build_ffmpeg_args(config))
+        if ok:
+            matrix["rc"].append(rc)
+        else:
+            matrix["errors"][f"rc:{rc}"] = err
+
+    for pix_fmt in MATRIX_PIX_FMTS:
+        if cancelled():
+            return None
+        ok, err = _try_encode(["-c:v", enc, "-pix_fmt", pix_fmt])
+        if ok:
+            matrix["pix_fmts"].append(pix_fmt)
+        else:
+            matrix["errors"][f"pix_fmt:{pix_fmt}"] = err
+
+    for profile in MATRIX_PROFILES.get(_codec_family(enc), []):
+        if cancelled():
+            return None
+        # 10-bit Profile 配一个已确认可用的 10-bit 像素格式去测
+        if profile.endswith("10"):
+            pix_fmt = next((f for f in matrix["pix_fmts"] if _is_10bit(f)), None)
+            if pix_fmt is None:
+                matrix["errors"][f"profile:{profile}"] = "没有可用的 10-bit 像素格式"
+                continue
+        else:
+            pix_fmt = "yuv420p"
+        ok, err = _try_encode(["-c:v", enc, "-pix_fmt", pix_fmt, "-profile:v", profile])
+        if ok:
+            matrix["profiles"].append(profile)
+        else:
+            matrix["errors"][f"profile:{profile}"] = err
+
+    # 分辨率档位从低往高测，第一次失败就停
+    for height in MATRIX_HEIGHTS:
+        if cancelled():
+            return None
+        ok, err = _try_encode(["-c:v", enc, "-pix_fmt", "yuv420p"], size=f"{height * 16 // 9}x{height}")
+        if not ok:
+            matrix["errors"][f"height:{height}"] = err
+            break
+        matrix["max_height"] = height
+
+    return matrix
+
+def probe_capability_matrix(encoders, max_workers=4, on_result=None, cancel_event=None):
+    """
+    对一批编码器并行测能力矩阵（同一编码器内部串行，避免把同一块显卡的会话数挤爆）
+    :param on_result: (可选) 每测完一个编码器回调 on_result(编码器, 矩阵)
+    :return: {编码器: 矩阵}，被取消的编码器不出现在结果里
+    """
+    results = {}
+    if not encoders:
+        return results
+    # 顺带在后台读好滤镜清单，check_config_capabilities 要查它
+    get_tool_registry().filters
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(encoders))), thread_name_prefix="enc_matrix") as executor:
+        futures = {executor.submit(probe_encoder_matrix, enc, cancel_event): enc for enc in encoders}
+        for future in futures:
+            enc = futures[future]
+            try:
+                matrix = future.result()
+            except Exception as e:
+                print(f"⚠️ {enc} 能力矩阵探测异常: {e}")
+                continue
+            if matrix is None:
+                continue
+            results[enc] = matrix
+            if on_result:
+                on_result(enc, matrix)
+    return results
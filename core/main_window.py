@@ -1,13 +1,21 @@
-import os,tempfile
-import re
-from PySide6.QtWidgets import (QMainWindow, QFileDialog, QMessageBox, QProgressDialog, QMenu)
+import os,tempfile,time
+from functools import partial
+from PySide6.QtWidgets import (QMainWindow, QFileDialog, QMessageBox, QMenu)
 from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QPixmap, QCloseEvent, QIcon, QAction
 from PySide6.QtCore import Qt
 
-from core.utils import get_ext_path, get_mapped_bitrate, get_reverse_mapped_slider_val,read_yaml_config
-from core.worker import FFmpegWorker
-from core.engine import get_video_duration, probe_video_info,build_ffmpeg_args,check_single_encoder
+from core.utils import get_mapped_bitrate, get_reverse_mapped_slider_val,read_yaml_config,load_settings,get_app_dir
+from core.worker import FFmpegWorker, ChunkedFFmpegWorker, ProbeService, EncoderProbeWorker, EncoderMatrixWorker
+from core.engine import get_cached_media,build_ffmpeg_args,build_two_pass_args,build_ladder_args,plan_stream_copy,check_config_capabilities,CANDIDATE_ENCODERS
+from core.media import format_media_info, format_media_summary
+from core.capabilities import CapabilityStore
+from core.registry import get_tool_registry
+from core.encode_config import EncodeConfig, EncodeConfigError
+from core.thread_budget import ThreadBudget
+from core.scheduler import SlotScheduler
+from core.admission import AdmissionController
+from core.concurrency import AdaptiveConcurrency, workload_key
 from ui.ui_main_window import Ui_MainWindow
 import ui.resources_rc
 import urllib.request
@@ -15,12 +23,17 @@ from core.__version__ import __title__, __version__
 from PySide6.QtWidgets import QLineEdit, QFormLayout
 
 class FFmpegGUI(QMainWindow, Ui_MainWindow):
-    def __init__(self):
+    def __init__(self, startup_time=None):
         super().__init__()
+        # 启动计时：从进程入口（或构造开始）一直量到窗口第一次绘制
+        self._startup_time = startup_time if startup_time is not None else time.perf_counter()
+        self._startup_marks = [("进程启动", self._startup_time)]
+        self._first_paint_pending = True
         # ==========================================
         # 1. 魔法启动：一行代码加载所有生成的界面元素
         # ==========================================
         self.setupUi(self)
+        self._startup_marks.append(("导入与界面构建", time.perf_counter()))
         self.setWindowTitle(f"{__title__} {__version__}")
         
         self.setWindowIcon(QIcon(":/icons/icon.ico"))
@@ -31,6 +44,9 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         self.txt_extra_args.setPlaceholderText("例如: -preset p4 -tune hq (可选)")
         self.layout_video.insertRow(5, "附加/特性参数:", self.txt_extra_args)
 
+        # 动态植入两遍编码模式（滑块与 VBR/CBR 一样表示目标码率）
+        self.cb_v_rc.addItem("2pass")
+
         # 动态植入重新探测按钮
         from PySide6.QtWidgets import QPushButton
         self.btn_reprobe = QPushButton("重新扫描显卡硬件 🔄", self.tab_video)
@@ -47,8 +63,35 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         # ==========================================
         # 2. 保留原有的核心初始化逻辑：硬件自检与动态预设
         # ==========================================
-        self.available_v_encoders = self.probe_hardware_encoders()
+        self.settings = load_settings()
+        # 多槽位队列：总槽位 + 每类编码器各自的上限；线程预算只在 CPU 软压的槽位之间切分
+        queue_cfg = self.settings["queue"]
+        self.scheduler = SlotScheduler(queue_cfg["max_slots"], queue_cfg["vendor_slots"])
+        thread_cfg = self.settings["threads"]
+        self._cpu_slots = min(self.scheduler.max_slots, self.scheduler.vendor_limit("cpu"))
+        self.thread_budget = ThreadBudget(thread_cfg["total_cores"] or None, self._cpu_slots) if thread_cfg["enabled"] else None
+        # 自适应并发：在槽位上限以内边跑边测合计帧率，找吞吐最高的并发数；帧数由 on_progress 累加
+        conc_cfg = self.settings["concurrency"]
+        self.concurrency = AdaptiveConcurrency(self.scheduler.max_slots, conc_cfg["window_seconds"], conc_cfg["warmup_seconds"],
+                                               conc_cfg["min_gain"], conc_cfg["reprobe_seconds"]) if conc_cfg["enabled"] else None
+        self._frames_done = 0
+        self._concurrency_timer = QTimer(self)
+        self._concurrency_timer.setInterval(1000)
+        self._concurrency_timer.timeout.connect(self.observe_concurrency)
+        # 准入控制：槽位空着也先看系统负载，压住的任务由定时器隔一会儿再试
+        adm_cfg = self.settings["admission"]
+        self.admission = AdmissionController(adm_cfg["max_cpu_percent"], adm_cfg["min_free_memory_mb"], adm_cfg["max_disk_write_mbps"],
+                                             adm_cfg["settle_seconds"]) if adm_cfg["enabled"] else None
+        self._admission_hold = ""  # 当前压住队列的原因，只在变化时打日志
+        self._admission_timer = QTimer(self)
+        self._admission_timer.setSingleShot(True)
+        self._admission_timer.setInterval(int(adm_cfg["poll_interval"] * 1000))
+        self._admission_timer.timeout.connect(self._run_next_pending_task)
+        self.available_v_encoders = self.load_known_encoders()
+        self._startup_marks.append(("读取能力库", time.perf_counter()))
         self.load_dynamic_presets()
+        self._startup_marks.append(("加载预设", time.perf_counter()))
+        QTimer.singleShot(0, self.ensure_encoder_matrix)
 
         # 给 UI 中空白的下拉菜单动态塞入数据
         self.cb_v_encoder.addItems(self.available_v_encoders)
@@ -75,13 +118,25 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         self.btn_output.clicked.connect(self.select_output_file)
         
         # Initialize Queue Tracking
-        self.task_queue = []  # List of dicts: {'input': str, 'output': str, 'ui_state': dict, 'status': str}
-        self.current_task_idx = 0
+        self.task_queue = []  # List of dicts: {'input': str, 'output': str, 'ui_state': dict, 'config': EncodeConfig, 'status': str}
+        self.slots = {}  # 任务键 id(task) -> 槽位：{task, worker, total_seconds, enable_preview, preview_receiver}
+        self._focus_slot = None  # 主进度条和状态栏跟随的槽位（最近开压的那个）
         self.is_queue_running = False
 
         # Init Queue UI Table (Setup headers correctly)
-        self.table_queue.setColumnCount(3)
-        self.table_queue.setHorizontalHeaderLabels(["源视频", "目标格式", "状态"])
+        self.table_queue.setColumnCount(4)
+        self.table_queue.setHorizontalHeaderLabels(["源视频", "目标格式", "状态", "片源信息"])
+
+        # 后台探针池：批量拖入时并发探测，结果逐个流回队列表格
+        self.probe_service = ProbeService(self.settings["probe"]["max_workers"], self.settings["probe"]["batch_mode"], self)
+        self.probe_service.result_signal.connect(self.on_probe_result)
+        self._failed_probes = set()
+
+        # 信息面板专用探针：单线程，新的选择会顶替（并杀掉）还没返回的旧探针
+        self.info_probe_service = ProbeService(1, self.settings["probe"]["panel_mode"], self)
+        self.info_probe_service.result_signal.connect(self.on_info_probe_result)
+        self._info_probe_path = None
+        self._info_probe_pending = False  # 信息面板的探针还没回来：体积预估等它的结果，不另起一次探测
 
         # Buttons logic
         self.btn_add_queue.clicked.connect(self.add_to_queue)
@@ -104,6 +159,21 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         self.connect_ui_change_signals()
         self.check_queue_selection_state()
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._first_paint_pending:
+            self._first_paint_pending = False
+            QTimer.singleShot(0, self.report_startup_timing)
+
+    def report_startup_timing(self):
+        """打印启动各阶段耗时与首帧绘制时间（Time-to-first-paint）"""
+        self._startup_marks.append(("首帧绘制", time.perf_counter()))
+        phases = []
+        for (_, prev), (name, t) in zip(self._startup_marks, self._startup_marks[1:]):
+            phases.append(f"{name} {(t - prev) * 1000:.0f}ms")
+        total = (self._startup_marks[-1][1] - self._startup_time) * 1000
+        print(f"⏱️ 启动到首帧绘制: {total:.0f}ms ({', '.join(phases)})")
+
     def connect_ui_change_signals(self):
         self.cb_v_encoder.currentTextChanged.connect(self.check_queue_selection_state)
         self.cb_v_fps.currentTextChanged.connect(self.check_queue_selection_state)
@@ -166,17 +236,19 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
                 self.lbl_estimated_size.setText("预计生成大小: 未知 (未加载视频)")
                 return
                 
-            if not hasattr(self, '_duration_cache'):
-                self._duration_cache = {}
-                
-            if input_path not in self._duration_cache:
-                try:
-                    from core.engine import get_video_duration
-                    self._duration_cache[input_path] = get_video_duration(input_path)
-                except:
-                    self._duration_cache[input_path] = 0
-                    
-            total_seconds = self._duration_cache[input_path]
+            # 时长来自共享的 MediaInfo（持久化缓存按路径+大小+mtime 命中）；
+            # 缓存未命中时交给后台探针，绝不在 UI 线程里等子进程
+            media = get_cached_media(input_path)
+            if media is None:
+                if input_path in self._failed_probes:
+                    self.lbl_estimated_size.setText("预计生成大小: 未知 (无法读取时长)")
+                    return
+                # 刚选中的文件信息面板已经在探了，结果回来会经 on_probe_result 再刷新一次预估
+                if not (self._info_probe_pending and input_path == self._info_probe_path):
+                    self.probe_service.submit(input_path)
+                self.lbl_estimated_size.setText("预计生成大小: 正在读取时长...")
+                return
+            total_seconds = media.duration
             if total_seconds <= 0:
                 self.lbl_estimated_size.setText("预计生成大小: 未知 (无法读取时长)")
                 return
@@ -191,7 +263,7 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
                     audio_kbps = int(abit_str)
                     
             video_kbps = 0
-            if rc in ["vbr", "cbr"]:
+            if rc in ["vbr", "cbr", "2pass"]:
                 video_kbps = ui_state["vbr_cbr_val"]
             else:
                 self.lbl_estimated_size.setText("预计生成大小: 未知 (CQP/CRF质量模式无法预估体积)")
@@ -215,6 +287,12 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         if not urls:
             return
 
+        # 一批文件共用同一份配置：只校验、只翻译一次
+        ui_state = self.get_current_ui_state()
+        config = self.make_encode_config(ui_state)
+        if config is None:
+            return
+
         for url in urls:
             input_path = url.toLocalFile()
             if os.path.isfile(input_path):
@@ -236,7 +314,7 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
                 self.txt_output.setText(output_path)
                 
                 # Push straight to queue
-                self.add_task_to_table(input_path, output_path, self.get_current_ui_state())
+                self.add_task_to_table(input_path, output_path, ui_state, config)
                 
         self.lbl_status.setText(f"状态: 成功添加 {len(urls)} 个任务到队列！")
         self.txt_input.clear()
@@ -301,88 +379,116 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
             else:
                 self.lbl_v_val_display.setText(f"{val} kbps")
     
-    def probe_hardware_encoders(self):
-        """全能探针：无情地测试一大波编码器，看看系统里哪些是真正可用的硬件加速点火器"""
-        print("正在进行全硬件引擎点火自检...")
-        
-        # ====== 新增：检查是否已有持久化结果以极速启动 ======
-        report_path = "hardware_report.txt"
-        if os.path.exists(report_path):
-            try:
-                with open(report_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    match = re.search(r"可用编码器列表:\s*(\[.*?\])", content)
-                    if match:
-                        import ast
-                        cached_encoders = ast.literal_eval(match.group(1))
-                        # 确保 copy 在列表里（旧版可能没存 copy）
-                        if "copy" not in cached_encoders:
-                            cached_encoders.append("copy")
-                        print(f"🚀 [秒开] 已从 {report_path} 读取可用编码器: {cached_encoders}")
-                        return cached_encoders
-            except Exception as e:
-                print(f"⚠️ 解析缓存报告失败，回退到全面扫描: {e}")
-
-        test_encoders = [
-            "av1_nvenc", "hevc_nvenc", "h264_nvenc", # NVIDIA
-            "av1_amf", "hevc_amf", "h264_amf",       # AMD
-            "av1_qsv", "hevc_qsv", "h264_qsv",       # Intel
-            "libsvtav1", "libaom-av1", "librav1e",   # AV1 CPU 编队
-            "libx265", "libvpx-vp9", "libx264"       # 主流软压
-        ]
-        
-        available = []
-        
-        # UI 逻辑：弹窗与进度条控制
-        progress = QProgressDialog("首次运行/缓存丢失，正在初始化硬件探针...\n此过程约需10秒，只需一次。", "跳过", 0, len(test_encoders), self)
-        progress.resize(400, 100)
-        progress.setWindowTitle("引擎自检")
-        progress.setWindowModality(Qt.WindowModal)
-        progress.show()
-        
-        for i, enc in enumerate(test_encoders):
-            progress.setLabelText(f"正在测试 {enc} 引擎...")
-            progress.setValue(i)
-            from PySide6.QtWidgets import QApplication
-            QApplication.processEvents() 
-            if progress.wasCanceled(): break
-
-            # ✨ 核心剥离点：UI 不再亲自调用子进程，而是呼叫底层的独立点火器！
-            is_success, err_msg = check_single_encoder(enc)
-            
-            if is_success:
-                available.append(enc)
-                print(f"✅ 探测成功: {enc}")
-            else:
-                if "超时或异常" in err_msg: # 处理 Exception
-                    print(f"⚠️ {enc} 探测超时或异常: {err_msg}")
-                else:
-                    print(f"❌ {enc} 失败原因摘要: {err_msg}")
-                
-        progress.setValue(len(test_encoders)) 
-        
-        # 写入报告
-        with open(report_path, "w", encoding="utf-8") as f:
-            f.write(f"可用编码器列表: {available}\n")
-            f.write(f"FFmpeg 路径: {get_ext_path('ffmpeg.exe')}\n")
-            
-        available.append("copy") 
-        return available
+    def load_known_encoders(self):
+        """
+        启动阶段只读能力库，绝不点火：命中即用；过期或从没测过就先用已知结果开窗，真正的自检交给后台
+        """
+        # ====== 能力库：按 ffmpeg 身份(路径/大小/mtime/版本)命中即秒开 ======
+        if not hasattr(self, "capability_store"):
+            self.capability_store = CapabilityStore()
+        # 只看路径/大小/mtime，不在界面线程上跑 ffmpeg -version；二进制变了时版本串留空，由后台自检补上
+        self.ffmpeg_identity = self.capability_store.get_identity(read_version=False)
+        entry, fresh = self.capability_store.lookup(self.ffmpeg_identity)
+        self.encoder_matrix = dict(entry.get("matrix", {})) if entry is not None else {}
+        if entry is not None and "encoders" in entry:
+            cached_encoders = list(entry["encoders"]) + ["copy"]
+            if fresh:
+                print(f"🚀 [秒开] 已从能力库读取可用编码器: {cached_encoders}")
+                # 不点火也就没人读滤镜清单：后台读好，供开压前的滤镜可用性检查
+                get_tool_registry().preload("filters")
+                return cached_encoders
+            # ffmpeg 换过了：先用上次的结果把窗口开起来，后台悄悄重测，测完再刷新下拉框
+            print(f"♻️ 检测到 ffmpeg 已变化，暂用上次结果并在后台重新自检: {self.ffmpeg_identity['path']}")
+        else:
+            print("🆕 首次运行/缓存丢失，窗口先行打开，硬件引擎在后台并行点火...")
+            cached_encoders = ["copy"]
+        QTimer.singleShot(0, self.start_background_encoder_probe)
+        return cached_encoders
+
+    def save_encoder_capabilities(self, encoders):
+        """把自检结果写入能力库，并顺手生成一份给人看的 hardware_report.txt（提 Issue 时附带）"""
+        self.capability_store.update(self.ffmpeg_identity, encoders=list(encoders))
+        report_path = os.path.join(get_app_dir(), "hardware_report.txt")
+        try:
+            with open(report_path, "w", encoding="utf-8") as f:
+                f.write(f"可用编码器列表: {list(encoders)}\n")
+                f.write(f"FFmpeg 路径: {self.ffmpeg_identity['path']}\n")
+                f.write(f"FFmpeg 版本: {self.ffmpeg_identity['version']}\n")
+        except Exception as e:
+            print(f"⚠️ 写入 hardware_report.txt 失败: {e}")
+
+    def start_background_encoder_probe(self):
+        """不弹窗、不阻塞界面的后台自检：进度显示在状态栏，结束后通过信号刷新下拉框"""
+        if getattr(self, "_bg_encoder_probe", None) is not None and self._bg_encoder_probe.isRunning():
+            return
+        probe_cfg = self.settings["encoder_probe"]
+        self._probe_done_count = 0
+        self._bg_encoder_probe = EncoderProbeWorker(CANDIDATE_ENCODERS, probe_cfg["max_workers"], probe_cfg["deadline"],
+                                                    identity=self.ffmpeg_identity)
+        self._bg_encoder_probe.progress_signal.connect(self.on_encoder_probe_progress)
+        self._bg_encoder_probe.finished_signal.connect(self.on_background_encoder_probe_finished)
+        self.btn_reprobe.setEnabled(False)
+        self.btn_reprobe.setText("正在后台扫描显卡硬件... ⏳")
+        self._bg_encoder_probe.start()
+
+    def on_encoder_probe_progress(self, enc, is_success, err_msg):
+        self._probe_done_count += 1
+        if not self.is_queue_running:
+            self.lbl_status.setText(f"状态: 引擎自检中 ({self._probe_done_count}/{len(CANDIDATE_ENCODERS)}) {enc}")
+        if is_success:
+            print(f"✅ 探测成功: {enc}")
+        elif "超时或异常" in err_msg: # 处理 Exception
+            print(f"⚠️ {enc} 探测超时或异常: {err_msg}")
+        else:
+            print(f"❌ {enc} 失败原因摘要: {err_msg}")
+
+    def on_background_encoder_probe_finished(self, encoders):
+        self.btn_reprobe.setEnabled(True)
+        self.btn_reprobe.setText("重新扫描显卡硬件 🔄")
+        if self._bg_encoder_probe.is_cancelled():
+            return
+        self.ffmpeg_identity = self._bg_encoder_probe.identity # 后台补上了版本串
+        self.save_encoder_capabilities(encoders)
+        print(f"🔄 后台自检完成，已刷新可用编码器: {encoders}")
+        if not self.is_queue_running:
+            self.lbl_status.setText(f"状态: 引擎自检完成，可用 {len(encoders)} 个硬件/软件编码器")
+        self.encoder_matrix = {} # 自检结果变了，旧矩阵作废重测
+        self.apply_encoder_list(list(encoders) + ["copy"])
+        self.ensure_encoder_matrix()
+        if getattr(self, "_manual_reprobe", False):
+            self._manual_reprobe = False
+            QMessageBox.information(self, "硬件扫描完毕", "重新点火测试成功，支持列表已彻底刷新！")
+
+    def ensure_encoder_matrix(self):
+        """给还没有能力矩阵的可用编码器补测一轮（后台进行，测完自动刷新预设）"""
+        if getattr(self, "_matrix_worker", None) is not None and self._matrix_worker.isRunning():
+            return
+        if getattr(self, "_bg_encoder_probe", None) is not None and self._bg_encoder_probe.isRunning():
+            return # 自检结束后会再调用一次，避免两轮点火同时抢显卡会话
+        missing = [enc for enc in self.available_v_encoders if enc != "copy" and enc not in self.encoder_matrix]
+        if not missing:
+            return
+        print(f"🧪 后台探测能力矩阵: {missing}")
+        self._matrix_worker = EncoderMatrixWorker(missing, self.settings["encoder_probe"]["matrix_workers"])
+        self._matrix_worker.finished_signal.connect(self.on_encoder_matrix_finished)
+        self._matrix_worker.start()
+
+    def on_encoder_matrix_finished(self, results):
+        # 被“重新扫描”中途叫停的旧探测，结果不再可信
+        if self.sender() is not self._matrix_worker or self._matrix_worker.is_cancelled() or not results:
+            return
+        self.encoder_matrix.update(results)
+        self.capability_store.update(self.ffmpeg_identity, matrix=self.encoder_matrix)
+        for enc, matrix in results.items():
+            print(f"🧪 {enc} 能力矩阵: 码控 {matrix['rc']}, 像素格式 {matrix['pix_fmts']}, "
+                  f"Profile {matrix['profiles']}, 最高 {matrix['max_height']}p")
+        # 预设匹配依赖矩阵，测完重新筛一遍
+        self.apply_encoder_list(self.available_v_encoders)
+
+    def apply_encoder_list(self, encoders):
+        """用新的可用编码器列表刷新编码器下拉框和预设下拉框，尽量保住用户当前的选择"""
+        self.available_v_encoders = encoders
 
-    def reprobe_hardware_encoders(self):
-        """完全重新探测硬件配置"""
-        report_path = "hardware_report.txt"
-        if os.path.exists(report_path):
-            try:
-                os.remove(report_path)
-            except Exception as e:
-                QMessageBox.warning(self, "错误", f"无法删除旧的点火缓存报告: {e}")
-                return
-                
-        # 直接调用探针，界面会挂起重新跑
-        self.available_v_encoders = self.probe_hardware_encoders()
-        
-        # 将重扫获得的数据重新装入原 UI 组件
         current_enc = self.cb_v_encoder.currentText()
         self.cb_v_encoder.blockSignals(True)
         self.cb_v_encoder.clear()
@@ -390,8 +496,25 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         if current_enc in self.available_v_encoders:
             self.cb_v_encoder.setCurrentText(current_enc)
         self.cb_v_encoder.blockSignals(False)
-        
-        QMessageBox.information(self, "硬件扫描完毕", "重新点火测试成功，支持列表已彻底刷新！")
+
+        current_preset = self.combo_preset.currentText()
+        self.load_dynamic_presets()
+        self.combo_preset.blockSignals(True)
+        self.combo_preset.clear()
+        self.combo_preset.addItems(list(self.preset_configs.keys()))
+        if current_preset in self.preset_configs:
+            self.combo_preset.setCurrentText(current_preset)
+        self.combo_preset.blockSignals(False)
+        self.load_tooltips()
+
+    def reprobe_hardware_encoders(self):
+        """完全重新探测硬件配置（后台进行，界面照常可用）"""
+        if getattr(self, "_matrix_worker", None) is not None and self._matrix_worker.isRunning():
+            self._matrix_worker.stop()
+            self._matrix_worker.wait()
+        self.capability_store.invalidate(self.ffmpeg_identity)
+        self._manual_reprobe = True
+        self.start_background_encoder_probe()
     
     def load_dynamic_presets(self):
         self.preset_configs = {}
@@ -408,18 +531,31 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         # 2. 逐字保留：原有的核心匹配与注入逻辑
         # ==========================================
         for p in raw_presets:
-            matched_encoder = next((enc for enc in self.available_v_encoders if p["requires"] in enc), None)
+            # 能力矩阵已测过的编码器，还要确认预设要求的码控/分辨率真的点得着
+            matched_encoder = next((enc for enc in self.available_v_encoders if p["requires"] in enc
+                                    and self.preset_fits_encoder(p, enc)), None)
             
             if matched_encoder:
                 config = p["ui_state"].copy()
                 config["v_enc"] = matched_encoder # 动态塞入可用的硬件编码器
                 if config["rc"] == "cqp": 
                     config["cqp_val"] = config.get("val", 32)
+                if p.get("ladder"):
+                    config["ladder"] = p["ladder"] # 码率阶梯：一次解码同时输出多个分辨率
                 self.preset_configs[p["name"]] = config
 
         # 永远在列表最后保留“自定义”选项
         self.preset_configs["⚙️ 自定义参数..."] = {}
         
+    def preset_fits_encoder(self, preset, enc):
+        """预设能否落到该编码器上：先过 EncodeConfig 校验，再过能力矩阵"""
+        try:
+            ui_state = dict(preset["ui_state"], v_enc=enc, ladder=preset.get("ladder") or [])
+            return not check_config_capabilities(ui_state, self.encoder_matrix.get(enc))
+        except EncodeConfigError as e:
+            print(f"⚠️ 预设 {preset.get('name')} 参数无效，已跳过: {e}")
+            return False
+
     def load_tooltips(self):
         # 1. 单行读取！
         tips = read_yaml_config("tooltips.yaml")
@@ -535,6 +671,7 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         """
         数据打包专员：负责把当前 UI 界面上的状态打包成字典，送给底层引擎
         """
+        preset = self.preset_configs.get(self.combo_preset.currentText(), {})
         return {
             "v_enc": self.cb_v_encoder.currentText(),
             "fps": self.cb_v_fps.currentText(),
@@ -545,30 +682,42 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
             "a_enc": self.cb_a_encoder.currentText(),
             "a_bit": self.cb_a_bitrate.currentText(),
             "a_sample": self.cb_a_sample.currentText(),
-            "extra_args": self.txt_extra_args.text().strip()
+            "extra_args": self.txt_extra_args.text().strip(),
+            # 阶梯和自动直通开关不在界面控件上，跟着当前选中的预设走
+            "ladder": preset.get("ladder") or [],
+            "auto_copy": preset.get("auto_copy", True)
         }
     
-    def start_encoding_task(self, idx):
-        # Starts a specific task from the queue
-        if idx >= len(self.task_queue):
-            QMessageBox.information(self, "完成", "队列中所有任务已压制完毕！")
-            self.is_queue_running = False
-            self.btn_start_queue.setEnabled(True)
-            self.btn_start.setEnabled(True)
-            return
-
-        task = self.task_queue[idx]
-        if task["status"] != "等待中" and task["status"] != "Pending":
-            # Skip already finished or running tasks
-            self.current_task_idx += 1
-            self.start_encoding_task(self.current_task_idx)
-            return
-
+    def start_encoding_task(self, task):
+        """
+        在一个已占好的槽位上开压任务：每个槽位有自己的 Worker、进度、预览和取消
+        :return: 真正开压返回 True；能力矩阵判定不支持时标错并返回 False
+        """
         input_path = task["input"]
         output_path = task["output"]
-        ui_config = task["ui_state"]
+        idx = self.task_queue.index(task)
+        key = id(task)
+
+        # 同一份 MediaInfo 同时喂给进度条和参数翻译引擎；只读缓存，未探完时由 on_probe_result 补上时长
+        media = task.get("media") or get_cached_media(input_path)
+        config = task["config"]
+        caps = self.encoder_matrix.get(config.v_enc)
 
-        self.table_queue.setItem(idx, 2, self.create_table_item("压制中 🚀"))
+        # 直通预检：片源已经达标的视频/音频直接 -c copy，决策逐条记进日志
+        if self.settings["stream_copy"]["enabled"]:
+            config, notes = plan_stream_copy(config, media, caps)
+            for note in notes:
+                print(f"📋 [{os.path.basename(input_path)}] {note}")
+
+        # 能力矩阵里明确不支持的组合直接判错（入队后矩阵才测完、或片源分辨率超限），不让它白白解码几分钟再失败
+        problem = check_config_capabilities(config, caps, media)
+        if problem:
+            print(f"⛔ 跳过任务 {os.path.basename(input_path)}: {problem}")
+            task["status"] = "Error"
+            self.table_queue.setItem(idx, 2, self.create_table_item(f"不支持 ⛔ {problem}"))
+            return False
+
+        self.table_queue.setItem(idx, 2, self.create_table_item("直通中 ⚡" if config.v_enc == "copy" != task["config"].v_enc else "压制中 🚀"))
         task["status"] = "Encoding"
         
         # UI updates for current task
@@ -580,21 +729,24 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         self.btn_start.setText("⏳ 压制中...")
         self.lbl_status.setText(f"状态: 队列第 {idx+1} 个任务...")
 
-        self.total_seconds = get_video_duration(input_path)
+        slot = {"task": task, "worker": None, "total_seconds": media.duration if media and media.duration > 0 else 0,
+                "enable_preview": False, "preview_receiver": None, "last_frame": 0}
+        if media is None:
+            self.probe_service.submit(input_path)
         
-        self.enable_preview = self.chk_preview.isChecked()
+        # 预览画面只有一块：已经有槽位在预览时，新开的槽位不再开预览
+        slot["enable_preview"] = self.chk_preview.isChecked() and not any(s["enable_preview"] for s in self.slots.values())
         
         # ====== 新增内存管道路由 ======
-        self.preview_port = 0 # Worker会随机分配
+        preview_port = 0 # Worker会随机分配
         
-        if self.enable_preview:
+        if slot["enable_preview"]:
             # 开启TCP服务器线程接收MJPEG视频流
             import socket
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.bind(('127.0.0.1', 0))
             sock.listen(1)
-            self.preview_port = sock.getsockname()[1]
-            self.preview_sock = sock
+            preview_port = sock.getsockname()[1]
             
             # 启动独立线程专门接收Socket流
             from PySide6.QtCore import QThread, Signal
@@ -662,30 +814,76 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
                         dummy.close()
                     except: pass
                     
-            self.preview_receiver = PreviewReceiver(sock)
-            self.preview_receiver.frame_received.connect(self.update_preview_frame)
+            slot["preview_receiver"] = PreviewReceiver(sock)
+            slot["preview_receiver"].frame_received.connect(self.update_preview_frame)
             self.lbl_preview.setText("正在建立本地TCP内存管道...")
-            self.preview_receiver.start()
+            slot["preview_receiver"].start()
             
-        dynamic_args = build_ffmpeg_args(ui_config)
+        # 线程份额：只有 CPU 软压的槽位领份额，硬件编码的槽位不占；分段并行时再按同时压制的段数均分给每一段
+        threads = self.thread_budget.acquire(key) if self.thread_budget and config.vendor == "cpu" else 0
+        chunk_plan = self.plan_chunked_encode(config, media, slot["enable_preview"])
+        if chunk_plan and threads:
+            threads = max(1, threads // chunk_plan[1])
+        dynamic_args = build_ffmpeg_args(config, media, caps, threads)
         
-        self.worker = FFmpegWorker(input_file=input_path, output_file=output_path, enable_preview=self.enable_preview, preview_port=self.preview_port, encode_args=dynamic_args)
-        self.worker.log_signal.connect(self.print_log)
-        self.worker.error_signal.connect(self.handle_worker_error)
-        self.worker.finished_signal.connect(self.encoding_finished)
-        self.worker.start()
-
-    def handle_worker_error(self, err_msg):
-        # 抛出弹窗，并更新状态
-        QMessageBox.critical(self, "压制失败", err_msg)
+        two_pass = build_two_pass_args(config, dynamic_args)
+        progress_rate = self.settings["progress"]["max_rate"]
+        log_level = self.settings["progress"]["log_level"]
+        if config.ladder:
+            # 码率阶梯：一个进程解码一次、输出多路，最后一路的路径照常作为 Worker 的输出文件
+            ladder_args, last_output = build_ladder_args(config, output_path, media, caps, threads)
+            worker = FFmpegWorker(input_file=input_path, output_file=last_output, enable_preview=slot["enable_preview"], preview_port=preview_port, encode_args=ladder_args, progress_rate=progress_rate, log_level=log_level)
+        elif two_pass:
+            # 每个任务一个独立的临时目录放统计文件，并发的两遍任务互不干扰；任务结束由 Worker 清理
+            pass1_args, pass2_args = two_pass
+            work_dir = tempfile.mkdtemp(prefix="ffui_2pass_")
+            worker = FFmpegWorker(input_file=input_path, output_file=output_path, enable_preview=slot["enable_preview"], preview_port=preview_port,
+                                  encode_args=pass2_args, pre_passes=[pass1_args], work_dir=work_dir, progress_rate=progress_rate, log_level=log_level)
+        elif chunk_plan:
+            n_chunks, max_parallel = chunk_plan
+            chunk_cfg = self.settings["chunked"]
+            scene_threshold = chunk_cfg["scene_threshold"] if chunk_cfg["scene_detect"] else None
+            worker = ChunkedFFmpegWorker(input_path, output_path, dynamic_args, media.duration, n_chunks, max_parallel, scene_threshold, progress_rate, log_level)
+        else:
+            worker = FFmpegWorker(input_file=input_path, output_file=output_path, enable_preview=slot["enable_preview"], preview_port=preview_port, encode_args=dynamic_args, progress_rate=progress_rate, log_level=log_level)
+        slot["worker"] = worker
+        self.slots[key] = slot
+        self._focus_slot = key
+        # 信号带上任务键，回调据此找到自己的槽位
+        worker.log_signal.connect(self.print_log)
+        worker.progress_signal.connect(partial(self.on_progress, key))
+        worker.error_signal.connect(partial(self.handle_worker_error, key))
+        worker.finished_signal.connect(partial(self.encoding_finished, key))
+        worker.start()
+        return True
+
+    def plan_chunked_encode(self, config, media, enable_preview=False):
+        """
+        是否走分段并行压制：CPU 软压 + 长片源 + 未开预览
+        :return: (总段数, 同时压制段数)，不分段时返回 None
+        """
+        chunk_cfg = self.settings["chunked"]
+        if not chunk_cfg["enabled"] or config.vendor != "cpu" or enable_preview:
+            return None
+        if config.rc == "2pass" or config.ladder:
+            return None # 两遍编码的统计文件是整片的、阶梯本身已经一进多出，都不按段拆
+        if media is None or media.duration < chunk_cfg["min_duration"]:
+            return None
+        max_parallel = chunk_cfg["max_parallel"] or max(2, (os.cpu_count() or 1) // 8)
+        n_chunks = chunk_cfg["chunks"] or max_parallel * 2
+        return n_chunks, max_parallel
+
+    def handle_worker_error(self, key, err_msg):
+        # 先把队列状态标红再弹窗：弹窗期间其他槽位照常跑，这个槽位的 finished 信号也可能先到
+        slot = self.slots.get(key)
+        if slot is not None:
+            task = slot["task"]
+            task["status"] = "Error"
+            if task in self.task_queue:
+                self.table_queue.setItem(self.task_queue.index(task), 2, self.create_table_item("错误 ❌"))
         self.lbl_status.setText("状态: 压制失败 ❌")
-        
-        # 将队列状态标红
-        if self.current_task_idx < len(self.task_queue):
-            self.task_queue[self.current_task_idx]["status"] = "Error"
-            self.table_queue.setItem(self.current_task_idx, 2, self.create_table_item("错误 ❌"))
-            
-        self.encoding_finished()
+        QMessageBox.critical(self, "压制失败", err_msg)
+        # 收尾（归还槽位、接着排下一个）交给 Worker 随后发出的 finished 信号
 
     def start_encoding(self):
         input_path = self.txt_input.text().strip()
@@ -708,9 +906,28 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
             QMessageBox.warning(self, "警告", "请先选择需要压制的视频以添加到队列！")
             return
             
-        self.add_task_to_table(input_path, output_path, self.get_current_ui_state())
+        ui_state = self.get_current_ui_state()
+        config = self.make_encode_config(ui_state)
+        if config is None:
+            return
+        self.add_task_to_table(input_path, output_path, ui_state, config)
+
+    def make_encode_config(self, ui_state):
+        """
+        入队关卡：UI 状态 -> 不可变的 EncodeConfig，非法组合和能力矩阵明确不支持的组合在这里就拦下
+        :return: EncodeConfig；不合法时弹窗提示并返回 None
+        """
+        try:
+            config = EncodeConfig.from_ui_state(ui_state)
+            problem = check_config_capabilities(config, self.encoder_matrix.get(config.v_enc))
+        except EncodeConfigError as e:
+            problem = str(e)
+        if problem:
+            QMessageBox.warning(self, "参数无效", f"当前参数组合无法压制，未加入队列：\n{problem}")
+            return None
+        return config
         
-    def add_task_to_table(self, input_path, output_path, ui_state):
+    def add_task_to_table(self, input_path, output_path, ui_state, config):
         from PySide6.QtWidgets import QTableWidgetItem
         try:
             # 打开一条只读把手从而触发系统锁定文件的防删保护
@@ -723,6 +940,7 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
             "input": input_path,
             "output": output_path,
             "ui_state": ui_state,
+            "config": config,
             "status": "等待中",
             "file_handle": file_handle # 持有句柄
         }
@@ -735,10 +953,49 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         ext = os.path.splitext(output_path)[1]
         
         self.table_queue.setItem(row, 0, self.create_table_item(filename))
-        self.table_queue.setItem(row, 1, self.create_table_item(f"{ui_state['v_enc']} {ext}"))
+        self.table_queue.setItem(row, 1, self.create_table_item(self.format_task_target(config, ext)))
         self.table_queue.setItem(row, 2, self.create_table_item("等待中"))
+
+        # 片源情报：缓存命中直接填，否则丢给后台探针池，探完再回填
+        media = get_cached_media(input_path)
+        if media is not None:
+            task["media"] = media
+            self.table_queue.setItem(row, 3, self.create_table_item(format_media_summary(media)))
+        else:
+            self.table_queue.setItem(row, 3, self.create_table_item("探测中..."))
+            self.probe_service.submit(input_path)
         
         self.check_queue_selection_state()
+
+    def format_task_target(self, config, ext):
+        """队列表格“目标”一列：编码器 + 格式，阶梯任务再标上一共几路"""
+        text = f"{config.v_enc} {ext}"
+        if config.ladder:
+            text += f" ×{len(config.ladder)} 路"
+        return text
+
+    def on_probe_result(self, file_path, media):
+        """后台探针每完成一个文件就回调一次：回填队列表格，并刷新体积预估"""
+        # 探测失败不会进缓存，记下来避免体积预估反复重新提交同一个坏文件
+        if media is None:
+            self._failed_probes.add(file_path)
+        else:
+            self._failed_probes.discard(file_path)
+
+        for row, task in enumerate(self.task_queue):
+            if task["input"] == file_path:
+                task["media"] = media
+                self.table_queue.setItem(row, 3, self.create_table_item(format_media_summary(media)))
+
+        if self.txt_input.text().strip() == file_path:
+            self.update_estimated_size()
+            if media is not None and file_path == self._info_probe_path:
+                self.lbl_preview.setText(format_media_info(media))
+
+        # 正在压制的任务如果开压时还没拿到时长，这里补上，进度条随即开始走动
+        for slot in self.slots.values():
+            if media is not None and slot["task"]["input"] == file_path:
+                slot["total_seconds"] = media.duration
         
     def create_table_item(self, text):
         from PySide6.QtWidgets import QTableWidgetItem
@@ -757,27 +1014,101 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         self.is_queue_running = True
         self.btn_start_queue.setEnabled(False)
         self.btn_start.setEnabled(False)
+        if self.concurrency is not None:
+            self._concurrency_timer.start()
         
         self._run_next_pending_task()
         
     def _run_next_pending_task(self):
-        # Find first pending task from the very beginning
-        found = False
-        for i, t in enumerate(self.task_queue):
-            if t["status"] == "等待中" or t["status"] == "Pending":
-                self.current_task_idx = i
-                found = True
+        # 把空闲槽位填满：按队列顺序挑现在能开压的任务，某类编码器的槽位满了不挡后面其他类别的任务
+        if self.concurrency is not None:
+            self.update_concurrency_workload()
+        held_vendors = set() # 被准入控制压住的类别：本轮跳过，不挡后面其他类别的任务
+        while self.is_queue_running and self.scheduler.has_free_slot():
+            if self.concurrency is not None and len(self.slots) >= self.concurrency.limit:
                 break
-                
-        if found:
-            self.start_encoding_task(self.current_task_idx)
-        else:
+            pending = [t for t in self.task_queue if (t["status"] == "等待中" or t["status"] == "Pending")
+                       and t["config"].vendor not in held_vendors]
+            key = self.scheduler.pick_next([(id(t), t["config"].vendor) for t in pending])
+            if key is None:
+                break
+            task = next(t for t in pending if id(t) == key)
+            if not self.admit_task(task):
+                held_vendors.add(task["config"].vendor)
+                continue
+            self.scheduler.acquire(key, task["config"].vendor)
+            if self.start_encoding_task(task):
+                if self.admission:
+                    self.admission.admitted()
+                if self.concurrency is not None:
+                    self.concurrency.job_started()
+            else:
+                self.scheduler.release(key)
+
+        if not self.slots:
             self.is_queue_running = False
+            self._concurrency_timer.stop()
             self.btn_start_queue.setEnabled(True)
             self.btn_start.setEnabled(True)
             self.lbl_status.setText("状态: 队列中所有任务均已处理完毕！")
             QMessageBox.information(self, "提示", "所有排队的任务皆已处理完毕。")
             
+    def update_concurrency_workload(self):
+        """当前负载类别 = 在跑任务的类别组合，一个都没在跑时看队首的排队任务；类别变了就换用它的最优并发记录"""
+        pending = [t for t in self.task_queue if t["status"] == "等待中" or t["status"] == "Pending"]
+        tasks = [slot["task"] for slot in self.slots.values()] or pending[:1]
+        if not tasks:
+            return
+        key = "+".join(sorted({workload_key(t["config"], t.get("media")) for t in tasks}))
+        # 实际能开到的路数：在跑和排队任务涉及的各编码器类别槽位之和，再受总槽位限制；
+        # 上限设得比这高就永远跑不满、定不下来
+        vendors = {t["config"].vendor for t in tasks + pending}
+        reach = min(self.scheduler.max_slots, sum(self.scheduler.vendor_limit(v) for v in vendors))
+        if self.concurrency.set_workload(key, reach):
+            state = "沿用记录" if self.concurrency.settled else "从 1 路开始测量"
+            print(f"📈 自适应并发 [{key}]: {state}，上限 {self.concurrency.limit} 路")
+            self.apply_concurrency_limit()
+
+    def apply_concurrency_limit(self):
+        """线程预算按实际会同时跑的 CPU 任务数来切份额（只影响之后开压的任务）"""
+        if self.thread_budget:
+            self.thread_budget.set_slots(min(self.concurrency.limit, self._cpu_slots))
+
+    def observe_concurrency(self):
+        """每秒把合计帧数喂给自适应并发控制器，上限变了就写日志并按新上限补开任务"""
+        pending = [t for t in self.task_queue if t["status"] == "等待中" or t["status"] == "Pending"]
+        can_fill = any(self.scheduler.can_start(t["config"].vendor) for t in pending)
+        change = self.concurrency.observe(self._frames_done, len(self.slots), can_fill)
+        if change is None:
+            return
+        limit, why = change
+        print(f"📈 自适应并发 [{self.concurrency.key}]: {why}")
+        self.apply_concurrency_limit()
+        if self.is_queue_running:
+            self._run_next_pending_task()
+
+    def admit_task(self, task):
+        """
+        准入判断：系统负载超阈值时压住任务，定时器到点再回来试；判断结果变化时写日志和状态栏
+        :return: 现在能开压返回 True
+        """
+        if self.admission is None:
+            return True
+        ok, reason = self.admission.check(task["config"].vendor, len(self.slots))
+        if ok:
+            if self._admission_hold:
+                print(f"✅ 负载已回落，放行排队任务 {os.path.basename(task['input'])}" + (f" ({self.admission.last_load})" if self.admission.last_load else ""))
+            self._admission_hold = ""
+            return True
+
+        if reason != self._admission_hold and not reason.startswith("上一个任务刚开压"):
+            print(f"⏳ 暂缓开压 {os.path.basename(task['input'])}: {reason}" + (f" ({self.admission.last_load})" if self.admission.last_load else ""))
+        self._admission_hold = reason
+        self.table_queue.setItem(self.task_queue.index(task), 2, self.create_table_item(f"等待资源 ⏳ {reason}"))
+        self.lbl_status.setText(f"状态: {len(self.slots)} 路压制中，排队任务暂缓: {reason}")
+        self._admission_timer.start()
+        return False
+
     def load_queue_item_to_ui(self):
         selected_ranges = self.table_queue.selectedRanges()
         if not selected_ranges:
@@ -869,6 +1200,9 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
             rows.extend(range(r.topRow(), r.bottomRow() + 1))
             
         ui_state = self.get_current_ui_state()
+        config = self.make_encode_config(ui_state)
+        if config is None:
+            return
         target_ext = self.cb_format.currentText()
         if not target_ext.startswith('.'):
             target_ext = f".{target_ext}"
@@ -885,6 +1219,7 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
                 continue # Skip running tasks
                 
             task["ui_state"] = ui_state
+            task["config"] = config
             
             # If it is a single item update, we also update the input/output paths from text boxes
             if len(rows) == 1:
@@ -903,7 +1238,7 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
             ext = os.path.splitext(task["output"])[1]
             
             self.table_queue.setItem(row, 0, self.create_table_item(filename))
-            self.table_queue.setItem(row, 1, self.create_table_item(f"{ui_state['v_enc']} {ext}"))
+            self.table_queue.setItem(row, 1, self.create_table_item(self.format_task_target(config, ext)))
             updated_count += 1
             
         if updated_count > 0:
@@ -968,12 +1303,33 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
             self.clear_task_handle(task)
             self.task_queue.pop(row)
             self.table_queue.removeRow(row)
-            # Adjust current_task_idx if necessary when deleting items prior to current
-            if row < self.current_task_idx:
-                self.current_task_idx -= 1
                 
         self.check_queue_selection_state()
                 
+    def deep_probe_queue_item(self):
+        """把选中任务的片源情报按需升级为 deep 深度（逐帧计数），结果照常回填表格"""
+        rows = set()
+        for r in self.table_queue.selectedRanges():
+            rows.update(range(r.topRow(), r.bottomRow() + 1))
+
+        for row in sorted(rows):
+            if 0 <= row < len(self.task_queue):
+                file_path = self.task_queue[row]["input"]
+                self.table_queue.setItem(row, 3, self.create_table_item("深度探测中..."))
+                self.probe_service.submit(file_path, "deep")
+
+    def cancel_queue_item(self):
+        """只停掉选中的正在压制的任务，其他槽位和队列照常推进"""
+        rows = set()
+        for r in self.table_queue.selectedRanges():
+            rows.update(range(r.topRow(), r.bottomRow() + 1))
+
+        for row in rows:
+            if 0 <= row < len(self.task_queue):
+                slot = self.slots.get(id(self.task_queue[row]))
+                if slot is not None and slot["worker"].isRunning():
+                    slot["worker"].stop()
+
     def show_queue_context_menu(self, pos):
         menu = QMenu(self)
         
@@ -984,8 +1340,16 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         action_reset = QAction("↺ 重置状态", self)
         action_reset.triggered.connect(self.reset_queue_item)
         menu.addAction(action_reset)
+
+        action_deep_probe = QAction("🔬 深度探测 (精确帧数)", self)
+        action_deep_probe.triggered.connect(self.deep_probe_queue_item)
+        menu.addAction(action_deep_probe)
         
         menu.addSeparator()
+
+        action_cancel = QAction("⏹ 停止选中任务", self)
+        action_cancel.triggered.connect(self.cancel_queue_item)
+        menu.addAction(action_cancel)
         
         action_delete = QAction("❌ 删除任务", self)
         action_delete.triggered.connect(self.delete_queue_item)
@@ -994,75 +1358,93 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         menu.exec_(self.table_queue.mapToGlobal(pos))
             
     def clear_queue(self):
-        if hasattr(self, 'worker') and self.worker.isRunning():
+        if self.slots:
             QMessageBox.warning(self, "警告", "正在压制中，无法清空队列！")
             return
             
+        # 队列清空后，还没探完的文件也没必要再探了
+        self.probe_service.cancel_all()
+
         for task in self.task_queue:
             self.clear_task_handle(task)
             
         self.task_queue.clear()
         self.table_queue.setRowCount(0)
-        self.current_task_idx = 0
         
         self.check_queue_selection_state()
         
     def toggle_pause(self):
         if self.btn_pause.text() == "⏸ 暂停":
-            self.worker.pause()
+            for slot in self.slots.values():
+                slot["worker"].pause()
             self.btn_pause.setText("▶ 恢复")
             self.lbl_status.setText("状态: 已暂停 (显卡已挂起)")
         else:
-            self.worker.resume()
+            for slot in self.slots.values():
+                slot["worker"].resume()
             self.btn_pause.setText("⏸ 暂停")
             self.lbl_status.setText("状态: 正在狂飙压制中...")
             
     def stop_encoding(self):
         # Stop global queue progression
         self.is_queue_running = False
+        self._admission_timer.stop()
+        self._concurrency_timer.stop()
+        self._admission_hold = ""
+        for row, task in enumerate(self.task_queue):
+            if task["status"] == "等待中":
+                self.table_queue.setItem(row, 2, self.create_table_item("等待中"))
         self.btn_start_queue.setEnabled(True)
         
-        # 只要触发停止按钮，只管杀后台，后续的 UI 更新全部交给信号自然触发
-        if hasattr(self, 'worker') and self.worker.isRunning():
-            self.worker.stop()
+        # 只要触发停止按钮，只管杀掉所有槽位的后台，后续的 UI 更新全部交给信号自然触发
+        for slot in list(self.slots.values()):
+            if slot["worker"].isRunning():
+                slot["worker"].stop()
 
     def print_log(self, text):
         #print(text) #调试时直接往控制台输出
-        # ====== 基于 -progress 的解析逻辑 ======
-        if text.startswith("out_time="):
-            time_str = text.split("=")[1].strip()
-            if time_str and time_str != "N/A":
-                # time_str 是 00:00:00.000000 的形式
-                try:
-                    h, m, s = time_str.split(':')
-                    current_seconds = int(h) * 3600 + int(m) * 60 + float(s)
-                    percent = int((current_seconds / self.total_seconds) * 100)
-                    percent = max(0, min(100, percent))
-                    self.progress_bar.setValue(percent)
-                    # 缓存给下面显示用
-                    self._last_time_str = time_str[:11] 
-                except: pass
-                
-        elif text.startswith("speed="):
-            speed_text = text.split("=")[1].strip()
-            # 从缓存里拿时间
-            t = getattr(self, '_last_time_str', '--')
-            s = getattr(self, '_last_size_str', '--')
-            self.lbl_status.setText(f"状态: 狂飙压制中... | 速度: {speed_text} | 当前进度: {t} | 当前文件大小：{s}")
-            
-        elif text.startswith("total_size="):
-            size_bytes_str = text.split("=")[1].strip()
-            if size_bytes_str and size_bytes_str.isdigit():
-                size_bytes = int(size_bytes_str)
-                if size_bytes >= 1024 * 1024 * 1024:
-                    storage_text = f"{size_bytes / (1024 * 1024 * 1024):.2f} GiB"
-                elif size_bytes >= 1024 * 1024:
-                    storage_text = f"{size_bytes / (1024 * 1024):.2f} MiB"
-                else:
-                    storage_text = f"{size_bytes / 1024:.2f} KiB"
-                self._last_size_str = storage_text
-                
-        # 兼容 FFmpeg 一些普通的日志行直接显示在UI下方，比如一些警告。但不用太过频繁。
+        # -progress 的进度块已经在 Worker 线程里解析成 Progress，走 on_progress；这里只剩 ffmpeg 的普通日志行
+        pass
+
+    def on_progress(self, key, p):
+        """渲染某个槽位的 Worker 发来的 Progress 记录（已限流，每秒最多几条）"""
+        slot = self.slots.get(key)
+        if slot is None:
+            return
+        task = slot["task"]
+        # 合计帧数只增不减：两遍编码第二遍帧号从 0 重新数，这时只重置基准
+        if p.frame > slot["last_frame"]:
+            self._frames_done += p.frame - slot["last_frame"]
+        slot["last_frame"] = p.frame
+        percent = None
+        if slot["total_seconds"] > 0:
+            percent = max(0, min(100, int(p.out_seconds / slot["total_seconds"] * 100)))
+
+        # 每个槽位的进度写在自己那一行的状态列里
+        if task in self.task_queue:
+            speed = f" {p.speed:.2f}x" if p.speed else ""
+            text = f"压制中 🚀 {percent}%{speed}" if percent is not None else f"压制中 🚀{speed}"
+            self.table_queue.setItem(self.task_queue.index(task), 2, self.create_table_item(text))
+
+        # 主进度条和状态栏只跟随焦点槽位
+        if key != self._focus_slot:
+            return
+        if percent is not None:
+            self.progress_bar.setValue(percent)
+
+        seconds = p.out_seconds
+        time_text = f"{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:{seconds % 60:05.2f}"
+        if p.size >= 1024 * 1024 * 1024:
+            storage_text = f"{p.size / (1024 * 1024 * 1024):.2f} GiB"
+        elif p.size >= 1024 * 1024:
+            storage_text = f"{p.size / (1024 * 1024):.2f} MiB"
+        else:
+            storage_text = f"{p.size / 1024:.2f} KiB"
+        speed_text = f"{p.speed:.2f}x" if p.speed else "--"
+        running = f"{len(self.slots)} 路并行 | " if len(self.slots) > 1 else ""
+        if self.concurrency is not None and not self.concurrency.settled:
+            running += f"并发测量中 (上限 {self.concurrency.limit}) | "
+        self.lbl_status.setText(f"状态: 狂飙压制中... | {running}速度: {speed_text} | 当前进度: {time_text} | 当前文件大小：{storage_text}")
         
     def update_preview_frame(self, data):
         """直接接收子线程传来的 JPEG 二进制流，无需读写文件"""
@@ -1078,81 +1460,110 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
         except Exception:
             pass
 
-    def encoding_finished(self):
-        # 1. 恢复所有按钮的基础状态
-        self.btn_start.setEnabled(True)
-        self.btn_start.setText("🚀 开始") # === 新增：将按钮文字彻底恢复初始状态 ===
-        self.btn_pause.setEnabled(False)
-        self.btn_stop.setEnabled(False)
-        self.btn_pause.setText("⏸ 暂停")
+    def encoding_finished(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        task, worker = slot["task"], slot["worker"]
+
+        # 0. 归还槽位和线程份额
+        self.scheduler.release(key)
+        if self.thread_budget:
+            self.thread_budget.release(key)
+        if self._focus_slot == key:
+            self._focus_slot = next(iter(self.slots), None)
+
+        # 1. 所有槽位都空了才恢复按钮的基础状态
+        if not self.slots:
+            self.btn_start.setEnabled(True)
+            self.btn_start.setText("🚀 开始") # === 新增：将按钮文字彻底恢复初始状态 ===
+            self.btn_pause.setEnabled(False)
+            self.btn_stop.setEnabled(False)
+            self.btn_pause.setText("⏸ 暂停")
         
-        # 2. 停止接收线程
-        if hasattr(self, 'preview_receiver'):
-            self.preview_receiver.stop()
+        # 2. 停止这个槽位的接收线程
+        if slot["preview_receiver"] is not None:
+            slot["preview_receiver"].stop()
+
+        row = self.task_queue.index(task) if task in self.task_queue else -1
 
         # 3. 核心分流：判断到底是正常跑完，还是被中途干掉的？
-        if getattr(self.worker, 'is_cancelled', False):
+        if task["status"] == "Error":
+            # 出错的任务已经在 handle_worker_error 里标过红了
+            print(f"====== 压制失败：{os.path.basename(task['input'])} ======")
+            if slot["enable_preview"]:
+                self.lbl_preview.clear()
+                self.lbl_preview.setText("当前画面获取结束")
+
+        elif getattr(worker, 'is_cancelled', False):
             # 被强行中止的 UI 逻辑
-            # 但是注意如果是因为 error 而调用过来的，上面可能已经设了状态
             if "错误" not in self.lbl_status.text() and "失败" not in self.lbl_status.text():
                 self.lbl_status.setText("状态: 压制已强制中止 🚫")
                 
-            if self.enable_preview:
+            if slot["enable_preview"]:
                 self.lbl_preview.clear()
                 self.lbl_preview.setText("当前画面获取结束")
-            print("====== 压制已被用户或异常中止！======")
+            print(f"====== 压制已被用户或异常中止：{os.path.basename(task['input'])} ======")
             
             # Update Queue Status
-            if self.current_task_idx < len(self.task_queue):
-                # 只有在还没改状态时才改
-                if self.task_queue[self.current_task_idx]["status"] not in ["Error", "错误 ❌"]:
-                    self.task_queue[self.current_task_idx]["status"] = "Cancelled"
-                    self.table_queue.setItem(self.current_task_idx, 2, self.create_table_item("已取消 🚫"))
-                
-            self.is_queue_running = False
-            self.btn_start_queue.setEnabled(True)
+            task["status"] = "Cancelled"
+            if row >= 0:
+                self.table_queue.setItem(row, 2, self.create_table_item("已取消 🚫"))
 
         else:
             # 正常顺利完成的 UI 逻辑
-            self.lbl_status.setText("状态: 压制完成！ ✅")
-            self.progress_bar.setValue(100) # 只有正常完成才强行拉满进度条
-            if self.enable_preview:
+            if not self.slots:
+                self.lbl_status.setText("状态: 压制完成！ ✅")
+                self.progress_bar.setValue(100) # 只有正常完成才强行拉满进度条
+            if slot["enable_preview"]:
                 self.lbl_preview.clear()
                 self.lbl_preview.setText("压制已完成\n(画面预览结束)")
-            print("====== 压制彻底结束！======")
+            print(f"====== 压制彻底结束：{os.path.basename(task['input'])} ======")
             
             # Update Queue Status
-            if self.current_task_idx < len(self.task_queue):
-                self.task_queue[self.current_task_idx]["status"] = "Completed"
-                self.table_queue.setItem(self.current_task_idx, 2, self.create_table_item("完成 ✅"))
-                self.clear_task_handle(self.task_queue[self.current_task_idx])
+            task["status"] = "Completed"
+            if row >= 0:
+                self.table_queue.setItem(row, 2, self.create_table_item("完成 ✅"))
+            self.clear_task_handle(task)
                 
-            # Auto-start next task if in queue mode
-            if self.is_queue_running:
-                self._run_next_pending_task()
+        # 停止键会先把 is_queue_running 关掉；单独停掉某个任务、或任务失败时，队列照常往下排
+        if self.is_queue_running:
+            self._run_next_pending_task()
+        elif not self.slots:
+            self.btn_start_queue.setEnabled(True)
     
     def select_input_file(self):
         # 呼出 Windows 原生文件选择框，限制只能选常见视频格式
         file_path, _ = QFileDialog.getOpenFileName(self, "选择原视频", "", "视频文件 (*.mp4 *.mkv *.mov *.avi *.mkv);;所有文件 (*.*)")
         if file_path:
+            # 换上一套极客专用的荧光青色、等宽字体样式
+            self.lbl_preview.setStyleSheet("background-color: #0b0c10; color: #45a3ad; border-radius: 8px; font-weight: bold; font-family: Consolas, monospace; font-size: 16px;")
+            self.lbl_preview.setText("正在扫描视频底层数据...")
+            
+            # 后台呼叫探针，情报到达后由 on_info_probe_result 贴到屏幕上；UI 线程不等子进程
+            # 先于填路径提交：填路径会触发体积预估，它要看到面板探针已在路上才不会重复探测
+            self._info_probe_path = file_path
+            self._info_probe_pending = True
+            self.info_probe_service.cancel_all()
+            self.info_probe_service.submit(file_path)
+
             # 把选中的路径填入输入框
             self.txt_input.setText(file_path)
             
             # 比如输入是 D:/video.mp4，输出自动变成 D:/video_output.mp4
             default_out = file_path.rsplit('.', 1)[0] + "_output.mp4"
             self.txt_output.setText(default_out)
-        
-        if file_path:
-            # 换上一套极客专用的荧光青色、等宽字体样式
-            self.lbl_preview.setStyleSheet("background-color: #0b0c10; color: #45a3ad; border-radius: 8px; font-weight: bold; font-family: Consolas, monospace; font-size: 16px;")
-            self.lbl_preview.setText("正在扫描视频底层数据...")
-            
-            from PySide6.QtWidgets import QApplication
-            QApplication.processEvents() # 强制刷新 UI，让文字瞬间亮起
-            
-            # 呼叫探针，把拿到情报贴在屏幕上
-            info_text = probe_video_info(file_path)
-            self.lbl_preview.setText(info_text)
+
+    def on_info_probe_result(self, file_path, media):
+        # 只认最新一次选择的结果，被顶替的旧结果直接丢弃
+        if file_path != self._info_probe_path:
+            return
+        self._info_probe_pending = False
+        if media is None:
+            self.lbl_preview.setText("❌ 探针读取失败: ffprobe 无有效输出")
+        else:
+            self.lbl_preview.setText(format_media_info(media))
+        self.on_probe_result(file_path, media)
 
     def select_output_file(self):
         # 呼出 Windows 原生保存框
@@ -1161,16 +1572,28 @@ class FFmpegGUI(QMainWindow, Ui_MainWindow):
             self.txt_output.setText(file_path)
 
     def closeEvent(self, event: QCloseEvent):
-        if hasattr(self, 'worker') and self.worker.isRunning():
+        if any(slot["worker"].isRunning() for slot in self.slots.values()):
             reply = QMessageBox.question(self, '确认退出', "压制尚未完成，确定要强行退出并放弃任务吗？",
                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
-                self.worker.stop()
+                self.is_queue_running = False
+                for slot in self.slots.values():
+                    slot["worker"].stop()
+                self.probe_service.shutdown()
+                self.info_probe_service.shutdown()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.probe_service.shutdown()
+            self.info_probe_service.shutdown()
             event.accept()
+        if event.isAccepted():
+            for attr in ("_bg_encoder_probe", "_matrix_worker"):
+                worker = getattr(self, attr, None)
+                if worker is not None:
+                    worker.stop()
+                    worker.wait()
 
     def set_combo_tooltips(self, combo, tooltips_dict):
         """
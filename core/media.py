@@ -0,0 +1,169 @@
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def parse_frame_rate(rate_str):
+    """把 ffprobe 的 '30000/1001' 这类分数帧率翻译成浮点数"""
+    if not rate_str:
+        return 0.0
+    if '/' in str(rate_str):
+        num, den = str(rate_str).split('/')
+        return int(num) / int(den) if int(den) != 0 else 0.0
+    return _to_float(rate_str)
+
+
+class StreamInfo:
+    """单条流的情报（视频/音频/字幕通用，不适用的字段保持默认值）"""
+    __slots__ = ("index", "codec_type", "codec_name", "profile", "width", "height", "pix_fmt",
+                 "fps", "bit_rate", "sample_rate", "channels", "frame_count")
+
+    def __init__(self, index=0, codec_type="", codec_name="", profile="", width=0, height=0, pix_fmt="",
+                 fps=0.0, bit_rate=0, sample_rate=0, channels=0, frame_count=0):
+        self.index = index
+        self.codec_type = codec_type
+        self.codec_name = codec_name
+        self.profile = profile
+        self.width = width
+        self.height = height
+        self.pix_fmt = pix_fmt
+        self.fps = fps
+        self.bit_rate = bit_rate
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_count = frame_count
+
+    @classmethod
+    def from_ffprobe(cls, s):
+        return cls(
+            index=_to_int(s.get("index")),
+            codec_type=s.get("codec_type", ""),
+            codec_name=s.get("codec_name", ""),
+            profile=s.get("profile", ""),
+            width=_to_int(s.get("width")),
+            height=_to_int(s.get("height")),
+            pix_fmt=s.get("pix_fmt", ""),
+            fps=parse_frame_rate(s.get("r_frame_rate")),
+            bit_rate=_to_int(s.get("bit_rate")),
+            sample_rate=_to_int(s.get("sample_rate")),
+            channels=_to_int(s.get("channels")),
+            frame_count=_to_int(s.get("nb_read_frames") or s.get("nb_frames")),
+        )
+
+    def __repr__(self):
+        return f"StreamInfo(#{self.index} {self.codec_type}:{self.codec_name})"
+
+
+class MediaInfo:
+    """
+    一次探测得到的完整片源情报：信息面板、体积预估、进度条与参数翻译引擎共用同一份对象
+    """
+    __slots__ = ("path", "format_name", "duration", "size", "bit_rate", "keyframe_interval", "streams", "probe_mode")
+
+    def __init__(self, path, format_name="", duration=0.0, size=0, bit_rate=0, keyframe_interval=0.0, streams=None,
+                 probe_mode="full"):
+        self.path = path
+        self.format_name = format_name
+        self.duration = duration
+        self.size = size
+        self.bit_rate = bit_rate
+        self.keyframe_interval = keyframe_interval
+        self.streams = streams or []
+        self.probe_mode = probe_mode
+
+    @classmethod
+    def from_ffprobe(cls, path, data):
+        fmt = data.get("format", {})
+        streams = [StreamInfo.from_ffprobe(s) for s in data.get("streams", [])]
+        duration = _to_float(fmt.get("duration"))
+        if duration <= 0:
+            duration = max((_to_float(s.get("duration")) for s in data.get("streams", [])), default=0.0)
+        return cls(
+            path=path,
+            format_name=fmt.get("format_name", ""),
+            duration=duration,
+            size=_to_int(fmt.get("size")),
+            bit_rate=_to_int(fmt.get("bit_rate")),
+            keyframe_interval=_to_float(data.get("keyframe_interval")),
+            streams=streams,
+            probe_mode=data.get("probe_mode", "full"),
+        )
+
+    @property
+    def video(self):
+        return next((s for s in self.streams if s.codec_type == "video"), None)
+
+    @property
+    def audio(self):
+        return next((s for s in self.streams if s.codec_type == "audio"), None)
+
+    @property
+    def frame_count(self):
+        """优先使用容器记录的帧数，没有时用 时长 x 帧率 估算"""
+        v = self.video
+        if v is None:
+            return 0
+        if v.frame_count:
+            return v.frame_count
+        return int(round(self.duration * v.fps))
+
+    @property
+    def video_bit_rate(self):
+        """视频流码率；容器没单独记录时，用总码率减去音频码率近似"""
+        v = self.video
+        if v is None:
+            return 0
+        if v.bit_rate:
+            return v.bit_rate
+        audio_total = sum(s.bit_rate for s in self.streams if s.codec_type == "audio")
+        return max(self.bit_rate - audio_total, 0)
+
+    def __repr__(self):
+        return f"MediaInfo({self.path!r}, {self.duration:.2f}s, {len(self.streams)} streams)"
+
+
+def format_media_info(info):
+    """把 MediaInfo 排版成黑色监视器面板上的情报文字"""
+    v = info.video
+    if v is None:
+        return "❌ 未能识别到有效的视频流"
+
+    bitrate_display = f"{round(info.bit_rate / 1000000, 2)} Mbps" if info.bit_rate else "动态/未知"
+
+    a = info.audio
+    audio_codec_text = a.codec_name.upper() if a else "无音轨"
+    audio_sample_text = f" {a.sample_rate} Hz" if a and a.sample_rate else " 未知"
+    audio_bitrate_text = f"{round(a.bit_rate / 1000, 2)} Kbps" if a and a.bit_rate else "未知"
+
+    gop_text = f"{info.keyframe_interval:.2f} 秒" if info.keyframe_interval else "未知"
+    # 只有 deep 深度的逐帧计数才是精确帧数，其余都是容器记录或 时长 x 帧率 的估算
+    frames_text = f"{info.frame_count}" if info.probe_mode == "deep" else f"{info.frame_count} (估算)"
+
+    return (
+        f"视频|音频 信息\n\n"
+        f"[ 编码 ] {v.codec_name.upper() or 'UNKNOWN'}|{audio_codec_text}\n"
+        f"[ 分辨率 ] {v.width} x {v.height}\n"
+        f"[ 帧率|采样率 ] {round(v.fps, 2)} FPS|{audio_sample_text}\n"
+        f"[ 码率 ] {bitrate_display}|{audio_bitrate_text}\n"
+        f"[ 时长|帧数 ] {info.duration:.1f} 秒|{frames_text}\n"
+        f"[ 关键帧间隔 ] {gop_text}\n"
+        f"[ 探测深度 ] {info.probe_mode}"
+    )
+
+
+def format_media_summary(info):
+    """队列表格里用的单行简报，例如 '1920x1080 H264 00:10:05'"""
+    if info is None:
+        return "❌ 探测失败"
+    v = info.video
+    if v is None:
+        return "❌ 无视频流"
+    total = int(info.duration)
+    return f"{v.width}x{v.height} {v.codec_name.upper()} {total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
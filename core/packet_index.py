@@ -0,0 +1,219 @@
+import os, time, mmap, struct, bisect, hashlib, tempfile, subprocess
+from array import array
+from core.utils import get_ext_path, get_app_dir
+from core.cache import ProbeCache
+
+# =====================================================================
+# 关键帧/数据包索引：ffprobe -show_packets 只跑一次，按列存成二进制旁路文件，之后全部靠内存映射读取
+# 文件布局（本机字节序）：
+#   头部  magic(8s) | 包数量 n(Q) | 关键帧数量 k(Q)
+#   列区  pts float64[n] | 关键帧时间 float64[k] (升序) | 包大小 uint32[n] | 关键帧标记 uint8[n]
+# =====================================================================
+
+INDEX_MAGIC = b"FFUIIDX1"
+INDEX_HEADER = struct.Struct("=8sQQ")
+
+# 旁路索引目录的容量上限：超过任一项时按最近使用时间（mtime，每次读取都会刷新）淘汰最冷的索引
+MAX_INDEX_FILES = 500
+MAX_INDEX_BYTES = 512 * 1024 * 1024
+# 写到一半就崩溃留下的临时文件，超过这么久（秒）还在就当成残骸清掉
+STALE_TMP_SECONDS = 3600
+
+
+class PacketIndex:
+    """只读的包索引视图：所有列都是 mmap 上的 memoryview，打开 50 GB 片源的索引也只占几 MB 页缓存"""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._file = open(index_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, k = INDEX_HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"不是有效的包索引文件: {index_path}")
+
+        view = memoryview(self._mmap)
+        off = INDEX_HEADER.size
+        self.pts = view[off:off + 8 * n].cast("d")
+        off += 8 * n
+        self.keyframes = view[off:off + 8 * k].cast("d")
+        off += 8 * k
+        self.sizes = view[off:off + 4 * n].cast("I")
+        off += 4 * n
+        self.key_flags = view[off:off + n]
+
+    def __len__(self):
+        return len(self.pts)
+
+    def keyframe_before(self, t):
+        """不晚于 t 的最后一个关键帧时间（O(log n)），t 在首个关键帧之前时返回首个关键帧"""
+        i = bisect.bisect_right(self.keyframes, t)
+        return self.keyframes[max(i - 1, 0)] if len(self.keyframes) else 0.0
+
+    def keyframe_after(self, t):
+        """不早于 t 的第一个关键帧时间，t 之后没有关键帧时返回 None"""
+        i = bisect.bisect_left(self.keyframes, t)
+        return self.keyframes[i] if i < len(self.keyframes) else None
+
+    def nearest_keyframe(self, t):
+        """离 t 最近的关键帧时间"""
+        before = self.keyframe_before(t)
+        after = self.keyframe_after(t)
+        if after is None or abs(t - before) <= abs(after - t):
+            return before
+        return after
+
+    def bitrate_series(self, bucket_seconds=1.0):
+        """按时间分桶累加包大小，返回每个桶的 kbps 列表，供码率曲线使用"""
+        if not len(self.pts):
+            return []
+        buckets = [0] * (int(max(self.pts) / bucket_seconds) + 1)
+        for t, size in zip(self.pts, self.sizes):
+            if t >= 0:
+                buckets[int(t / bucket_seconds)] += size
+        return [b * 8 / 1000 / bucket_seconds for b in buckets]
+
+    def close(self):
+        for attr in ("pts", "keyframes", "sizes", "key_flags"):
+            view = getattr(self, attr, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def get_index_path(file_path):
+    """旁路索引文件路径：以 (路径, 大小, mtime) 计算指纹，源文件变化后自然失效"""
+    key = ProbeCache.make_key(file_path)
+    if key is None:
+        return None
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    return os.path.join(get_app_dir(), "config", "index", f"{digest}.idx")
+
+def prune_index_dir(index_dir, max_files=MAX_INDEX_FILES, max_bytes=MAX_INDEX_BYTES, keep=None):
+    """
+    旁路索引目录的 LRU 淘汰：文件数或总大小超限时，从最久没用的开始删
+    正被内存映射占用的文件（Windows 下删不掉）直接跳过，下次再淘汰
+    :param keep: 不参与淘汰的索引路径（刚建好、马上要用的那一个）
+    """
+    entries = []
+    now = time.time()
+    try:
+        for entry in os.scandir(index_dir):
+            if entry.name.endswith(".idx") and entry.path != keep:
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+            elif entry.name.endswith(".tmp") and now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+    except OSError:
+        return
+    total_files = len(entries) + (1 if keep else 0)
+    total_bytes = sum(size for _, size, _ in entries) + (os.path.getsize(keep) if keep and os.path.exists(keep) else 0)
+
+    entries.sort()
+    for _, size, path in entries:
+        if total_files <= max_files and total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_files -= 1
+        total_bytes -= size
+
+def build_packet_index(file_path, index_path, cancel_event=None):
+    """
+    流式读取 ffprobe 的包列表并直接写入列式数组，不在内存里攒 JSON
+    :return: 成功返回 True；失败或被取消返回 False
+    """
+    cmd = [
+        get_ext_path("ffprobe.exe"), "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,dts_time,size,flags", "-of", "csv=p=0",
+        file_path
+    ]
+    pts, sizes, flags = array("d"), array("I"), array("B")
+    keyframes = []
+
+    CREATE_NO_WINDOW = 0x08000000
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                            text=True, encoding='utf-8', errors='ignore', creationflags=CREATE_NO_WINDOW)
+    try:
+        for line in proc.stdout:
+            if cancel_event is not None and cancel_event.is_set():
+                proc.kill()
+                return False
+            fields = line.strip().split(",")
+            if len(fields) < 4:
+                continue
+            t = fields[0] if fields[0] != "N/A" else fields[1]
+            try:
+                t = float(t)
+                size = int(fields[2])
+            except ValueError:
+                continue
+            is_key = "K" in fields[3]
+            pts.append(t)
+            sizes.append(size)
+            flags.append(1 if is_key else 0)
+            if is_key:
+                keyframes.append(t)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    if proc.returncode != 0 or not pts:
+        print(f"⚠️ 包索引构建失败: {file_path}")
+        return False
+
+    keyframes.sort()
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    # 临时文件名每次唯一：同一片源被两处同时建索引时（分段规划 + 右键菜单）各写各的，不会拼出半截文件
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(index_path) + ".", suffix=".tmp", dir=os.path.dirname(index_path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(pts), len(keyframes)))
+            pts.tofile(f)
+            array("d", keyframes).tofile(f)
+            sizes.tofile(f)
+            flags.tofile(f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        # 另一路已经发布了同一份索引、且正被内存映射占着（Windows 下替换不掉）：内容相同，用它的就行
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        if not os.path.exists(index_path):
+            raise
+    print(f"🗂️ 已建立包索引: {len(pts)} 个数据包, {len(keyframes)} 个关键帧 -> {index_path}")
+    prune_index_dir(os.path.dirname(index_path), keep=index_path)
+    return True
+
+def load_packet_index(file_path, build=True, cancel_event=None):
+    """
+    读取片源的包索引；旁路文件不存在时按需构建一次（整个片源只扫描这一遍）
+    :return: PacketIndex，无法获得时返回 None
+    """
+    index_path = get_index_path(file_path)
+    if index_path is None:
+        return None
+    if not os.path.exists(index_path):
+        if not build or not build_packet_index(file_path, index_path, cancel_event):
+            return None
+    else:
+        try:
+            os.utime(index_path) # 刷新最近使用时间，LRU 淘汰时靠它排序
+        except OSError:
+            pass
+    try:
+        return PacketIndex(index_path)
+    except Exception as e:
+        print(f"⚠️ 包索引读取失败，将在下次使用时重建: {e}")
+        try:
+            os.remove(index_path)
+        except OSError:
+            pass
+        return None
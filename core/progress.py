@@ -0,0 +1,117 @@
+import io, re, time, threading
+from dataclasses import dataclass
+
+# =====================================================================
+# ffmpeg -progress 输出的解析与限流：在 Worker 线程里把十几行 key=value 合成一条记录，
+# 再按最高刷新频率合并，UI 线程只收到结构化的 Progress，只管渲染
+# 进度与诊断日志分走两条管道：-progress pipe:1 独占 stdout，日志走 stderr 由单独的线程读，
+# 日志再多也不会拖慢进度，解析器也不用在日志行里翻找进度
+# =====================================================================
+
+# -progress 块里会出现的键（stream_0_0_q 这类按流编号的另算）；块以 progress=continue/end 结尾
+PROGRESS_KEYS = {"frame", "fps", "bitrate", "total_size", "out_time_us", "out_time_ms", "out_time",
+                 "dup_frames", "drop_frames", "speed", "progress"}
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _number(value, cast=float):
+    """'1234.5kbits/s' / '1.23x' / 'N/A' -> 数值，解析不了返回 0"""
+    m = _NUMBER.search(value or "")
+    return cast(float(m.group())) if m else cast(0)
+
+
+@dataclass(frozen=True)
+class Progress:
+    """ffmpeg -progress 的一个数据块（已解析成数值），未知的字段为 0"""
+    frame: int = 0
+    fps: float = 0.0
+    out_time_us: int = 0
+    size: int = 0          # 已写出的字节数
+    speed: float = 0.0     # 倍速
+    bitrate: float = 0.0   # kbit/s
+    done: bool = False     # progress=end，这一遍已经跑完
+
+    @property
+    def out_seconds(self):
+        return self.out_time_us / 1000000
+
+
+class ProgressParser:
+    """逐行喂 ffmpeg 的输出；-progress 的行被吃掉，凑齐一个块时吐出一条 Progress"""
+    def __init__(self):
+        self._block = {}
+
+    def feed(self, line):
+        """
+        :return: (这行是否属于 -progress 块, 凑齐的 Progress 或 None)；不属于的行调用方照常当日志处理
+        """
+        key, sep, value = line.partition("=")
+        if not sep or (key not in PROGRESS_KEYS and not key.startswith("stream_")):
+            return False, None
+        if key != "progress":
+            self._block[key] = value.strip()
+            return True, None
+
+        b, self._block = self._block, {}
+        out_time_us = _number(b.get("out_time_us"), int)
+        if not out_time_us and b.get("out_time", "").count(":") == 2:
+            # 旧版 ffmpeg 没有 out_time_us，退回解析 HH:MM:SS.ffffff
+            h, m, sec = b["out_time"].split(":")
+            out_time_us = int((_number(h) * 3600 + _number(m) * 60 + _number(sec)) * 1000000)
+        record = Progress(
+            frame=_number(b.get("frame"), int),
+            fps=_number(b.get("fps")),
+            out_time_us=max(out_time_us, 0),
+            size=_number(b.get("total_size"), int),
+            speed=_number(b.get("speed")),
+            bitrate=_number(b.get("bitrate")),
+            done=value.strip() == "end",
+        )
+        return True, record
+
+
+class ProgressThrottle:
+    """
+    把 Progress 合并到每秒最多 max_rate 条：每条都是完整快照，丢掉中间的不损失信息；结束块总是放行
+    线程安全，分段并行的多个读取线程可以共用一个
+    """
+    def __init__(self, max_rate=4):
+        self.interval = 1.0 / max_rate if max_rate and max_rate > 0 else 0.0
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def offer(self, record):
+        """:return: 该发出去的记录，需要合并掉时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            if not record.done and now - self._last < self.interval:
+                return None
+            self._last = now
+        return record
+
+
+def iter_progress_lines(stream):
+    """逐行读进度管道（二进制 stdout）：内容全是 ASCII 的 key=value，不走通用的文本解码"""
+    for raw in stream:
+        yield raw.decode("ascii", "ignore").strip()
+
+
+def start_log_reader(stream, on_line=None, tail_size=10):
+    """
+    在后台线程里逐行读 ffmpeg 的诊断日志（二进制 stderr），可选地逐行回调
+    :return: (线程, 最后 tail_size 行的列表)；进程结束后 join 线程再读列表
+    """
+    tail = []
+    def pump():
+        for line in io.TextIOWrapper(stream, encoding="utf-8", errors="ignore"):
+            line = line.strip()
+            if not line:
+                continue
+            if on_line is not None:
+                on_line(line)
+            tail.append(line)
+            if len(tail) > tail_size:
+                tail.pop(0)
+    thread = threading.Thread(target=pump, name="ffmpeg-log", daemon=True)
+    thread.start()
+    return thread, tail
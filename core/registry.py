@@ -0,0 +1,120 @@
+import os, re, subprocess, threading
+from core.utils import get_ext_path
+
+ENCODER_LINE = re.compile(r"^\s*([VASD][A-Z.]{5})\s+(\S+)")
+FILTER_LINE = re.compile(r"^\s*([A-Z.|]{2,3})\s+(\S+)\s+(\S+->\S+)")
+# 封装格式行：标志列各版本写法不一（" E ", "DE", ".E.", "E d"），说明行的标志用点占位（" .E = Muxing supported"），不会匹配
+MUXER_LINE = re.compile(r"^\s*(D?E ?d?|[D.]E[d.])\s+([\w,-]+)(?:\s+(.*))?$")
+
+
+class ToolRegistry:
+    """
+    ffmpeg 能力清单：-encoders / -filters / -muxers 对每个二进制只各跑一次，解析结果常驻内存
+    清单拿不到时（老版本或启动失败）一律视为“未知”，调用方不做预过滤
+    """
+    def __init__(self, ffmpeg_path):
+        self.ffmpeg_path = ffmpeg_path
+        self._lock = threading.Lock()
+        self._lists = {}
+
+    def _run_listing(self, option):
+        CREATE_NO_WINDOW = 0x08000000
+        try:
+            result = subprocess.run(
+                [self.ffmpeg_path, "-hide_banner", option],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                text=True, encoding='utf-8', errors='ignore', creationflags=CREATE_NO_WINDOW, timeout=10
+            )
+            return result.stdout
+        except Exception as e:
+            print(f"⚠️ 读取 ffmpeg {option} 清单失败: {e}")
+            return ""
+
+    @staticmethod
+    def parse_encoders(text):
+        """解析 -encoders 输出：{编码器名: 类型(V/A/S)}"""
+        encoders = {}
+        started = False
+        for line in text.splitlines():
+            if line.strip().startswith("------"):
+                started = True
+                continue
+            m = ENCODER_LINE.match(line) if started else None
+            if m:
+                encoders[m.group(2)] = m.group(1)[0]
+        return encoders
+
+    @staticmethod
+    def parse_filters(text):
+        """解析 -filters 输出：{滤镜名: 输入输出类型，如 'V->V'}"""
+        filters = {}
+        for line in text.splitlines():
+            m = FILTER_LINE.match(line)
+            if m:
+                filters[m.group(2)] = m.group(3)
+        return filters
+
+    @staticmethod
+    def parse_muxers(text):
+        """解析 -muxers 输出：{封装格式名: 说明}；不依赖表头分隔线（各版本的写法不同，有的干脆没有）"""
+        muxers = {}
+        for line in text.splitlines():
+            m = MUXER_LINE.match(line)
+            if m:
+                for name in m.group(2).split(","):
+                    muxers[name] = (m.group(3) or "").strip()
+        return muxers
+
+    def _get(self, kind):
+        with self._lock:
+            if kind not in self._lists:
+                parser = {"encoders": self.parse_encoders, "filters": self.parse_filters, "muxers": self.parse_muxers}[kind]
+                self._lists[kind] = parser(self._run_listing(f"-{kind}"))
+            return self._lists[kind]
+
+    def preload(self, *kinds):
+        """在后台线程里读好指定的清单（例如 "filters"），调用方不等它"""
+        threading.Thread(target=lambda: [self._get(kind) for kind in kinds], name="tool_registry", daemon=True).start()
+
+    @property
+    def encoders(self):
+        return self._get("encoders")
+
+    @property
+    def filters(self):
+        return self._get("filters")
+
+    @property
+    def muxers(self):
+        return self._get("muxers")
+
+    def has_encoder(self, name):
+        """编码器是否编译进了当前 ffmpeg；清单为空（未知）时返回 True，交给实际点火去判断"""
+        encoders = self.encoders
+        return not encoders or name in encoders
+
+    def has_filter(self, name, wait=True):
+        """
+        滤镜是否可用；清单为空（未知）时返回 True
+        :param wait: False 时清单还没读好也当作未知，绝不在调用线程上起 ffmpeg（界面线程用）
+        """
+        if not wait and "filters" not in self._lists:
+            return True
+        filters = self.filters
+        return not filters or name in filters
+
+    def has_muxer(self, name):
+        muxers = self.muxers
+        return not muxers or name in muxers
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_tool_registry(ffmpeg_path=None):
+    """按 ffmpeg 实际路径复用清单，同一个二进制整个进程只解析一次"""
+    path = os.path.realpath(ffmpeg_path or get_ext_path("ffmpeg.exe"))
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = ToolRegistry(path)
+        return _registries[path]
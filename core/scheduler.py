@@ -0,0 +1,69 @@
+import threading
+
+# =====================================================================
+# 多槽位队列调度：总槽位数 + 每类编码器各自的槽位上限
+# 例如 2 个 NVENC + 1 个 CPU 同时压：显卡会话和 CPU 核心各自吃满，互不抢占
+# 这里只做记账（不依赖 Qt），谁先开压、谁来启动 Worker 由界面决定
+# =====================================================================
+
+# 缺省的每类编码器槽位上限（键为 encode_config.encoder_vendor 的结果）
+DEFAULT_VENDOR_SLOTS = {"nvenc": 2, "amf": 1, "qsv": 1, "cpu": 1, "copy": 2}
+
+
+class SlotScheduler:
+    def __init__(self, max_slots=1, vendor_slots=None):
+        self.max_slots = max(1, int(max_slots))
+        self.vendor_slots = dict(DEFAULT_VENDOR_SLOTS)
+        self.vendor_slots.update(vendor_slots or {})
+        self._lock = threading.Lock()
+        self._running = {}  # 任务键 -> 厂商
+
+    def vendor_limit(self, vendor):
+        """某类编码器的槽位上限；表外的类别只受总槽位数约束"""
+        return max(1, int(self.vendor_slots.get(vendor, self.max_slots)))
+
+    def can_start(self, vendor):
+        with self._lock:
+            if len(self._running) >= self.max_slots:
+                return False
+            busy = sum(1 for v in self._running.values() if v == vendor)
+            return busy < self.vendor_limit(vendor)
+
+    def has_free_slot(self):
+        with self._lock:
+            return len(self._running) < self.max_slots
+
+    def acquire(self, key, vendor):
+        """
+        占用一个槽位
+        :return: 占到返回 True；总槽位或该类编码器的槽位已满时返回 False
+        """
+        with self._lock:
+            if key in self._running:
+                return True
+            busy = sum(1 for v in self._running.values() if v == vendor)
+            if len(self._running) >= self.max_slots or busy >= self.vendor_limit(vendor):
+                return False
+            self._running[key] = vendor
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._running.pop(key, None)
+
+    def running_count(self, vendor=None):
+        with self._lock:
+            if vendor is None:
+                return len(self._running)
+            return sum(1 for v in self._running.values() if v == vendor)
+
+    def pick_next(self, candidates):
+        """
+        从按队列顺序排好的 (任务键, 厂商) 里挑出第一个现在就能开压的；
+        排在前面但所属类别已满的任务不挡后面其他类别的任务
+        :return: 任务键，没有能开压的返回 None
+        """
+        for key, vendor in candidates:
+            if self.can_start(vendor):
+                return key
+        return None
@@ -0,0 +1,56 @@
+import os, threading
+
+# =====================================================================
+# 线程预算：把逻辑核心分给同时在跑的压制任务，避免每个 ffmpeg 都以为整台机器归自己
+# 份额再由 engine.encoder_thread_args 翻译成各编码器自己的线程参数
+# =====================================================================
+
+
+def split_threads(n_jobs, total=None):
+    """
+    把 total 个逻辑核心尽量均分给 n_jobs 个并发任务
+    :return: 每个任务的线程数列表，除不尽的余数分给前面几个任务，每份至少 1
+    """
+    total = total or os.cpu_count() or 1
+    n_jobs = max(1, int(n_jobs))
+    base, extra = divmod(total, n_jobs)
+    return [max(1, base + (1 if i < extra else 0)) for i in range(n_jobs)]
+
+
+class ThreadBudget:
+    """
+    进程内的线程账本：按“最多同时跑几个任务”(slots) 预先切好份额，任务开压时领一份、结束时归还
+    已经在跑的进程改不了线程数，所以不按当前人数动态均分，而是一开始就按槽位数切，谁也不会挤占谁
+    """
+    def __init__(self, total=None, slots=1):
+        self.total = total or os.cpu_count() or 1
+        self.slots = max(1, int(slots))
+        self._lock = threading.Lock()
+        self._leases = {}
+
+    def set_slots(self, slots):
+        """调整并发槽位数；只影响之后领取的份额"""
+        with self._lock:
+            self.slots = max(1, int(slots))
+
+    def acquire(self, job_id):
+        """
+        为任务领取线程份额（同一任务重复领取返回同一份）
+        :return: 线程数；槽位超卖时至少也给 1
+        """
+        with self._lock:
+            if job_id in self._leases:
+                return self._leases[job_id]
+            shares = split_threads(self.slots, self.total)
+            free = self.total - sum(self._leases.values())
+            share = shares[min(len(self._leases), len(shares) - 1)]
+            self._leases[job_id] = max(1, min(share, free))
+            return self._leases[job_id]
+
+    def release(self, job_id):
+        with self._lock:
+            self._leases.pop(job_id, None)
+
+    def in_use(self):
+        with self._lock:
+            return sum(self._leases.values())
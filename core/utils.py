@@ -74,6 +74,121 @@ def read_yaml_config(filename):
         print(f"💥 读取 {filename} 发生错误: {e}")
         return {}
 
+# 运行参数的默认值：既用于自动生成 settings.yaml，也用于给用户缺省的字段兜底
+DEFAULT_SETTINGS_YAML = """# =====================================================================
+# xxh视频压制工具 - 运行参数配置文件
+# 缺省的字段会自动使用程序内置的默认值
+# =====================================================================
+
+probe:
+  # 批量拖入时，同时运行的 ffprobe 探针数量上限
+  max_workers: 4
+  # 探测深度：header = 纯 Python 读容器头（MP4/MKV/FLV，失败自动回退 fast）
+  #           fast = 限制读取量的 ffprobe；full = 完整 ffprobe；deep = 逐帧计数拿精确帧数（很慢）
+  # 批量拖入时使用的探测深度
+  batch_mode: header
+  # 右侧信息面板使用的探测深度（需要精确帧数时可在队列右键菜单里单独“深度探测”）
+  panel_mode: fast
+
+encoder_probe:
+  # 点火自检时同时测试的编码器数量（消费级 NVIDIA 显卡有并发会话上限，不建议超过 8）
+  max_workers: 8
+  # 整轮自检的全局时限（秒），超时未出结果的编码器按不可用处理
+  deadline: 15
+  # 能力矩阵（码控/像素格式/Profile/分辨率）后台探测时同时测试的编码器数量
+  matrix_workers: 4
+
+chunked:
+  # 分段并行压制：在关键帧处切段、多个 ffmpeg 同时压、最后无损拼接
+  # 只对 CPU 软压编码器生效（硬件编码器受显卡会话数限制，分段没有收益），开启实时预览时自动退回单进程
+  enabled: true
+  # 片源短于这个时长（秒）时不分段
+  min_duration: 300
+  # 同时压制的段数，0 = 自动（逻辑核心数 / 8，至少 2）
+  max_parallel: 0
+  # 总段数，0 = 自动（同时压制段数的 2 倍，快慢段之间可以互相填空）
+  chunks: 0
+  # 切段前先做一次镜头分析（只解关键帧、低分辨率，结果缓存），尽量把切点放在镜头边界上
+  scene_detect: true
+  # 切镜判定阈值 (0-1)，越小越敏感
+  scene_threshold: 0.35
+
+progress:
+  # 压制进度每秒最多刷新几次（Worker 线程里解析 ffmpeg 的 -progress 输出，合并后再交给界面）
+  max_rate: 4
+  # 压制时 ffmpeg 诊断日志的详细程度 (quiet / error / warning / info / verbose)
+  # 日志走 stderr、进度走 stdout 两条独立管道，调到 info 也不会拖慢进度刷新
+  log_level: warning
+
+stream_copy:
+  # 直通预检：片源的视频/音频已经满足目标（同编码、分辨率帧率不超、码率不超上限）时自动改为 -c copy
+  # 单个预设可以在 ui_state 里写 auto_copy: false 单独关闭
+  enabled: true
+
+threads:
+  # 线程预算：把逻辑核心分给同时在跑的 ffmpeg（含分段并行的各段），换算成各编码器的线程参数
+  # 关闭后不写任何线程参数，每个 ffmpeg 都按独占整台机器来开线程
+  enabled: true
+  # 参与分配的逻辑核心数，0 = 全部
+  total_cores: 0
+
+queue:
+  # 队列同时压制的任务数（槽位数）
+  max_slots: 3
+  # 每类编码器最多同时占几个槽位：显卡的编码会话有限，CPU 软压一路就能吃满所有核心
+  # 例如 2 路 NVENC + 1 路 CPU 可以同时跑，互不抢占
+  vendor_slots:
+    nvenc: 2
+    amf: 1
+    qsv: 1
+    cpu: 1
+    copy: 2
+
+admission:
+  # 准入控制：已经有任务在跑时，槽位空着也先看系统负载，超过阈值就把排队的任务压住，回落后再放行
+  # 一个任务都没在跑时总是放行；阈值填 0 表示不检查这一项
+  enabled: true
+  # 全机 CPU 占用上限（%），只对 CPU 软压任务生效：硬件编码（nvenc/amf/qsv）和直通任务不看这一项，
+  # 这样一路软压吃满 CPU 时，排队的硬件编码任务照样能开压
+  max_cpu_percent: 85
+  # 可用内存下限 (MB)，防止多开把机器压进虚拟内存
+  min_free_memory_mb: 2048
+  # 磁盘合计写入速率上限 (MB/s)；输出到机械硬盘或网络盘时可以设成 100 左右
+  max_disk_write_mbps: 0
+  # 刚开压一个任务后等几秒再判断下一个，让新任务的负载先体现出来
+  settle_seconds: 5
+  # 任务被压住时隔几秒重新检查一次
+  poll_interval: 2
+
+concurrency:
+  # 自适应并发：边压边测所有任务合计的编码帧率，一路一路往上加，吞吐不再上涨就退回实测最优的路数
+  # 最优值按 (编码器@分辨率档, 本机) 记进 config/concurrency.json，同类批次下次直接从它开始
+  # 上限仍受 queue.max_slots、各类编码器槽位数和准入控制约束
+  enabled: true
+  # 每一档测量多少秒
+  window_seconds: 20
+  # 任务刚开压时先跳过几秒预热再开始计时
+  warmup_seconds: 5
+  # 多开一路后合计帧率至少提升这个比例才算值得
+  min_gain: 0.05
+  # 定下来之后隔多少秒再试探一次更高的一档，0 = 不再试探
+  reprobe_seconds: 600
+"""
+
+def _merge_settings(defaults, override):
+    merged = dict(defaults)
+    for k, v in (override or {}).items():
+        if isinstance(v, dict) and isinstance(merged.get(k), dict):
+            merged[k] = _merge_settings(merged[k], v)
+        else:
+            merged[k] = v
+    return merged
+
+def load_settings():
+    """读取 settings.yaml，并与内置默认值逐层合并"""
+    defaults = yaml.safe_load(DEFAULT_SETTINGS_YAML)
+    return _merge_settings(defaults, read_yaml_config("settings.yaml"))
+
 def init_config_files():
     """初始化配置文件：如果不存在，则自动生成默认配置"""
     import os
@@ -86,6 +201,7 @@ def init_config_files():
         
     presets_path = os.path.join(config_dir, "presets.yaml")
     tooltips_path = os.path.join(config_dir, "tooltips.yaml")
+    settings_path = os.path.join(config_dir, "settings.yaml")
     
     # ==========================================
     # 1. 自动生成预设文件
@@ -136,6 +252,24 @@ def init_config_files():
       a_enc: "aac"
       a_bit: "64k"
       a_sample: "保持源"
+
+  - name: "多分辨率阶梯 (H.264, 1080p/720p/480p, VBR)"
+    requires: "264"
+    ui_state:
+      fps: "保持源"
+      res: "保持源"
+      rc: "vbr"
+      val: 5000
+      a_enc: "aac"
+      a_bit: "128k"
+      a_sample: "保持源"
+    ladder:
+      - res: "1080p"
+        val: 5000
+      - res: "720p"
+        val: 2800
+      - res: "480p"
+        val: 1200
 """
         with open(presets_path, 'w', encoding='utf-8') as f:
             f.write(default_presets)
@@ -165,6 +299,7 @@ preset_tips:
   "高画质收藏版 (HEVC/H.265, VBR)": "兼顾画质与兼容性，适合存储 1080p/4K 电影，支持硬件加速。"
   "老设备高兼容版 (H.264, CBR)": "最传统的格式，几乎能在任何破旧的播放器或电视上流畅运行。"
   "压片战争最小视频 (HEVC/H.265, VBR)": "极致压缩，纯属整活儿，文件体积极小。"
+  "多分辨率阶梯 (H.264, 1080p/720p/480p, VBR)": "源视频只解码一次，同时输出 1080p/720p/480p 三个文件，适合一次备齐多档清晰度。"
   "⚙️ 自定义参数...": "进入极客模式，手动微调每一项硬核压制参数。"
 
 rc_tips:
@@ -174,7 +309,17 @@ rc_tips:
     <b>[ 动态码率模式 ]</b><br>根据画面复杂度分配码率。复杂画面多给点，静止画面少给点。<br><b>数值意义：</b>设置的是‘目标平均码率’。<br><b>适用场景：</b>本地收藏、视频发布。是兼顾体积与画质的最佳平衡方案。
   cbr: |
     <b>[ 固定码率模式 ]</b><br>全程保持恒定的传输速率，不顾画面复杂度，强行填充码率。<br><b>数值意义：</b>设置的是‘固定传输速率’。<br><b>适用场景：</b>直播推流、老式硬件播放。缺点是简单画面浪费空间，复杂画面可能模糊。
+  2pass: |
+    <b>[ 两遍编码模式 ]</b><br>第一遍用最快的设置快速扫描全片、记录每段画面的复杂度，第二遍按记录精确分配码率。<br><b>数值意义：</b>设置的是‘目标平均码率’，成片体积最接近“码率 × 时长”。<br><b>适用场景：</b>有体积上限的交付（网盘、投稿限制）。硬件编码器会自动换成显卡内置的多遍/预分析模式。
 """
         with open(tooltips_path, 'w', encoding='utf-8') as f:
             f.write(default_tooltips)
-            print("✨ 已自动生成默认 tooltips.yaml")
\ No newline at end of file
+            print("✨ 已自动生成默认 tooltips.yaml")
+
+    # ==========================================
+    # 3. 自动生成运行参数文件
+    # ==========================================
+    if not os.path.exists(settings_path):
+        with open(settings_path, 'w', encoding='utf-8') as f:
+            f.write(DEFAULT_SETTINGS_YAML)
+            print("✨ 已自动生成默认 settings.yaml")
\ No newline at end of file
@@ -1,61 +1,104 @@
-import subprocess, psutil
-from PySide6.QtCore import QThread, Signal
+import os, shutil, subprocess, threading, psutil
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtCore import QObject, QThread, Signal
 from core.utils import get_ext_path
+from core.engine import probe_media, probe_encoders, probe_capability_matrix, detect_scenes
+from core.packet_index import load_packet_index
+from core.capabilities import resolve_identity_version
+from core.chunked import ChunkedEncoder, plan_chunks, make_boundary_snapper
+from core.progress import ProgressParser, ProgressThrottle, iter_progress_lines, start_log_reader
 
 class FFmpegWorker(QThread):
     log_signal = Signal(str)
+    progress_signal = Signal(object) # Progress：-progress 块在本线程解析好、限流后才发给 UI
     error_signal = Signal(str)
     finished_signal = Signal()
 
-    def __init__(self, input_file, output_file, enable_preview, preview_port, encode_args): 
+    def __init__(self, input_file, output_file, enable_preview, preview_port, encode_args, pre_passes=None, work_dir=None, progress_rate=4, log_level="warning"): 
         super().__init__()
         self.input_file = input_file
         self.output_file = output_file
         self.enable_preview = enable_preview  
         self.preview_port = preview_port      
         self.encode_args = encode_args 
+        # 正式压制前要先跑完的若干遍（两遍编码的分析遍），每一遍都是完整的输出参数（含 -f null -）
+        self.pre_passes = pre_passes or []
+        # 子进程的工作目录：两遍编码的统计文件以相对路径写在这里，任务结束后整个删掉
+        self.work_dir = work_dir
+        if work_dir:
+            # 换了工作目录，输入输出必须是绝对路径
+            self.input_file = os.path.abspath(input_file)
+            self.output_file = os.path.abspath(output_file)
+        self.progress_rate = progress_rate # 进度每秒最多发几次
+        self.log_level = log_level # ffmpeg 诊断日志的 -loglevel，与进度通道互不影响
         self.process = None 
         self.is_cancelled = False 
 
-    def run(self):
-        cmd = [get_ext_path("ffmpeg.exe"), "-y", "-i", self.input_file]
-        cmd.extend(self.encode_args)
-        cmd.append(self.output_file)
-
-        if self.enable_preview:
-            # 采用 tcp 本地回环进行内存管道传输，mjpeg 格式，1 FPS
-            cmd.extend([
-                "-f", "image2pipe", 
-                "-vcodec", "mjpeg", 
-                "-r", "1", 
-                f"tcp://127.0.0.1:{self.preview_port}"
-            ])
-            
-        # ====== 新增：增加-progress获取规整进度======
-        cmd.extend(["-progress", "-", "-nostats"])
+    def _build_cmd(self, output_args):
+        """公共的命令行头尾：诊断日志按 log_level 走 stderr，进度独占 stdout"""
+        return ([get_ext_path("ffmpeg.exe"), "-hide_banner", "-loglevel", self.log_level, "-y", "-i", self.input_file]
+                + output_args + ["-progress", "pipe:1", "-nostats"])
+
+    def _run_ffmpeg(self, cmd):
+        """
+        启动一次 ffmpeg：stdout 上的 -progress 块解析成 Progress 限流发出，stderr 的日志由单独的线程逐行转发
+        :return: (返回码, 最后 10 行日志)
+        """
+        CREATE_NO_WINDOW = 0x08000000
+        self.process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL, cwd=self.work_dir,
+            creationflags=CREATE_NO_WINDOW
+        )
+        log_thread, error_lines = start_log_reader(self.process.stderr, self.log_signal.emit)
+
+        parser = ProgressParser()
+        throttle = ProgressThrottle(self.progress_rate)
+        for line in iter_progress_lines(self.process.stdout):
+            _, record = parser.feed(line)
+            if record is not None and throttle.offer(record) is not None:
+                self.progress_signal.emit(record)
+
+        self.process.stdout.close()
+        log_thread.join()
+        self.process.wait()
+        return self.process.returncode, error_lines
 
+    def run(self):
         try:
-            CREATE_NO_WINDOW = 0x08000000
-            self.process = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
-                text=True, encoding='utf-8', errors='ignore', creationflags=CREATE_NO_WINDOW
-            )
-
-            error_lines = []
-            for line in self.process.stdout:
-                line_str = line.strip()
-                self.log_signal.emit(line_str)
-                # 简单缓存最后10行用于报警
-                if len(error_lines) > 10:
-                    error_lines.pop(0)
-                error_lines.append(line_str)
-
-            self.process.stdout.close()
-            self.process.wait()
+            total_passes = len(self.pre_passes) + 1
+            for i, pass_args in enumerate(self.pre_passes):
+                if self.is_cancelled:
+                    break
+                self.log_signal.emit(f"🔁 第 {i + 1}/{total_passes} 遍：分析中...")
+                returncode, error_lines = self._run_ffmpeg(self._build_cmd(pass_args))
+                if returncode != 0 and not self.is_cancelled:
+                    err_summary = "\n".join(error_lines)
+                    self.error_signal.emit(f"❌ FFmpeg 分析遍发生致命错误 (Exit {returncode})\n\n{err_summary}")
+                    self.is_cancelled = True
+
+            if self.is_cancelled:
+                self.finished_signal.emit()
+                return
+            if self.pre_passes:
+                self.log_signal.emit(f"🔁 第 {total_passes}/{total_passes} 遍：正式压制...")
+
+            output_args = list(self.encode_args) + [self.output_file]
+
+            if self.enable_preview:
+                # 采用 tcp 本地回环进行内存管道传输，mjpeg 格式，1 FPS
+                output_args.extend([
+                    "-f", "image2pipe", 
+                    "-vcodec", "mjpeg", 
+                    "-r", "1", 
+                    f"tcp://127.0.0.1:{self.preview_port}"
+                ])
+                
+            # 进度走 stdout 专用管道（见 _build_cmd），日志走 stderr
+            returncode, error_lines = self._run_ffmpeg(self._build_cmd(output_args))
             
-            if self.process.returncode != 0 and not self.is_cancelled:
+            if returncode != 0 and not self.is_cancelled:
                 err_summary = "\n".join(error_lines)
-                self.error_signal.emit(f"❌ FFmpeg 发生致命错误 (Exit {self.process.returncode})\n\n{err_summary}")
+                self.error_signal.emit(f"❌ FFmpeg 发生致命错误 (Exit {returncode})\n\n{err_summary}")
                 # 注意：发生错误时，不仅要 error，还要最终 emit finished 以清理状态
                 
             self.finished_signal.emit()
@@ -68,6 +111,9 @@ class FFmpegWorker(QThread):
             self.log_signal.emit(f"线程启动崩溃，详见控制台！错误: {e}")
             self.is_cancelled = True
             self.finished_signal.emit()
+        finally:
+            if self.work_dir:
+                shutil.rmtree(self.work_dir, ignore_errors=True)
 
     def stop(self):
         """强制结束进程"""
@@ -89,4 +135,204 @@ class FFmpegWorker(QThread):
     def resume(self):
         """恢复进程 (路线 A)"""
         if self.process:
-            psutil.Process(self.process.pid).resume()
\ No newline at end of file
+            psutil.Process(self.process.pid).resume()
+
+
+class ChunkedFFmpegWorker(QThread):
+    """
+    分段并行版的 FFmpegWorker：信号与 stop/pause/resume 接口完全一致，UI 可以无差别替换
+    关键帧来自包索引（没有就现建一份），然后交给 ChunkedEncoder 切段、并行压制、拼接
+    """
+    log_signal = Signal(str)
+    progress_signal = Signal(object)
+    error_signal = Signal(str)
+    finished_signal = Signal()
+
+    def __init__(self, input_file, output_file, encode_args, duration, n_chunks, max_parallel, scene_threshold=None, progress_rate=4, log_level="warning"):
+        super().__init__()
+        self.input_file = input_file
+        self.output_file = output_file
+        self.encode_args = encode_args
+        self.duration = duration
+        self.n_chunks = n_chunks
+        self.max_parallel = max_parallel
+        self.scene_threshold = scene_threshold # None = 不做镜头分析，只按关键帧切
+        self._throttle = ProgressThrottle(progress_rate) # 各段进度汇总后统一限流
+        self.log_level = log_level
+        self.encoder = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def is_cancelled(self):
+        return self._cancel_event.is_set() or (self.encoder is not None and self.encoder.is_cancelled)
+
+    def run(self):
+        try:
+            self.log_signal.emit("🗂️ 正在读取关键帧索引...")
+            index = load_packet_index(self.input_file, cancel_event=self._cancel_event)
+            if self._cancel_event.is_set():
+                if index is not None:
+                    index.close()
+                self.finished_signal.emit()
+                return
+            scenes = None
+            if self.scene_threshold is not None:
+                self.log_signal.emit("🎞️ 正在分析镜头切换点（只解关键帧，结果会缓存）...")
+                scenes = detect_scenes(self.input_file, self.scene_threshold, self._cancel_event)
+            if self._cancel_event.is_set():
+                if index is not None:
+                    index.close()
+                self.finished_signal.emit()
+                return
+
+            # 切点最多偏离均分位置 1/4 段长去找镜头边界，保证各段长度大致均衡
+            nearest = index.nearest_keyframe if index is not None else None
+            snap = make_boundary_snapper(scenes, nearest, self.duration / max(self.n_chunks, 1) / 4)
+            chunks = plan_chunks(self.duration, self.n_chunks, snap)
+            if index is not None:
+                index.close()
+
+            self.encoder = ChunkedEncoder(self.input_file, self.output_file, self.encode_args,
+                                          chunks, self.max_parallel, on_log=self.log_signal.emit,
+                                          on_progress=self._emit_progress, log_level=self.log_level)
+            if self._cancel_event.is_set():
+                self.encoder.is_cancelled = True
+            elif not self.encoder.run() and self.encoder.error:
+                self.error_signal.emit(f"❌ 分段压制发生致命错误\n\n{self.encoder.error}")
+            self.finished_signal.emit()
+
+        except Exception as e:
+            import traceback
+            error_msg = traceback.format_exc()
+            print(f"\n【💥后台致命崩溃报告】:\n{error_msg}\n")
+
+            self.log_signal.emit(f"线程启动崩溃，详见控制台！错误: {e}")
+            self._cancel_event.set()
+            self.finished_signal.emit()
+
+    def _emit_progress(self, record):
+        if self._throttle.offer(record) is not None:
+            self.progress_signal.emit(record)
+
+    def stop(self):
+        self._cancel_event.set()
+        if self.encoder is not None:
+            self.encoder.stop()
+
+    def pause(self):
+        if self.encoder is not None:
+            self.encoder.pause()
+
+    def resume(self):
+        if self.encoder is not None:
+            self.encoder.resume()
+
+
+class ProbeService(QObject):
+    """
+    后台探针池：限制同时运行的 ffprobe 数量，每探完一个就立刻通过信号把结果送回 UI 线程
+    """
+    result_signal = Signal(str, object)  # (源文件路径, MediaInfo 或 None)
+
+    def __init__(self, max_workers=4, mode="header", parent=None):
+        super().__init__(parent)
+        self.mode = mode
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="probe")
+        self._pending = {}  # 源文件路径 -> Future，同一文件排队中时不会重复提交
+        # 每次 cancel_all 都会换代：旧一代还在跑的 ffprobe 会被杀掉，结果直接丢弃
+        self._generation = 0
+        self._cancel_event = threading.Event()
+
+    def submit(self, file_path, mode=None):
+        """提交一次探测；mode 为空时使用服务的默认深度，指定更深的模式可以按需升级缓存"""
+        future = self._pending.get(file_path)
+        if future is not None and not future.done() and mode is None:
+            return future
+        generation = self._generation
+        future = self._executor.submit(self._probe, file_path, mode or self.mode, generation, self._cancel_event)
+        self._pending[file_path] = future
+        future.add_done_callback(lambda f, p=file_path: self._forget(p, f))
+        return future
+
+    def _forget(self, file_path, future):
+        if self._pending.get(file_path) is future:
+            self._pending.pop(file_path, None)
+
+    def _probe(self, file_path, mode, generation, cancel_event):
+        if generation != self._generation:
+            return
+        try:
+            info = probe_media(file_path, mode, cancel_event)
+        except Exception as e:
+            print(f"⚠️ 后台探针失败 {file_path}: {e}")
+            info = None
+        if generation == self._generation:
+            self.result_signal.emit(file_path, info)
+
+    def cancel_all(self):
+        """撤销所有尚未开始的探针，并杀掉正在运行的 ffprobe，结果不再上报"""
+        self._generation += 1
+        self._cancel_event.set()
+        self._cancel_event = threading.Event()
+        for future in list(self._pending.values()):
+            future.cancel()
+        self._pending.clear()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EncoderProbeWorker(QThread):
+    """后台并行点火自检：每测完一个编码器就上报一次，全部结束后送回可用列表"""
+    progress_signal = Signal(str, bool, str)  # (编码器, 是否成功, 错误摘要)
+    finished_signal = Signal(list)
+
+    def __init__(self, encoders, max_workers=8, deadline=15, identity=None):
+        super().__init__()
+        self.encoders = encoders
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.identity = identity # ffmpeg 身份指纹；版本串留空时在这里（后台）补上，结束后由调用方取回
+        self._cancel_event = threading.Event()
+
+    def run(self):
+        if self.identity is not None:
+            self.identity = resolve_identity_version(self.identity)
+        available = probe_encoders(
+            self.encoders, self.max_workers, self.deadline,
+            on_result=self.progress_signal.emit, cancel_event=self._cancel_event
+        )
+        self.finished_signal.emit(available)
+
+    def stop(self):
+        """放弃尚未出结果的编码器，已拿到的结果照常返回"""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+
+class EncoderMatrixWorker(QThread):
+    """后台能力矩阵探测：逐个编码器测码控/像素格式/Profile/分辨率，全程不阻塞界面"""
+    progress_signal = Signal(str, object)  # (编码器, 矩阵)
+    finished_signal = Signal(object)       # {编码器: 矩阵}
+
+    def __init__(self, encoders, max_workers=4):
+        super().__init__()
+        self.encoders = encoders
+        self.max_workers = max_workers
+        self._cancel_event = threading.Event()
+
+    def run(self):
+        results = probe_capability_matrix(
+            self.encoders, self.max_workers,
+            on_result=self.progress_signal.emit, cancel_event=self._cancel_event
+        )
+        self.finished_signal.emit(results)
+
+    def stop(self):
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
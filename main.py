@@ -1,4 +1,7 @@
 import sys
+import time
+STARTUP_TIME = time.perf_counter() # 首帧计时起点，放在重量级 import 之前
+
 from PySide6.QtWidgets import QApplication
 
 from core.main_window import FFmpegGUI
@@ -7,6 +10,6 @@ from core.utils import init_config_files
 if __name__ == "__main__":
     init_config_files()
     app = QApplication(sys.argv)
-    window = FFmpegGUI()
+    window = FFmpegGUI(startup_time=STARTUP_TIME)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,102 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+
+# 把项目根目录加入系统路径，确保能导入 core
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from core.utils import get_ext_path
+from core.encode_config import EncodeConfig
+from core.engine import build_ffmpeg_args, detect_scenes
+from core.packet_index import build_packet_index, PacketIndex
+from core.chunked import ChunkedEncoder, plan_chunks, make_boundary_snapper
+import core.cache
+
+# 镜头分析结果只在本次测试内有效，不写进程序目录下的缓存库
+core.cache._probe_cache = core.cache.ProbeCache(":memory:")
+
+CREATE_NO_WINDOW = 0x08000000
+SOURCE_SECONDS = 120
+ENCODERS = ["libx265", "libsvtav1"]
+
+def make_source(work_dir):
+    """生成一段带音轨、每 2 秒一个关键帧的 1080p 测试片源"""
+    path = os.path.join(work_dir, "source.mp4")
+    subprocess.run([
+        get_ext_path("ffmpeg.exe"), "-y",
+        "-f", "lavfi", "-i", f"testsrc2=duration={SOURCE_SECONDS}:size=1920x1080:rate=30",
+        "-f", "lavfi", "-i", f"sine=duration={SOURCE_SECONDS}:sample_rate=48000",
+        "-c:v", "libx264", "-preset", "veryfast", "-g", "60", "-c:a", "aac", path
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=CREATE_NO_WINDOW)
+    return path
+
+def count_frames(path):
+    result = subprocess.run([
+        get_ext_path("ffprobe.exe"), "-v", "error", "-select_streams", "v:0", "-count_packets",
+        "-show_entries", "stream=nb_read_packets", "-of", "csv=p=0", path
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, creationflags=CREATE_NO_WINDOW)
+    try:
+        return int(result.stdout.strip())
+    except ValueError:
+        return -1
+
+def encode_single(source, output, args):
+    cmd = [get_ext_path("ffmpeg.exe"), "-y", "-i", source] + args + [output]
+    t0 = time.perf_counter()
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=CREATE_NO_WINDOW)
+    return time.perf_counter() - t0
+
+def encode_chunked(source, output, args, max_parallel):
+    # 索引建在临时目录里，不污染程序目录下的 config/index
+    index_path = os.path.join(os.path.dirname(output), "source.idx")
+    if not os.path.exists(index_path):
+        build_packet_index(source, index_path)
+    index = PacketIndex(index_path)
+    n_chunks = max_parallel * 2
+    scenes = detect_scenes(source)
+    snap = make_boundary_snapper(scenes, index.nearest_keyframe, SOURCE_SECONDS / n_chunks / 4)
+    chunks = plan_chunks(SOURCE_SECONDS, n_chunks, snap)
+    index.close()
+    encoder = ChunkedEncoder(source, output, args, chunks, max_parallel, on_log=lambda line: None)
+    t0 = time.perf_counter()
+    ok = encoder.run()
+    return time.perf_counter() - t0, len(chunks), ok
+
+def run_benchmark():
+    work_dir = tempfile.mkdtemp(prefix="ffui_bench_")
+    max_parallel = max(2, (os.cpu_count() or 1) // 8)
+    try:
+        print(f"🎬 正在生成 {SOURCE_SECONDS} 秒 1080p 测试片源...")
+        source = make_source(work_dir)
+        src_frames = count_frames(source)
+
+        rows = []
+        for enc in ENCODERS:
+            args = build_ffmpeg_args(EncodeConfig(v_enc=enc, rc="cqp", cqp_val=32))
+            single_out = os.path.join(work_dir, f"single_{enc}.mp4")
+            chunked_out = os.path.join(work_dir, f"chunked_{enc}.mp4")
+
+            print(f"⏱️ {enc} 单进程压制中...")
+            t_single = encode_single(source, single_out, args)
+            print(f"⏱️ {enc} 分段并行压制中 ({max_parallel} 路)...")
+            t_chunked, n_chunks, ok = encode_chunked(source, chunked_out, args, max_parallel)
+            rows.append((enc, t_single, t_chunked, n_chunks, ok, count_frames(chunked_out)))
+
+        print("\n" + "=" * 72)
+        print(f"📊 分段并行 vs 单进程 (逻辑核心 {os.cpu_count()}, 同时 {max_parallel} 路, 源帧数 {src_frames})")
+        print("=" * 72)
+        print(f"{'编码器':<12} | {'单进程':>9} | {'分段并行':>8} | {'段数':>4} | {'加速比':>6} | 帧数一致")
+        print("-" * 72)
+        for enc, t_single, t_chunked, n_chunks, ok, frames in rows:
+            speedup = t_single / max(t_chunked, 1e-9) if ok else 0
+            same = "✅" if frames == src_frames else f"❌ ({frames})"
+            print(f"{enc:<14} | {t_single:>8.1f}s | {t_chunked:>9.1f}s | {n_chunks:>5} | {speedup:>7.2f}x | {same}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    run_benchmark()
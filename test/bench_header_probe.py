@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import json
+import shutil
+import tempfile
+import subprocess
+
+# 把项目根目录加入系统路径，确保能导入 core
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from core.utils import get_ext_path
+from core.container import parse_container_header
+
+CREATE_NO_WINDOW = 0x08000000
+CLIPS_PER_FORMAT = 50
+
+def make_clips(work_dir):
+    """用 lavfi 生成一批带音轨的短片，覆盖 MP4 / MKV / FLV 三种容器"""
+    ffmpeg_path = get_ext_path("ffmpeg.exe")
+    sources = []
+    for ext in ["mp4", "mkv", "flv"]:
+        first = os.path.join(work_dir, f"clip_0.{ext}")
+        subprocess.run([
+            ffmpeg_path, "-y", "-f", "lavfi", "-i", "testsrc=duration=2:size=640x360:rate=30",
+            "-f", "lavfi", "-i", "sine=duration=2:sample_rate=48000",
+            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", first
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=CREATE_NO_WINDOW)
+        # 内容相同的文件复制多份即可，测的是探测开销而不是编码
+        for i in range(CLIPS_PER_FORMAT):
+            path = os.path.join(work_dir, f"clip_{i}.{ext}")
+            if i > 0:
+                shutil.copyfile(first, path)
+            sources.append(path)
+    return sources
+
+def probe_by_subprocess(path):
+    result = subprocess.run([
+        get_ext_path("ffprobe.exe"), "-v", "quiet", "-print_format", "json",
+        "-show_format", "-show_streams", path
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding='utf-8', creationflags=CREATE_NO_WINDOW)
+    return json.loads(result.stdout)
+
+def summary(data):
+    v = next((s for s in data.get("streams", []) if s.get("codec_type") == "video"), {})
+    return (round(float(data["format"]["duration"]), 1), v.get("codec_name"), v.get("width"), v.get("height"))
+
+def run_benchmark():
+    work_dir = tempfile.mkdtemp(prefix="ffui_bench_")
+    try:
+        print(f"🎬 正在生成 {CLIPS_PER_FORMAT * 3} 个测试短片...")
+        sources = make_clips(work_dir)
+
+        t0 = time.perf_counter()
+        header_results = [parse_container_header(p) for p in sources]
+        t_header = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        probe_results = [probe_by_subprocess(p) for p in sources]
+        t_probe = time.perf_counter() - t0
+
+        fallback = sum(1 for r in header_results if r is None)
+        mismatch = sum(1 for h, p in zip(header_results, probe_results) if h is not None and summary(h) != summary(p))
+
+        print("\n" + "=" * 60)
+        print("📊 容器头解析 vs ffprobe 子进程")
+        print("=" * 60)
+        print(f"{'方式':<16} | {'总耗时':>10} | {'单文件':>10}")
+        print("-" * 60)
+        print(f"{'容器头解析':<14} | {t_header:>9.3f}s | {t_header / len(sources) * 1000:>8.2f}ms")
+        print(f"{'ffprobe':<16} | {t_probe:>9.3f}s | {t_probe / len(sources) * 1000:>8.2f}ms")
+        print(f"\n🚀 加速比: {t_probe / max(t_header, 1e-9):.1f}x")
+        print(f"↩️ 需回退 ffprobe 的文件: {fallback} / {len(sources)}")
+        print(f"⚠️ 与 ffprobe 结论不一致的文件: {mismatch}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    run_benchmark()
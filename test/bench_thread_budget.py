@@ -0,0 +1,82 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+
+# 把项目根目录加入系统路径，确保能导入 core
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from core.utils import get_ext_path
+from core.encode_config import EncodeConfig
+from core.engine import build_ffmpeg_args
+from core.thread_budget import split_threads
+
+CREATE_NO_WINDOW = 0x08000000
+SOURCE_SECONDS = 20
+SOURCE_FPS = 30
+CONCURRENCY = [1, 2, 4]
+ENCODERS = ["libx265", "libsvtav1", "libx264"]
+
+def make_source(work_dir):
+    """生成一段 1080p 测试片源（无音轨，只测视频编码吞吐）"""
+    path = os.path.join(work_dir, "source.mp4")
+    subprocess.run([
+        get_ext_path("ffmpeg.exe"), "-y",
+        "-f", "lavfi", "-i", f"testsrc2=duration={SOURCE_SECONDS}:size=1920x1080:rate={SOURCE_FPS}",
+        "-c:v", "libx264", "-preset", "veryfast", path
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=CREATE_NO_WINDOW)
+    return path
+
+def run_concurrent(source, work_dir, enc, n_jobs, budgeted):
+    """同时启动 n 个相同的压制任务，返回 (总墙钟时间, 总吞吐 fps)；有任何一路失败时返回 None"""
+    config = EncodeConfig(v_enc=enc, rc="cqp", cqp_val=30, a_enc="剥离静音")
+    shares = split_threads(n_jobs) if budgeted else [0] * n_jobs
+    procs = []
+    t0 = time.perf_counter()
+    for i, threads in enumerate(shares):
+        output = os.path.join(work_dir, f"{enc}_{n_jobs}_{i}.mkv")
+        cmd = [get_ext_path("ffmpeg.exe"), "-y", "-i", source] + build_ffmpeg_args(config, threads=threads) + [output]
+        procs.append(subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=CREATE_NO_WINDOW))
+    returncodes = [p.wait() for p in procs]
+    elapsed = time.perf_counter() - t0
+    if any(returncodes):
+        # 编码器缺失或报错时进程会秒退，算出来的 fps 毫无意义
+        print(f"❌ {enc} x {n_jobs} 路有任务失败（编码器不可用？），本组结果作废")
+        return None
+    return elapsed, n_jobs * SOURCE_SECONDS * SOURCE_FPS / max(elapsed, 1e-9)
+
+def run_benchmark():
+    work_dir = tempfile.mkdtemp(prefix="ffui_bench_")
+    try:
+        print(f"🎬 正在生成 {SOURCE_SECONDS} 秒 1080p 测试片源...")
+        source = make_source(work_dir)
+
+        rows = []
+        for enc in ENCODERS:
+            for n in CONCURRENCY:
+                print(f"⏱️ {enc} x {n} 路：默认线程...")
+                default = run_concurrent(source, work_dir, enc, n, budgeted=False)
+                print(f"⏱️ {enc} x {n} 路：线程预算 {split_threads(n)}...")
+                budget = run_concurrent(source, work_dir, enc, n, budgeted=True) if default else None
+                rows.append((enc, n, default, budget))
+
+        print("\n" + "=" * 76)
+        print(f"📊 线程预算 vs 编码器默认线程 (逻辑核心 {os.cpu_count()}, 总吞吐按所有并发任务合计)")
+        print("=" * 76)
+        print(f"{'编码器':<10} | {'并发':>4} | {'默认 耗时':>8} | {'默认 fps':>8} | {'预算 耗时':>8} | {'预算 fps':>8} | 提升")
+        print("-" * 76)
+        for enc, n, default, budget in rows:
+            if default is None or budget is None:
+                print(f"{enc:<12} | {n:>6} | {'压制失败，已跳过':^52} |")
+                continue
+            (t_default, fps_default), (t_budget, fps_budget) = default, budget
+            gain = fps_budget / max(fps_default, 1e-9)
+            print(f"{enc:<12} | {n:>6} | {t_default:>9.1f}s | {fps_default:>10.1f} | {t_budget:>9.1f}s | {fps_budget:>10.1f} | {gain:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,78 @@
+import sys
+import os
+import unittest
+
+# 把项目根目录加入系统路径，确保能导入 core
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from core.chunked import plan_chunks, split_audio_args, make_boundary_snapper, MIN_CHUNK_SECONDS, SPLIT_EPSILON
+
+
+class PlanChunksTest(unittest.TestCase):
+    def test_even_split_without_snap(self):
+        self.assertEqual(plan_chunks(120, 4), [(0.0, 30.0), (30.0, 30.0), (60.0, 30.0), (90.0, None)])
+
+    def test_chunk_count_capped_by_min_chunk_seconds(self):
+        # 50 秒的片源每段至少 20 秒，最多只能切 2 段
+        chunks = plan_chunks(50, 8)
+        self.assertEqual(len(chunks), 50 // MIN_CHUNK_SECONDS)
+        self.assertEqual(chunks, [(0.0, 25.0), (25.0, None)])
+
+    def test_short_source_is_a_single_chunk(self):
+        self.assertEqual(plan_chunks(10, 4), [(0.0, None)])
+
+    def test_last_chunk_runs_to_end(self):
+        for n in (1, 2, 3, 5):
+            chunks = plan_chunks(600, n)
+            self.assertIsNone(chunks[-1][1])
+            self.assertTrue(all(length is not None for _, length in chunks[:-1]))
+
+    def test_snapped_boundaries_are_offset_by_epsilon(self):
+        chunks = plan_chunks(120, 2, snap=lambda t: 62.0)
+        self.assertEqual(chunks, [(0.0, 62.0 - SPLIT_EPSILON), (62.0 - SPLIT_EPSILON, None)])
+
+    def test_colliding_snapped_boundaries_are_merged(self):
+        # GOP 比段还长：三个切点都吸到同一个关键帧上，只保留一个
+        chunks = plan_chunks(160, 4, snap=lambda t: 80.0)
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(chunks[0], (0.0, 80.0 - SPLIT_EPSILON))
+        self.assertIsNone(chunks[1][1])
+
+    def test_boundary_snapped_next_to_start_or_end_is_dropped(self):
+        self.assertEqual(plan_chunks(120, 2, snap=lambda t: 1.0), [(0.0, None)])
+        self.assertEqual(plan_chunks(120, 2, snap=lambda t: 119.0), [(0.0, None)])
+
+
+class BoundarySnapperTest(unittest.TestCase):
+    def test_prefers_scene_cut_within_max_shift(self):
+        snap = make_boundary_snapper([10.0, 31.0, 50.0], nearest_keyframe=lambda t: 29.0, max_shift=2.0)
+        self.assertEqual(snap(30.0), 31.0)
+
+    def test_falls_back_to_keyframe(self):
+        snap = make_boundary_snapper([10.0, 50.0], nearest_keyframe=lambda t: 29.0, max_shift=2.0)
+        self.assertEqual(snap(30.0), 29.0)
+
+    def test_no_hints_returns_input(self):
+        self.assertEqual(make_boundary_snapper()(30.0), 30.0)
+
+
+class SplitAudioArgsTest(unittest.TestCase):
+    def test_keeps_audio_args_and_drops_video_args(self):
+        args = ["-c:v", "libx264", "-crf", "23", "-preset", "medium", "-pix_fmt", "yuv420p",
+                "-c:a", "aac", "-b:a", "192k", "-ar", "48000", "-c:s", "copy"]
+        self.assertEqual(split_audio_args(args), ["-c:a", "aac", "-b:a", "192k", "-ar", "48000"])
+
+    def test_keeps_an(self):
+        self.assertEqual(split_audio_args(["-c:v", "libx265", "-b:v", "5M", "-an"]), ["-an"])
+
+    def test_keeps_stream_specific_audio_args(self):
+        args = ["-c:a:0", "copy", "-b:v", "8M", "-b:a:1", "128k"]
+        self.assertEqual(split_audio_args(args), ["-c:a:0", "copy", "-b:a:1", "128k"])
+
+    def test_video_only_args_give_nothing(self):
+        self.assertEqual(split_audio_args(["-c:v", "h264_nvenc", "-cq", "23", "-vf", "scale=-2:720"]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import sys
+import os
+import unittest
+
+# 把项目根目录加入系统路径，确保能导入 core
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from core.encode_config import EncodeConfig, EncodeConfigError
+from core.media import MediaInfo, StreamInfo
+from core.engine import (compile_encode_args, plan_video_filters, build_two_pass_args, build_ladder_args,
+                         plan_stream_copy, required_filters, FILTER_THREADS, TWO_PASS_LOG_NAME)
+
+AUDIO_TAIL = ["-c:a", "aac", "-b:a", "128k", "-c:s", "copy"]
+REST_MAPS = ["-map", "0", "-map", "-0:v:0"]
+
+
+def source(height, fps=30.0, pix_fmt="yuv420p", profile="High", video_kbps=0):
+    video = StreamInfo(index=0, codec_type="video", codec_name="h264", profile=profile, width=height * 16 // 9,
+                       height=height, pix_fmt=pix_fmt, fps=fps, bit_rate=video_kbps * 1000)
+    audio = StreamInfo(index=1, codec_type="audio", codec_name="aac", sample_rate=48000, channels=2)
+    return MediaInfo("src.mkv", duration=60.0, streams=[video, audio])
+
+
+class RateControlArgsTest(unittest.TestCase):
+    def compile(self, v_enc, rc):
+        return list(compile_encode_args(EncodeConfig(v_enc=v_enc, rc=rc, cqp_val=23, vbr_cbr_val=4000)))
+
+    def test_cpu_encoder(self):
+        self.assertEqual(self.compile("libx264", "cqp"),
+                         ["-map", "0", "-c:v", "libx264", "-crf", "23"] + AUDIO_TAIL)
+        self.assertEqual(self.compile("libx264", "vbr"),
+                         ["-map", "0", "-c:v", "libx264", "-b:v", "4000k"] + AUDIO_TAIL)
+        self.assertEqual(self.compile("libx264", "cbr"),
+                         ["-map", "0", "-c:v", "libx264", "-b:v", "4000k", "-maxrate:v", "4000k", "-bufsize:v", "4000k"]
+                         + AUDIO_TAIL)
+
+    def test_hardware_encoder(self):
+        self.assertEqual(self.compile("hevc_nvenc", "cqp"),
+                         ["-map", "0", "-c:v", "hevc_nvenc", "-rc", "vbr", "-cq", "23", "-b:v", "0"] + AUDIO_TAIL)
+        self.assertEqual(self.compile("hevc_nvenc", "vbr"),
+                         ["-map", "0", "-c:v", "hevc_nvenc", "-rc", "vbr", "-b:v", "4000k", "-maxrate:v", "4000k",
+                          "-bufsize:v", "4000k"] + AUDIO_TAIL)
+        self.assertEqual(self.compile("hevc_nvenc", "cbr"),
+                         ["-map", "0", "-c:v", "hevc_nvenc", "-rc", "cbr", "-b:v", "4000k", "-maxrate:v", "4000k",
+                          "-bufsize:v", "4000k"] + AUDIO_TAIL)
+
+    def test_h264_hardware_gets_pix_fmt_and_profile(self):
+        self.assertEqual(self.compile("h264_amf", "cqp"),
+                         ["-map", "0", "-c:v", "h264_amf", "-pix_fmt", "yuv420p", "-profile:v", "high",
+                          "-rc", "cqp", "-qp_i", "23", "-qp_p", "23"] + AUDIO_TAIL)
+
+    def test_same_config_compiles_once(self):
+        config = EncodeConfig(v_enc="libx264", rc="vbr", vbr_cbr_val=4000)
+        self.assertIs(compile_encode_args(config), compile_encode_args(EncodeConfig(v_enc="libx264", rc="vbr", vbr_cbr_val=4000)))
+
+
+class FilterChainTest(unittest.TestCase):
+    def test_user_vf_merged_into_filter_chain(self):
+        config = EncodeConfig(v_enc="libx264", res="720p", fps="30", extra_args=("-vf", "yadif,hqdn3d", "-preset", "slow"))
+        self.assertEqual(list(compile_encode_args(config)),
+                         ["-filter_complex_threads", str(FILTER_THREADS),
+                          "-filter_complex", "[0:v:0]yadif,fps=30,scale=-2:720,hqdn3d[vout]",
+                          "-map", "[vout]"] + REST_MAPS + ["-c:v", "libx264", "-crf", "28"] + AUDIO_TAIL + ["-preset", "slow"])
+
+    def test_fps_moves_after_timing_filters(self):
+        config = EncodeConfig(v_enc="libx264", res="1080p", fps="24")
+        self.assertEqual(plan_video_filters(config, ["setpts=0.5*PTS"]), ([], "scale=-2:1080", ["setpts=0.5*PTS", "fps=24"]))
+        self.assertEqual(plan_video_filters(config, ["hqdn3d"]), (["fps=24"], "scale=-2:1080", ["hqdn3d"]))
+
+    def test_frame_rate_up_goes_after_scale(self):
+        config = EncodeConfig(v_enc="libx264", res="720p", fps="60", fps_up=True)
+        self.assertEqual(plan_video_filters(config), ([], "scale=-2:720", ["fps=60"]))
+
+    def test_required_filters(self):
+        config = EncodeConfig(v_enc="libx264", res="720p", fps="30", extra_args=("-vf", "yadif,hqdn3d=4:3"))
+        self.assertEqual(required_filters(config), ["yadif", "fps", "scale", "hqdn3d"])
+        ladder = EncodeConfig(v_enc="libx264", ladder=(("720p", 23, "_720p"),))
+        self.assertEqual(required_filters(ladder), ["split", "scale", "null"])
+        self.assertEqual(required_filters(EncodeConfig(v_enc="copy", res="720p")), [])
+
+    def test_filter_graph_in_extra_args_is_rejected(self):
+        with self.assertRaises(EncodeConfigError):
+            EncodeConfig(v_enc="libx264", extra_args=("-vf", "hqdn3d", "-filter_complex", "[0:v]null[v]"))
+        with self.assertRaises(EncodeConfigError):
+            EncodeConfig(v_enc="libx264", extra_args=("-lavfi", "null"))
+
+
+class TwoPassArgsTest(unittest.TestCase):
+    def test_x265_params_merge_pass_stats_and_pools(self):
+        config = EncodeConfig(v_enc="libx265", rc="2pass", vbr_cbr_val=3000, threads=8, extra_args=("-x265-params", "aq-mode=3"))
+        head = ["-map", "0", "-c:v", "libx265", "-b:v", "3000k"] + AUDIO_TAIL + ["-x265-params"]
+        pass1, pass2 = build_two_pass_args(config, compile_encode_args(config))
+        self.assertEqual(pass1, head + [f"aq-mode=3:pools=8:frame-threads=3:pass=1:stats={TWO_PASS_LOG_NAME}.log:slow-firstpass=0",
+                                        "-an", "-sn", "-dn", "-f", "null", "-"])
+        self.assertEqual(pass2, head + [f"aq-mode=3:pools=8:frame-threads=3:pass=2:stats={TWO_PASS_LOG_NAME}.log"])
+
+    def test_generic_pass_flags(self):
+        config = EncodeConfig(v_enc="libx264", rc="2pass", vbr_cbr_val=3000)
+        args = compile_encode_args(config)
+        pass1, pass2 = build_two_pass_args(config, args)
+        self.assertEqual(pass1, list(args) + ["-pass", "1", "-passlogfile", TWO_PASS_LOG_NAME, "-an", "-sn", "-dn", "-f", "null", "-"])
+        self.assertEqual(pass2, list(args) + ["-pass", "2", "-passlogfile", TWO_PASS_LOG_NAME])
+
+    def test_single_pass_and_hardware_return_none(self):
+        config = EncodeConfig(v_enc="libx264", rc="vbr")
+        self.assertIsNone(build_two_pass_args(config, compile_encode_args(config)))
+        config = EncodeConfig(v_enc="hevc_nvenc", rc="2pass")
+        self.assertIsNone(build_two_pass_args(config, compile_encode_args(config)))
+
+
+class LadderArgsTest(unittest.TestCase):
+    LADDER = (("1080p", 5000, "_1080p"), ("720p", 3000, "_720p"), ("480p", 1200, "_480p"))
+
+    def rung(self, label, kbps):
+        return ["-map", label] + REST_MAPS + ["-c:v", "libx264", "-b:v", f"{kbps}k"] + AUDIO_TAIL
+
+    def test_split_graph_with_per_rung_outputs(self):
+        config = EncodeConfig(v_enc="libx264", rc="vbr", vbr_cbr_val=5000, ladder=self.LADDER)
+        args, last = build_ladder_args(config, "out/x.mp4")
+        self.assertEqual(last, "out/x_480p.mp4")
+        self.assertEqual(args,
+                         ["-filter_complex_threads", str(FILTER_THREADS), "-filter_complex",
+                          "[0:v:0]split=3[s0][s1][s2];[s0]scale=-2:1080[v0];[s1]scale=-2:720[v1];[s2]scale=-2:480[v2]"]
+                         + self.rung("[v0]", 5000) + ["out/x_1080p.mp4"]
+                         + self.rung("[v1]", 3000) + ["out/x_720p.mp4"]
+                         + self.rung("[v2]", 1200))
+
+    def test_rungs_taller_than_source_are_skipped(self):
+        config = EncodeConfig(v_enc="libx264", rc="vbr", vbr_cbr_val=5000, ladder=self.LADDER)
+        args, last = build_ladder_args(config, "out/x.mp4", media=source(720))
+        self.assertEqual(args[3], "[0:v:0]split=2[s0][s1];[s0]null[v0];[s1]scale=-2:480[v1]")
+        self.assertEqual(args[4:], self.rung("[v0]", 3000) + ["out/x_720p.mp4"] + self.rung("[v1]", 1200))
+        self.assertEqual(last, "out/x_480p.mp4")
+
+    def test_ladder_shorter_than_source_raises(self):
+        config = EncodeConfig(v_enc="libx264", rc="vbr", ladder=self.LADDER)
+        with self.assertRaises(EncodeConfigError):
+            build_ladder_args(config, "out/x.mp4", media=source(360))
+
+    def test_invalid_ladders_are_rejected(self):
+        with self.assertRaises(EncodeConfigError):
+            EncodeConfig(v_enc="copy", ladder=self.LADDER)
+        with self.assertRaises(EncodeConfigError):
+            EncodeConfig(v_enc="libx264", ladder=(("720p", 28, "_a"), ("480p", 30, "_a")))
+        with self.assertRaises(EncodeConfigError):
+            EncodeConfig(v_enc="libx264", ladder=(("720", 28, "_720"),))
+
+
+class StreamCopyPlanTest(unittest.TestCase):
+    def plan(self, v_enc, media, caps=None, **kw):
+        config = EncodeConfig(v_enc=v_enc, rc="vbr", vbr_cbr_val=8000, a_enc="剥离静音", **kw)
+        planned, notes = plan_stream_copy(config, media, caps)
+        return planned.v_enc, notes[0]
+
+    def test_source_within_target_is_copied(self):
+        v_enc, note = self.plan("libx264", source(1080, video_kbps=5000))
+        self.assertEqual(v_enc, "copy")
+        self.assertTrue(note.startswith("视频直通"))
+
+    def test_10bit_source_to_8bit_h264_hardware_is_reencoded(self):
+        v_enc, note = self.plan("h264_nvenc", source(1080, pix_fmt="yuv420p10le", profile="High 10", video_kbps=5000))
+        self.assertEqual(v_enc, "h264_nvenc")
+        self.assertIn("yuv420p10le -> yuv420p", note)
+
+    def test_pix_fmt_conversion_from_capabilities_blocks_copy(self):
+        caps = {"pix_fmts": ["yuv420p", "nv12"]}
+        v_enc, note = self.plan("libx264", source(1080, pix_fmt="yuv420p10le", profile="High 10", video_kbps=5000), caps)
+        self.assertEqual(v_enc, "libx264")
+        self.assertIn("像素格式不同", note)
+
+    def test_profile_in_extra_args_blocks_copy(self):
+        v_enc, note = self.plan("libx264", source(1080, profile="High 10", pix_fmt="yuv420p10le", video_kbps=5000),
+                                extra_args=("-profile:v", "main"))
+        self.assertEqual(v_enc, "libx264")
+        self.assertIn("Profile 不同", note)
+
+    def test_matching_profile_is_copied(self):
+        v_enc, _ = self.plan("libx264", source(1080, profile="High", video_kbps=5000), extra_args=("-profile:v", "high"))
+        self.assertEqual(v_enc, "copy")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import sys
+import os
+import unittest
+
+# 把项目根目录加入系统路径，确保能导入 core
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from core.registry import ToolRegistry
+
+MUXERS_DASHES = """File formats:
+ D. = Demuxing supported
+ .E = Muxing supported
+ --
+  E 3g2             3GP2 (3GPP2 file format)
+ DE matroska,webm   Matroska
+  E mp4             MP4 (MPEG-4 Part 14)
+  E null            raw null video
+"""
+
+MUXERS_TRIPLE_FLAGS = """Formats:
+ D.. = Demuxing supported
+ .E. = Muxing supported
+ ..d = Is a device
+ ---
+  E  3g2             3GP2 (3GPP2 file format)
+  E  dash            DASH Muxer
+  Ed alsa            ALSA audio output
+  E  mp4             MP4 (MPEG-4 Part 14)
+"""
+
+MUXERS_NO_SEPARATOR = """  E mp4             MP4 (MPEG-4 Part 14)
+ DE matroska        Matroska
+"""
+
+ENCODERS = """Encoders:
+ V..... = Video
+ A..... = Audio
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10 (codec h264)
+ V....D h264_nvenc           NVIDIA NVENC H.264 encoder (codec h264)
+ A....D aac                  AAC (Advanced Audio Coding)
+"""
+
+FILTERS = """Filters:
+  T.. = Timeline support
+  ... = Slice threading
+ TSC scale             V->V       Scale the input video size and/or convert the image format.
+ ... fps               V->V       Force constant framerate.
+ ... split             V->N       Pass on the input to N video outputs.
+"""
+
+
+class ParseMuxersTest(unittest.TestCase):
+    def test_classic_dashes_header(self):
+        muxers = ToolRegistry.parse_muxers(MUXERS_DASHES)
+        self.assertEqual(set(muxers), {"3g2", "matroska", "webm", "mp4", "null"})
+        self.assertEqual(muxers["mp4"], "MP4 (MPEG-4 Part 14)")
+
+    def test_three_column_flags_and_devices(self):
+        muxers = ToolRegistry.parse_muxers(MUXERS_TRIPLE_FLAGS)
+        self.assertEqual(set(muxers), {"3g2", "dash", "alsa", "mp4"})
+        self.assertEqual(muxers["dash"], "DASH Muxer")
+
+    def test_without_separator(self):
+        self.assertEqual(set(ToolRegistry.parse_muxers(MUXERS_NO_SEPARATOR)), {"mp4", "matroska"})
+
+    def test_legend_lines_are_not_muxers(self):
+        self.assertNotIn("=", ToolRegistry.parse_muxers(MUXERS_DASHES + MUXERS_TRIPLE_FLAGS))
+
+
+class ParseListingsTest(unittest.TestCase):
+    def test_encoders(self):
+        self.assertEqual(ToolRegistry.parse_encoders(ENCODERS), {"libx264": "V", "h264_nvenc": "V", "aac": "A"})
+
+    def test_filters(self):
+        self.assertEqual(ToolRegistry.parse_filters(FILTERS), {"scale": "V->V", "fps": "V->V", "split": "V->N"})
+
+
+class RegistryQueryTest(unittest.TestCase):
+    def registry(self, **lists):
+        registry = ToolRegistry("ffmpeg")
+        registry._lists.update(lists)
+        return registry
+
+    def test_has_filter(self):
+        registry = self.registry(filters=ToolRegistry.parse_filters(FILTERS))
+        self.assertTrue(registry.has_filter("split"))
+        self.assertFalse(registry.has_filter("zscale"))
+
+    def test_unknown_listing_allows_everything(self):
+        registry = self.registry(filters={}, muxers={})
+        self.assertTrue(registry.has_filter("zscale"))
+        self.assertTrue(registry.has_muxer("mp4"))
+
+    def test_no_wait_before_listing_is_loaded(self):
+        registry = self.registry()
+        registry._run_listing = lambda option: self.fail("不该在调用线程上起 ffmpeg")
+        self.assertTrue(registry.has_filter("zscale", wait=False))
+
+
+if __name__ == "__main__":
+    unittest.main()